@@ -0,0 +1,324 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, TextIO, Tuple
+from position import Position, WHITE
+from engine import Search, MATE_SCORE, MATE_BOUND, MAX_DEPTH
+from transposition import TranspositionTable
+from pgn import PGNGame, PGNLine, parseGame, readGameTexts, gameToPGN, moveToSAN
+from move import NULL_MOVE
+
+# Centipawns a move loses against the best move before it is flagged, with
+# the NAG each flag is written as.
+INACCURACY, INACCURACY_NAG = 50, 6
+MISTAKE, MISTAKE_NAG = 100, 2
+BLUNDER, BLUNDER_NAG = 200, 4
+# Scores are clamped to this many centipawns before losses are compared, so
+# a slower mate or a won position is not a blunder.
+LOSS_CLAMP = 1000
+DEFAULT_DEPTH = 4
+DEFAULT_HASH_MB = 16
+# Games queued per worker. Results are written in input order, so this bounds
+# what waits in memory behind a slow game.
+QUEUE_PER_WORKER = 4
+# Seconds between checkpoints.
+CHECKPOINT_INTERVAL = 10.0
+
+# The transposition table of a worker process, made by _initWorker.
+_table: Optional[TranspositionTable] = None
+
+
+def analyzePosition(position: Position, depth: int = DEFAULT_DEPTH, nodeLimit: Optional[int] = None,
+                    table: Optional[TranspositionTable] = None) -> Tuple[int, int, int]:
+    """
+    Returns the best move, its score for the side to move and the depth
+    reached. The search stops at the depth or the node budget, whichever
+    comes first.
+    """
+    reached = [0]
+
+    def record(depth: int, score: int, nodes: int, elapsed: float, pv: List[int]) -> None:
+        reached[0] = depth
+
+    move, score = Search(position, table).run(min(depth, MAX_DEPTH), None, nodeLimit, record)
+    return move, score, reached[0]
+
+
+def analyzeGame(game: PGNGame, depth: int = DEFAULT_DEPTH, nodeLimit: Optional[int] = None,
+                table: Optional[TranspositionTable] = None) -> int:
+    """
+    Annotates the main line of the game in place and returns the number of
+    positions searched to full depth.
+
+    Every move gets an [%eval] comment from white's point of view. Moves
+    that lose at least INACCURACY, MISTAKE or BLUNDER centipawns against the
+    engine's choice get the matching NAG, and mistakes and blunders get the
+    better move as a variation.
+    """
+    if table is None:
+        table = TranspositionTable(DEFAULT_HASH_MB)
+    position = game.startingPosition()
+    results = []
+    for move in game.moves + [NULL_MOVE]:
+        results.append(analyzePosition(position, depth, nodeLimit, table))
+        if move != NULL_MOVE:
+            position.makeMove(move)
+    position = game.startingPosition()
+    for ply, move in enumerate(game.moves):
+        bestMove = results[ply][0]
+        mover = position.sideToMove
+        score = -results[ply + 1][1]
+        _addComment(game, ply + 1, _evalComment(score, mover))
+        if move != bestMove:
+            # Compare the position after the best move searched as deep as
+            # the one after the played move, rather than the root score,
+            # so the comparison does not pick up odd-even depth swings.
+            position.makeMove(bestMove)
+            bestScore = -analyzePosition(position, depth, nodeLimit, table)[1]
+            position.unmakeMove()
+            loss = _clamp(bestScore) - _clamp(score)
+            if loss >= INACCURACY:
+                nag = BLUNDER_NAG if loss >= BLUNDER else MISTAKE_NAG if loss >= MISTAKE else INACCURACY_NAG
+                game.nags.setdefault(ply + 1, []).append(nag)
+            if loss >= MISTAKE:
+                better = PGNLine()
+                better.moves.append(bestMove)
+                better.comments[1] = _evalComment(bestScore, mover)
+                game.variations.setdefault(ply, []).append(better)
+        position.makeMove(move)
+    if game.error is not None:
+        _addComment(game, len(game.moves), f"Analysis stopped: {game.error}")
+    return len(results)
+
+
+def analyzeFEN(fen: str, depth: int = DEFAULT_DEPTH, nodeLimit: Optional[int] = None,
+               table: Optional[TranspositionTable] = None) -> str:
+    """
+    Returns the position as an EPD line with the best move (bm), its score
+    in centipawns (ce) and the depth searched (acd).
+    """
+    try:
+        position = Position.fromFEN(fen)
+    except ValueError as error:
+        return f'{fen} c0 "{error}";'
+    move, score, reached = analyzePosition(position, depth, nodeLimit, table)
+    epd = " ".join(fen.split()[:4])
+    if move == NULL_MOVE:
+        return f"{epd} ce {score}; acd {reached};"
+    return f"{epd} bm {moveToSAN(position, move)}; ce {score}; acd {reached};"
+
+
+def _clamp(score: int) -> int:
+    return max(-LOSS_CLAMP, min(score, LOSS_CLAMP))
+
+
+def _evalComment(score: int, color: int) -> str:
+    """
+    Returns the [%eval] comment of a score the given color has.
+    """
+    if color != WHITE:
+        score = -score
+    if score >= MATE_BOUND:
+        return f"[%eval #{(MATE_SCORE - score + 1) // 2}]"
+    if score <= -MATE_BOUND:
+        return f"[%eval #-{(MATE_SCORE + score) // 2}]"
+    return f"[%eval {score / 100:.2f}]"
+
+
+def _addComment(line: PGNLine, ply: int, text: str) -> None:
+    line.comments[ply] = f"{text} {line.comments[ply]}" if ply in line.comments else text
+
+
+def _initWorker(hashSize: float) -> None:
+    global _table
+    _table = TranspositionTable(hashSize)
+
+
+def _analyzeTask(fileFormat: str, text: str, depth: int, nodeLimit: Optional[int],
+                 table: Optional[TranspositionTable] = None) -> Tuple[str, int, int]:
+    """
+    Returns the annotated output of one game or FEN with the positions
+    searched and the moves flagged. A game or FEN the analysis fails on is
+    written back with the error instead, so the rest of the file goes on.
+    """
+    table = table if table is not None else _table
+    try:
+        if fileFormat == "fen":
+            return analyzeFEN(text, depth, nodeLimit, table) + "\n", 1, 0
+        game = parseGame(text)
+        positions = analyzeGame(game, depth, nodeLimit, table)
+        flagged = sum(len(nags) for nags in game.nags.values()
+                      if any(nag in (INACCURACY_NAG, MISTAKE_NAG, BLUNDER_NAG) for nag in nags))
+        return gameToPGN(game), positions, flagged
+    except Exception as error:
+        return _failedTask(fileFormat, text, f"Analysis failed: {type(error).__name__}: {error}"), 0, 0
+
+
+def _failedTask(fileFormat: str, text: str, message: str) -> str:
+    """
+    Returns the output of a game or FEN whose analysis failed: the EPD line
+    or the unannotated game with the message as its comment.
+    """
+    message = message.replace('"', "'")
+    if fileFormat == "fen":
+        return f'{text} c0 "{message}";\n'
+    try:
+        game = parseGame(text)
+        _addComment(game, 0, message)
+        return gameToPGN(game)
+    except Exception:
+        # The game cannot even be written again, so it is kept as read.
+        return text.rstrip("\n") + "\n\n"
+
+
+def _readTasks(file: TextIO, fileFormat: str) -> Iterator[str]:
+    if fileFormat == "fen":
+        return (line.strip() for line in file if line.strip())
+    return readGameTexts(file)
+
+
+def _loadCheckpoint(path: str, inputPath: str) -> Tuple[int, int]:
+    """
+    Returns the number of games done and the output size they take, or zeros without a checkpoint.
+
+    Raises:
+        ValueError: If the checkpoint belongs to another input file.
+    """
+    try:
+        with open(path) as file:
+            checkpoint = json.load(file)
+    except FileNotFoundError:
+        return 0, 0
+    if checkpoint["input"] != os.path.abspath(inputPath):
+        raise ValueError(f"Checkpoint {path} belongs to {checkpoint['input']}.")
+    return checkpoint["done"], checkpoint["outputSize"]
+
+
+def _saveCheckpoint(path: str, inputPath: str, done: int, outputSize: int) -> None:
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as file:
+        json.dump({"input": os.path.abspath(inputPath), "done": done, "outputSize": outputSize}, file)
+    os.replace(temporary, path)
+
+
+def analyzeFile(inputPath: str, outputPath: str, depth: int = DEFAULT_DEPTH, nodeLimit: Optional[int] = None,
+                workers: int = os.cpu_count() or 1, hashSize: float = DEFAULT_HASH_MB,
+                fileFormat: Optional[str] = None, checkpointPath: Optional[str] = None,
+                progress: Optional[Callable[[int, int, int, float], None]] = None) -> int:
+    """
+    Analyses every game of a PGN file, or every line of a FEN file, on a
+    pool of worker processes and returns the number of games or positions
+    analysed in total. Results are written in input order as annotated PGN
+    or EPD lines.
+
+    The checkpoint file, outputPath + ".checkpoint" by default, records how
+    far the output got. A run that finds one resumes after the last saved
+    game, and a finished run deletes it. progress is called after every
+    game with the games done, the positions searched and the moves flagged
+    in this run, and the elapsed seconds.
+
+    Raises:
+        ValueError: If the checkpoint belongs to another input file.
+    """
+    if fileFormat is None:
+        fileFormat = "pgn" if inputPath.lower().endswith(".pgn") else "fen"
+    if checkpointPath is None:
+        checkpointPath = outputPath + ".checkpoint"
+    done, outputSize = _loadCheckpoint(checkpointPath, inputPath)
+    if done:
+        # Drop anything written after the last checkpoint.
+        os.truncate(outputPath, outputSize)
+    start = lastCheckpoint = time.perf_counter()
+    positions = flagged = 0
+    completed = False
+    with open(inputPath, errors="replace") as source, open(outputPath, "ab" if done else "wb") as output:
+        def finish(result: Tuple[str, int, int]) -> None:
+            nonlocal done, positions, flagged, lastCheckpoint
+            text, searched, flags = result
+            output.write(text.encode())
+            done += 1
+            positions += searched
+            flagged += flags
+            now = time.perf_counter()
+            if now - lastCheckpoint >= CHECKPOINT_INTERVAL:
+                output.flush()
+                _saveCheckpoint(checkpointPath, inputPath, done, output.tell())
+                lastCheckpoint = now
+            if progress is not None:
+                progress(done, positions, flagged, now - start)
+
+        tasks = itertools.islice(_readTasks(source, fileFormat), done, None)
+        try:
+            if workers <= 1:
+                table = TranspositionTable(hashSize)
+                for text in tasks:
+                    finish(_analyzeTask(fileFormat, text, depth, nodeLimit, table))
+            else:
+                pool = ProcessPoolExecutor(workers, initializer=_initWorker, initargs=(hashSize,))
+                try:
+                    pending = deque()
+                    for text in tasks:
+                        pending.append(pool.submit(_analyzeTask, fileFormat, text, depth, nodeLimit))
+                        if len(pending) >= workers * QUEUE_PER_WORKER:
+                            finish(pending.popleft().result())
+                    while pending:
+                        finish(pending.popleft().result())
+                finally:
+                    pool.shutdown(cancel_futures=True)
+            completed = True
+        finally:
+            output.flush()
+            if completed:
+                if os.path.exists(checkpointPath):
+                    os.remove(checkpointPath)
+            else:
+                # Interrupted: keep everything finished so far for the next run.
+                _saveCheckpoint(checkpointPath, inputPath, done, output.tell())
+    return done
+
+
+def _printProgress(done: int, positions: int, flagged: int, elapsed: float) -> None:
+    rate = positions / elapsed if elapsed > 0 else 0
+    print(f"\r{done} done  {positions} positions  {rate:.1f} positions/s  {flagged} flagged moves",
+          end="", file=sys.stderr, flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the analysis from the command line and returns the exit code.
+    """
+    parser = argparse.ArgumentParser(description="Analyse the games of a PGN file or the positions of a FEN file.")
+    parser.add_argument("input", help="PGN file, or a file with one FEN per line")
+    parser.add_argument("output", help="annotated PGN or EPD output file")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help=f"search depth (default: {DEFAULT_DEPTH})")
+    parser.add_argument("--nodes", type=int, help="node budget per position")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--hash", type=float, default=DEFAULT_HASH_MB,
+                        help=f"transposition table MB per worker (default: {DEFAULT_HASH_MB})")
+    parser.add_argument("--format", choices=("pgn", "fen"), help="input format (default: from the file extension)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--quiet", action="store_true", help="do not report progress")
+    args = parser.parse_args(argv)
+
+    try:
+        done = analyzeFile(args.input, args.output, args.depth, args.nodes, args.workers, args.hash,
+                           args.format, args.checkpoint, None if args.quiet else _printProgress)
+    except KeyboardInterrupt:
+        print("\nInterrupted, run again to resume.", file=sys.stderr)
+        return 130
+    except (OSError, ValueError) as error:
+        print(error, file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print(f"\n{done} analysed.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+import os
+import pathlib
+import random
+from array import array
+from typing import List, Optional, Tuple
+from position import WHITE, BLACK, ALL_SQUARES
+
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+
+KNIGHT_OFFSETS = ((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+KING_OFFSETS = ((0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1))
+
+# Ray directions as (file step, rank step). The first four run towards higher
+# squares, so their nearest blocker is the lowest set bit; the last four run
+# towards lower squares, where it is the highest.
+NORTH, EAST, NORTH_EAST, NORTH_WEST, SOUTH, WEST, SOUTH_WEST, SOUTH_EAST = range(8)
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (-1, 1), (0, -1), (-1, 0), (-1, -1), (1, -1))
+
+
+def _stepTable(offsets) -> List[int]:
+    table = []
+    for square in range(64):
+        file, rank = square & 7, square >> 3
+        attacks = 0
+        for fileStep, rankStep in offsets:
+            newFile, newRank = file + fileStep, rank + rankStep
+            if 0 <= newFile < 8 and 0 <= newRank < 8:
+                attacks |= 1 << (newRank * 8 + newFile)
+        table.append(attacks)
+    return table
+
+
+def _rayTable(fileStep: int, rankStep: int) -> List[int]:
+    table = []
+    for square in range(64):
+        newFile, newRank = (square & 7) + fileStep, (square >> 3) + rankStep
+        ray = 0
+        while 0 <= newFile < 8 and 0 <= newRank < 8:
+            ray |= 1 << (newRank * 8 + newFile)
+            newFile += fileStep
+            newRank += rankStep
+        table.append(ray)
+    return table
+
+
+def _pawnTable(color: int) -> List[int]:
+    table = []
+    for square in range(64):
+        bit = 1 << square
+        if color == WHITE:
+            table.append(((bit & ~FILE_A) << 7 | (bit & ~FILE_H) << 9) & ALL_SQUARES)
+        else:
+            table.append((bit & ~FILE_A) >> 9 | (bit & ~FILE_H) >> 7)
+    return table
+
+
+KNIGHT_ATTACKS = _stepTable(KNIGHT_OFFSETS)
+KING_ATTACKS = _stepTable(KING_OFFSETS)
+# PAWN_ATTACKS[color][square]
+PAWN_ATTACKS = (_pawnTable(WHITE), _pawnTable(BLACK))
+# RAYS[direction][square], the empty-board ray leaving the square.
+RAYS = tuple(_rayTable(fileStep, rankStep) for fileStep, rankStep in DIRECTIONS)
+ROOK_RAYS = [RAYS[NORTH][sq] | RAYS[EAST][sq] | RAYS[SOUTH][sq] | RAYS[WEST][sq] for sq in range(64)]
+BISHOP_RAYS = [RAYS[NORTH_EAST][sq] | RAYS[NORTH_WEST][sq] | RAYS[SOUTH_WEST][sq] | RAYS[SOUTH_EAST][sq]
+               for sq in range(64)]
+
+
+def _betweenTable() -> List[List[int]]:
+    table = [[0] * 64 for _ in range(64)]
+    for square in range(64):
+        for ray in RAYS:
+            for target in range(64):
+                if ray[square] >> target & 1:
+                    table[square][target] = ray[square] & ~ray[target] & ~(1 << target)
+    return table
+
+
+# BETWEEN[a][b], the squares strictly between two squares on a shared line, otherwise 0.
+BETWEEN = _betweenTable()
+
+
+def pawnAttacks(color: int, square: int) -> int:
+    """
+    Returns the squares a pawn of the given color attacks from the square.
+    """
+    return PAWN_ATTACKS[color][square]
+
+
+def knightAttacks(square: int) -> int:
+    """
+    Returns the squares a knight attacks from the square.
+    """
+    return KNIGHT_ATTACKS[square]
+
+
+def kingAttacks(square: int) -> int:
+    """
+    Returns the squares a king attacks from the square.
+    """
+    return KING_ATTACKS[square]
+
+
+_NORTH_RAYS, _EAST_RAYS, _NORTH_EAST_RAYS, _NORTH_WEST_RAYS = RAYS[:4]
+_SOUTH_RAYS, _WEST_RAYS, _SOUTH_WEST_RAYS, _SOUTH_EAST_RAYS = RAYS[4:]
+
+
+def _rayRookAttacks(square: int, occupied: int) -> int:
+    attacks = 0
+    for rays in (_NORTH_RAYS, _EAST_RAYS):
+        ray = rays[square]
+        blockers = ray & occupied
+        attacks |= ray ^ rays[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    for rays in (_SOUTH_RAYS, _WEST_RAYS):
+        ray = rays[square]
+        blockers = ray & occupied
+        attacks |= ray ^ rays[blockers.bit_length() - 1] if blockers else ray
+    return attacks
+
+
+def _rayBishopAttacks(square: int, occupied: int) -> int:
+    attacks = 0
+    for rays in (_NORTH_EAST_RAYS, _NORTH_WEST_RAYS):
+        ray = rays[square]
+        blockers = ray & occupied
+        attacks |= ray ^ rays[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    for rays in (_SOUTH_WEST_RAYS, _SOUTH_EAST_RAYS):
+        ray = rays[square]
+        blockers = ray & occupied
+        attacks |= ray ^ rays[blockers.bit_length() - 1] if blockers else ray
+    return attacks
+
+
+# Magic bitboards: the blockers on a slider's relevant squares, multiplied by
+# a per-square magic number, give a perfect hash whose top bits index a table
+# of precomputed attack sets. Finding the magics takes a few seconds in
+# Python, so the numbers and tables are cached next to this module.
+MAGIC_CACHE = pathlib.Path(__file__).parent.absolute() / "magics.bin"
+_MAGIC_VERSION = 1
+# Tries at the minimal table size before a square settles for a larger table.
+_MAGIC_TRIALS = 2000
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_EDGES = (FILE_A | FILE_H, 0xFF | 0xFF << 56)
+
+
+def _relevantMask(square: int, rays: Tuple[int, ...]) -> int:
+    """
+    Returns the squares whose occupancy changes the attacks along the rays:
+    every ray square except the final one on the board edge.
+    """
+    mask = 0
+    for direction in rays:
+        ray = RAYS[direction][square]
+        fileStep, rankStep = DIRECTIONS[direction]
+        if fileStep:
+            ray &= ~_EDGES[0]
+        if rankStep:
+            ray &= ~_EDGES[1]
+        mask |= ray
+    return mask
+
+
+def _subsets(mask: int) -> List[int]:
+    subsets = []
+    subset = 0
+    while True:
+        subsets.append(subset)
+        subset = (subset - mask) & mask
+        if not subset:
+            return subsets
+
+
+def _findMagic(mask: int, slowAttacks, square: int, generator: random.Random) -> Tuple[int, int, List[int]]:
+    """
+    Returns a magic number for the mask with its shift and attack table,
+    found by trying sparse random numbers until no two occupancies with
+    different attacks collide. Squares without a quick minimal-size magic
+    get a table twice as large, which is far easier to fill.
+    """
+    bits = mask.bit_count()
+    occupancies = _subsets(mask)
+    references = [slowAttacks(square, occupancy) for occupancy in occupancies]
+    trials = 0
+    while True:
+        magic = generator.getrandbits(64) & generator.getrandbits(64) & generator.getrandbits(64)
+        # Magics that spread the mask's bits poorly over the top byte rarely work.
+        if (((mask * magic) & _MASK64) >> 56).bit_count() < 6:
+            continue
+        trials += 1
+        if trials == _MAGIC_TRIALS:
+            bits += 1
+        shift = 64 - bits
+        table = [None] * (1 << bits)
+        for occupancy, attacks in zip(occupancies, references):
+            index = ((occupancy * magic) & _MASK64) >> shift
+            if table[index] is None:
+                table[index] = attacks
+            elif table[index] != attacks:
+                break
+        else:
+            return magic, shift, [attacks or 0 for attacks in table]
+
+
+def _generateMagics() -> Tuple[List[int], List[int], List[List[int]]]:
+    generator = random.Random(0x3A61C5)
+    magics, shifts, tables = [], [], []
+    for masks, slowAttacks in ((ROOK_MASKS, _rayRookAttacks), (BISHOP_MASKS, _rayBishopAttacks)):
+        for square in range(64):
+            magic, shift, table = _findMagic(masks[square], slowAttacks, square, generator)
+            magics.append(magic)
+            shifts.append(shift)
+            tables.append(table)
+    return magics, shifts, tables
+
+
+def _loadMagics(path: pathlib.Path) -> Optional[Tuple[List[int], List[int], List[List[int]]]]:
+    """
+    Returns the cached magic numbers, shifts and attack tables, or None if
+    the cache is missing or unreadable.
+    """
+    words = array("Q")
+    try:
+        with open(path, "rb") as file:
+            words.frombytes(file.read())
+    except (OSError, ValueError):
+        return None
+    if len(words) < 257 or words[0] != _MAGIC_VERSION:
+        return None
+    magics = words[1:129].tolist()
+    shifts = words[129:257].tolist()
+    sizes = [1 << (64 - shift) for shift in shifts]
+    if len(words) != 257 + sum(sizes):
+        return None
+    tables = []
+    offset = 257
+    for size in sizes:
+        tables.append(words[offset:offset + size].tolist())
+        offset += size
+    return magics, shifts, tables
+
+
+def _saveMagics(path: pathlib.Path, magics: List[int], shifts: List[int], tables: List[List[int]]) -> None:
+    words = array("Q", [_MAGIC_VERSION])
+    words.extend(magics)
+    words.extend(shifts)
+    for table in tables:
+        words.extend(table)
+    try:
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temporary, "wb") as file:
+            words.tofile(file)
+        temporary.replace(path)
+    except OSError:
+        # A read-only install just regenerates the magics on every start.
+        pass
+
+
+def _initMagics() -> Tuple[List[Tuple[int, int, int, List[int]]], List[Tuple[int, int, int, List[int]]]]:
+    cached = _loadMagics(MAGIC_CACHE)
+    if cached is None:
+        cached = _generateMagics()
+        _saveMagics(MAGIC_CACHE, *cached)
+    magics, shifts, tables = cached
+    masks = ROOK_MASKS + BISHOP_MASKS
+    entries = [(masks[index], magics[index], shifts[index], tables[index]) for index in range(128)]
+    return entries[:64], entries[64:]
+
+
+ROOK_MASKS = [_relevantMask(square, (NORTH, EAST, SOUTH, WEST)) for square in range(64)]
+BISHOP_MASKS = [_relevantMask(square, (NORTH_EAST, NORTH_WEST, SOUTH_WEST, SOUTH_EAST)) for square in range(64)]
+# ROOK_MAGICS[square] and BISHOP_MAGICS[square] are (mask, magic, shift, attack table).
+ROOK_MAGICS, BISHOP_MAGICS = _initMagics()
+
+
+def rookAttacks(square: int, occupied: int) -> int:
+    """
+    Returns the squares a rook attacks from the square, stopping on blockers.
+    """
+    mask, magic, shift, table = ROOK_MAGICS[square]
+    return table[((occupied & mask) * magic & _MASK64) >> shift]
+
+
+def bishopAttacks(square: int, occupied: int) -> int:
+    """
+    Returns the squares a bishop attacks from the square, stopping on blockers.
+    """
+    mask, magic, shift, table = BISHOP_MAGICS[square]
+    return table[((occupied & mask) * magic & _MASK64) >> shift]
+
+
+def queenAttacks(square: int, occupied: int) -> int:
+    """
+    Returns the squares a queen attacks from the square, stopping on blockers.
+    """
+    return rookAttacks(square, occupied) | bishopAttacks(square, occupied)
@@ -0,0 +1,146 @@
+import argparse
+import io
+import random
+import sys
+import time
+from typing import List, Optional, TextIO, Tuple
+from position import Position, STARTING_FEN
+from movegen import generateLegalMoves
+from pgn import PGNGame, gameToPGN, readGames
+
+
+def randomFENs(count: int, seed: int = 0, maxPlies: int = 120) -> List[str]:
+    """
+    Returns FEN strings of the positions along seeded random games, a stand-in
+    for the positions of a real game collection.
+    """
+    generator = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        position = Position.fromFEN(STARTING_FEN)
+        for _ in range(maxPlies):
+            moves = generateLegalMoves(position)
+            if not moves or len(fens) == count:
+                break
+            position.makeMove(generator.choice(moves))
+            fens.append(position.toFEN())
+    return fens
+
+
+def randomPGN(count: int, seed: int = 0, maxPlies: int = 120) -> str:
+    """
+    Returns the PGN text of seeded random games.
+    """
+    generator = random.Random(seed)
+    games = []
+    for _ in range(count):
+        position = Position.fromFEN(STARTING_FEN)
+        for _ in range(maxPlies):
+            moves = generateLegalMoves(position)
+            if not moves:
+                break
+            position.makeMove(generator.choice(moves))
+        games.append(gameToPGN(PGNGame.fromPosition(position)))
+    return "".join(games)
+
+
+def benchmarkFEN(fens: List[str]) -> Tuple[float, float]:
+    """
+    Returns how many of the FEN strings are read and written per second.
+    Reading is timed the way batch jobs stream positions: each one is
+    dropped before the next is read, so the garbage collector is not timed.
+
+    Raises:
+        AssertionError: If a FEN string does not survive the round trip.
+    """
+    fromFEN = Position.fromFEN
+    start = time.perf_counter()
+    for fen in fens:
+        fromFEN(fen)
+    readTime = time.perf_counter() - start
+    positions = [fromFEN(fen) for fen in fens]
+    start = time.perf_counter()
+    written = [position.toFEN() for position in positions]
+    writeTime = time.perf_counter() - start
+    assert written == fens, "FEN round trip failed"
+    return len(fens) / readTime, len(fens) / writeTime
+
+
+def benchmarkPacked(fens: List[str]) -> Tuple[float, float]:
+    """
+    Returns how many of the positions are unpacked and packed per second,
+    timed like benchmarkFEN.
+
+    Raises:
+        AssertionError: If a position does not survive the round trip.
+    """
+    positions = [Position.fromFEN(fen) for fen in fens]
+    start = time.perf_counter()
+    packed = [position.toBytes() for position in positions]
+    writeTime = time.perf_counter() - start
+    fromBytes = Position.fromBytes
+    start = time.perf_counter()
+    for data in packed:
+        fromBytes(data)
+    readTime = time.perf_counter() - start
+    assert [fromBytes(data).toFEN() for data in packed] == fens, "Packed round trip failed"
+    return len(fens) / readTime, len(fens) / writeTime
+
+
+def benchmarkPGN(file: TextIO, headersOnly: bool = False) -> Tuple[int, int, float]:
+    """
+    Returns the number of games and plies streamed from the PGN file and the seconds it took.
+    """
+    games = plies = 0
+    start = time.perf_counter()
+    for game in readGames(file, headersOnly):
+        games += 1
+        plies += len(game.moves)
+    return games, plies, time.perf_counter() - start
+
+
+def _report(name: str, count: int, perSecond: float, unit: str = "FENs") -> None:
+    print(f"{name:<12} {count:>9} {unit:<6} {int(perSecond):>9} per second")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the benchmarks from the command line and returns the exit code.
+    """
+    parser = argparse.ArgumentParser(description="Time the FEN, packed and PGN readers and writers.")
+    parser.add_argument("format", nargs="?", choices=("fen", "packed", "pgn"), default="fen",
+                        help="what to time (default: fen)")
+    parser.add_argument("--count", type=int, default=None,
+                        help="random positions or games to generate (default: 100000 FENs or 1000 games)")
+    parser.add_argument("--file", help="read the FENs, one per line, or the PGN games from a file instead")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes (default: 3)")
+    args = parser.parse_args(argv)
+
+    if args.format == "pgn":
+        if args.file is None:
+            text = randomPGN(args.count or 1000)
+        for attempt in range(args.repeat):
+            for headersOnly in (False, True):
+                with (open(args.file, errors="replace") if args.file is not None else io.StringIO(text)) as file:
+                    games, plies, elapsed = benchmarkPGN(file, headersOnly)
+                name = f"{'headers' if headersOnly else 'read'} {attempt + 1}"
+                _report(name, games, games / elapsed, "games")
+                if not headersOnly:
+                    _report(name, plies, plies / elapsed, "plies")
+        return 0
+
+    if args.file is not None:
+        with open(args.file) as file:
+            fens = [Position.fromFEN(line).toFEN() for line in file if line.strip()]
+    else:
+        fens = randomFENs(args.count or 100000)
+    benchmark = benchmarkPacked if args.format == "packed" else benchmarkFEN
+    for attempt in range(args.repeat):
+        # The first pass also fills the rank cache of the reader.
+        read, write = benchmark(fens)
+        _report(f"read {attempt + 1}", len(fens), read)
+        _report(f"write {attempt + 1}", len(fens), write)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
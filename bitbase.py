@@ -0,0 +1,379 @@
+import argparse
+import mmap
+import os
+import pathlib
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+from position import Position, WHITE, BLACK, PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING, pieceIndex, lsb, iterSquares
+from attacks import (KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS, BETWEEN, FILE_A, FILE_H, rookAttacks,
+                     bishopAttacks, queenAttacks)
+
+# Win/draw bitbases for endings of a lone king against a king and one or two
+# pieces. Every position of such an ending is a win for the stronger side or
+# a draw, so one bit per position is enough: the generator works out the
+# bits by retrograde analysis and writes them next to the modules, and the
+# search probes the memory-mapped files.
+BITBASE_DIR = pathlib.Path(__file__).parent.absolute() / "bitbases"
+# The stronger side's pieces besides the king, in the order they index the tables.
+ENDGAMES = {"KPK": (PAWN,), "KRK": (ROOK,), "KQK": (QUEEN,), "KBNK": (BISHOP, KNIGHT)}
+# Probe results for the side to move.
+WIN, DRAW, LOSS = 1, 0, -1
+# Positions with more pieces are never in a bitbase.
+MAX_PIECES = 4
+
+_FULL = 0xFFFFFFFFFFFFFFFF
+_NOT_FILE_A = _FULL ^ FILE_A
+_NOT_FILE_H = _FULL ^ FILE_H
+# Without pawns the stronger king is mirrored into the a1-d1-d4 triangle.
+_TRIANGLE = sorted(rank * 8 + file for file in range(4) for rank in range(file + 1))
+_TRIANGLE_INDEX = {square: index for index, square in enumerate(_TRIANGLE)}
+# With a pawn the board is only mirrored onto files a-d, pawns on ranks 2-7.
+_PAWN_SQUARES = [rank * 8 + file for rank in range(1, 7) for file in range(4)]
+_PAWN_INDEX = {square: index for index, square in enumerate(_PAWN_SQUARES)}
+_BACK_RANKS = 0xFF000000000000FF
+# Piece counts of the stronger side, pawns to queens, per ending.
+_SIGNATURES = {tuple(types.count(pieceType) for pieceType in range(5)): name for name, types in ENDGAMES.items()}
+
+
+def _attacks(pieceType: int, square: int, occupied: int) -> int:
+    if pieceType == PAWN:
+        return PAWN_ATTACKS[WHITE][square]
+    if pieceType == KNIGHT:
+        return KNIGHT_ATTACKS[square]
+    if pieceType == BISHOP:
+        return bishopAttacks(square, occupied)
+    if pieceType == ROOK:
+        return rookAttacks(square, occupied)
+    return queenAttacks(square, occupied)
+
+
+def _kingNeighbours(bitboard: int) -> int:
+    """
+    Returns the squares a king step away from a square of the set.
+    """
+    sides = (bitboard << 1 & _NOT_FILE_A) | (bitboard >> 1 & _NOT_FILE_H)
+    row = bitboard | sides
+    return (sides | row << 8 | row >> 8) & _FULL
+
+
+class _Generator:
+    """
+    Retrograde analysis of one ending with the stronger side as white.
+
+    A row of the tables fixes the white king and pieces and holds one bit
+    per square of the black king, so a whole row is updated with a few
+    bitboard operations. strong[row] marks the wins with white to move and
+    weak[row] the losses with black to move. Both only grow: black loses
+    once every king move runs into a win for white or is illegal and it has
+    a move or is mated; white wins once a move reaches a black loss. Only
+    rows next to a changed row are updated again, until nothing changes.
+    """
+    def __init__(self, name: str, promotions: Tuple[List[int], ...] = ()) -> None:
+        self._types = ENDGAMES[name]
+        self._count = len(self._types)
+        self._strides = [64 ** (self._count - index) for index in range(self._count + 1)]
+        # Weak-side rows of the endings a pawn promotes to, indexed by king and new piece.
+        self._promotions = promotions
+        size = 64 ** (self._count + 1)
+        self.strong = [0] * size
+        self.weak = [0] * size
+        # (squares, attacked squares, legal black king squares with black and with white to move) per row.
+        self._rows = [None] * size
+        for row in range(size):
+            squares = [row // stride % 64 for stride in self._strides]
+            occupied = 0
+            for square in squares:
+                occupied |= 1 << square
+            if occupied.bit_count() != len(squares):
+                continue
+            if PAWN in self._types and not 8 <= squares[1 + self._types.index(PAWN)] < 56:
+                continue
+            attacked = KING_ATTACKS[squares[0]]
+            for pieceType, square in zip(self._types, squares[1:]):
+                attacked |= _attacks(pieceType, square, occupied)
+            weakLegal = _FULL & ~(occupied | KING_ATTACKS[squares[0]])
+            self._rows[row] = (squares, attacked, weakLegal, weakLegal & ~attacked)
+
+    def run(self) -> None:
+        """
+        Fills the tables.
+        """
+        rows = [row for row, info in enumerate(self._rows) if info is not None]
+        changed = [row for row in rows if self._updateStrong(row)]
+        changed = [row for row in rows if self._updateWeak(row)]
+        while changed:
+            candidates = {previous for row in changed for previous in self._predecessors(row)}
+            changed = [row for row in candidates if self._updateStrong(row)]
+            changed = [row for row in changed if self._updateWeak(row)]
+
+    def _updateWeak(self, row: int) -> bool:
+        squares, attacked, weakLegal, _ = self._rows[row]
+        wins = self.strong[row]
+        escapes = _FULL & ~(attacked | wins | 1 << squares[0])
+        lost = weakLegal & ~_kingNeighbours(escapes) & (attacked | _kingNeighbours(wins))
+        if lost == self.weak[row]:
+            return False
+        self.weak[row] = lost
+        return True
+
+    def _updateStrong(self, row: int) -> bool:
+        strongLegal = self._rows[row][3]
+        won = 0
+        for table, target, mask in self._successors(row):
+            won |= table[target] & mask
+        won &= strongLegal
+        if won == self.strong[row]:
+            return False
+        self.strong[row] = won
+        return True
+
+    def _successors(self, row: int) -> Iterator[Tuple[List[int], int, int]]:
+        """
+        Yields the black to move table and row each white move leads to with
+        the black king squares for which the move is possible. Promotions
+        lead to the rows of the endings promoted to.
+        """
+        squares, strides = self._rows[row][0], self._strides
+        occupied = 0
+        for square in squares:
+            occupied |= 1 << square
+        king, weak = squares[0], self.weak
+        for target in iterSquares(KING_ATTACKS[king] & ~occupied):
+            yield weak, row + (target - king) * strides[0], _FULL
+        for index, pieceType in enumerate(self._types, 1):
+            square, stride = squares[index], strides[index]
+            if pieceType == PAWN:
+                target = square + 8
+                if occupied >> target & 1:
+                    continue
+                if target >= 56:
+                    for promoted in self._promotions:
+                        yield promoted, king * 64 + target, _FULL
+                    continue
+                yield weak, row + 8 * stride, _FULL
+                if square < 16 and not occupied >> (target + 8) & 1:
+                    yield weak, row + 16 * stride, _FULL ^ 1 << target
+                continue
+            targets = _attacks(pieceType, square, occupied) & ~occupied
+            for target in iterSquares(targets):
+                yield weak, row + (target - square) * stride, _FULL ^ BETWEEN[square][target]
+
+    def _predecessors(self, row: int) -> Iterator[int]:
+        """
+        Yields the rows from which a white move leads to the row.
+        """
+        squares, strides = self._rows[row][0], self._strides
+        occupied = 0
+        for square in squares:
+            occupied |= 1 << square
+        king = squares[0]
+        for origin in iterSquares(KING_ATTACKS[king] & ~occupied):
+            previous = row + (origin - king) * strides[0]
+            if self._rows[previous] is not None:
+                yield previous
+        for index, pieceType in enumerate(self._types, 1):
+            square, stride = squares[index], strides[index]
+            if pieceType == PAWN:
+                if square >= 16 and not occupied >> (square - 8) & 1:
+                    yield row - 8 * stride
+                    if 24 <= square < 32 and not occupied >> (square - 16) & 1:
+                        yield row - 16 * stride
+                continue
+            # Pieces other than pawns move back the way they move forward.
+            for origin in iterSquares(_attacks(pieceType, square, occupied) & ~occupied):
+                yield row + (origin - square) * stride
+
+
+def generateBitbase(name: str, generated: Optional[Dict[str, "_Generator"]] = None) -> Tuple[List[int], List[int]]:
+    """
+    Returns the rows of the ending, the first list with the stronger side to
+    move and the second with the lone king to move. A row belongs to the
+    stronger king and pieces on the squares of the row index's base-64
+    digits, king first, and holds a bit per square of the lone king, set
+    where the stronger side wins. Endings a pawn promotes to are generated
+    first and kept in generated.
+    """
+    generated = {} if generated is None else generated
+    if name not in generated:
+        promotions = ()
+        if PAWN in ENDGAMES[name]:
+            # Knight and bishop promotions only draw against a lone king.
+            promotions = tuple(generateBitbase(ending, generated)[1] for ending in ("KQK", "KRK"))
+        generator = _Generator(name, promotions)
+        generator.run()
+        generated[name] = generator
+    return generated[name].strong, generated[name].weak
+
+
+def _fileRows(name: str) -> List[int]:
+    """
+    Returns the generator rows stored in the bitbase file, in file order:
+    the stronger king in the a1-d1-d4 triangle, or with a pawn the pawn on
+    files a-d, as the other positions are mirror images of these.
+    """
+    types = ENDGAMES[name]
+    rows = [[king] for king in (range(64) if PAWN in types else _TRIANGLE)]
+    for pieceType in types:
+        rows = [row + [square] for row in rows for square in (_PAWN_SQUARES if pieceType == PAWN else range(64))]
+    return [sum(square * 64 ** (len(types) - index) for index, square in enumerate(row)) for row in rows]
+
+
+def _fileRow(name: str, squares: List[int]) -> Tuple[int, int]:
+    """
+    Returns the file row and lone king square of a position given as the
+    stronger king, lone king and pieces squares with the stronger side as white.
+    """
+    types = ENDGAMES[name]
+    if PAWN in types:
+        if squares[2 + types.index(PAWN)] & 7 > 3:
+            squares = [square ^ 7 for square in squares]
+        row = squares[0]
+    else:
+        if squares[0] & 7 > 3:
+            squares = [square ^ 7 for square in squares]
+        if squares[0] > 31:
+            squares = [square ^ 56 for square in squares]
+        if squares[0] >> 3 > squares[0] & 7:
+            squares = [(square & 7) << 3 | square >> 3 for square in squares]
+        row = _TRIANGLE_INDEX[squares[0]]
+    for pieceType, square in zip(types, squares[2:]):
+        row = row * 24 + _PAWN_INDEX[square] if pieceType == PAWN else row * 64 + square
+    return row, squares[1]
+
+
+def writeBitbase(path, name: str, strong: List[int], weak: List[int]) -> None:
+    """
+    Writes the generated rows of the ending to a bitbase file: 64-bit
+    little-endian rows of the file rows, all with the stronger side to move
+    and then all with the lone king to move.
+    """
+    rows = _fileRows(name)
+    words = array("Q", [strong[row] for row in rows])
+    words.extend(weak[row] for row in rows)
+    if sys.byteorder == "big":
+        words.byteswap()
+    path = pathlib.Path(path)
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(temporary, "wb") as file:
+        words.tofile(file)
+    temporary.replace(path)
+
+
+class Bitbase:
+    """
+    Bitbase file of one ending, memory-mapped so probes read single bytes
+    of it without loading it.
+
+    Raises:
+        OSError: If the file cannot be opened.
+        ValueError: If the file size does not match the ending.
+    """
+    def __init__(self, path, name: str) -> None:
+        self._name = name
+        self._rows = len(_fileRows(name))
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size != self._rows * 16:
+                raise ValueError(f"{path} is not a {name} bitbase: {size} bytes instead of {self._rows * 16}.")
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def name(self) -> str:
+        """
+        Returns the name of the ending, e.g. "KRK".
+        """
+        return self._name
+
+    def close(self) -> None:
+        """
+        Unmaps the file.
+        """
+        self._map.close()
+
+    def isWin(self, squares: List[int], strongToMove: bool) -> bool:
+        """
+        Returns True if the stronger side wins the position given as the
+        stronger king, lone king and pieces squares with the stronger side as white.
+        """
+        row, king = _fileRow(self._name, squares)
+        bit = ((0 if strongToMove else self._rows) + row) * 64 + king
+        return bool(self._map[bit >> 3] >> (bit & 7) & 1)
+
+
+_bitbases: Dict[str, Optional[Bitbase]] = {}
+_bitbasesLock = threading.Lock()
+
+
+def _openBitbase(name: str) -> Optional[Bitbase]:
+    """
+    Returns the bitbase of the ending from BITBASE_DIR, or None if it has not been generated.
+    """
+    if name not in _bitbases:
+        with _bitbasesLock:
+            if name not in _bitbases:
+                try:
+                    _bitbases[name] = Bitbase(BITBASE_DIR / f"{name}.bin", name)
+                except (OSError, ValueError):
+                    _bitbases[name] = None
+    return _bitbases[name]
+
+
+def probe(position: Position) -> Optional[int]:
+    """
+    Returns WIN, DRAW or LOSS for the side to move from the bitbases, or
+    None if the position is not in one. The fifty-move rule is not taken
+    into account.
+    """
+    if position.occupancy[2].bit_count() > MAX_PIECES or position.castling:
+        return None
+    pieces = position.pieces
+    # Pawns on the first or last rank have no entry.
+    if (pieces[pieceIndex(WHITE, PAWN)] | pieces[pieceIndex(BLACK, PAWN)]) & _BACK_RANKS:
+        return None
+    if position.occupancy[BLACK] == pieces[pieceIndex(BLACK, KING)]:
+        strong, flip = WHITE, 0
+    elif position.occupancy[WHITE] == pieces[pieceIndex(WHITE, KING)]:
+        strong, flip = BLACK, 56
+    else:
+        return None
+    name = _SIGNATURES.get(tuple(pieces[pieceIndex(strong, pieceType)].bit_count() for pieceType in range(5)))
+    bitbase = _openBitbase(name) if name is not None else None
+    if bitbase is None:
+        return None
+    squares = [lsb(pieces[pieceIndex(strong, KING)]) ^ flip, lsb(pieces[pieceIndex(1 - strong, KING)]) ^ flip]
+    squares += [lsb(pieces[pieceIndex(strong, pieceType)]) ^ flip for pieceType in ENDGAMES[name]]
+    strongToMove = position.sideToMove == strong
+    if not bitbase.isWin(squares, strongToMove):
+        return DRAW
+    return WIN if strongToMove else LOSS
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Generates bitbases from the command line and returns the exit code.
+    """
+    parser = argparse.ArgumentParser(description="Generate endgame bitbases by retrograde analysis.")
+    parser.add_argument("endings", nargs="*", metavar="ending",
+                        help=f"endings to generate from {', '.join(ENDGAMES)} (default: all)")
+    parser.add_argument("--dir", default=str(BITBASE_DIR), help=f"output directory (default: {BITBASE_DIR})")
+    args = parser.parse_args(argv)
+    for name in args.endings:
+        if name not in ENDGAMES:
+            parser.error(f"unknown ending {name}")
+    directory = pathlib.Path(args.dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    generated = {}
+    for name in args.endings or ENDGAMES:
+        start = time.perf_counter()
+        strong, weak = generateBitbase(name, generated)
+        writeBitbase(directory / f"{name}.bin", name, strong, weak)
+        wins = sum(strong[row].bit_count() for row in _fileRows(name))
+        print(f"{name:<5} {wins:>9} wins with the stronger side to move {time.perf_counter() - start:8.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,24 @@
-import itertools
-from typing import List, Tuple, Optional, Iterable
-import pygame
+from typing import Dict, List, Tuple, Optional, Iterable, TYPE_CHECKING
 from piece import Piece, PieceColor, PieceType
+from position import Position, pieceIndex, colorOf, typeOf, toSquare, toPosition, iterSquares
+from pgn import PGNGame, gameToPGN
+from bitbase import probe
+from move import moveFrom, moveTo, moveFlags, isCapture, isPromotion, promotionType, KING_CASTLE, QUEEN_CASTLE, EN_PASSANT
 
-# TODO: Implement PGN notation
+if TYPE_CHECKING:
+    import pygame
 
 class ChessBoard:
-    def __init__(self) -> None:
+    def __init__(self, flipped: bool = False) -> None:
         self._board = [[None for _ in range(8)] for _ in range(8)]
         self._moves = []
         self._captured = {"WHITE": [], "BLACK": []}
+        self._position = Position()
+        self._undo = []
+        # Board rows are stored as seen by the player. When the player plays
+        # black the ranks are mirrored so the position stays in standard
+        # orientation with white on the first rank.
+        self._flip = 56 if flipped else 0
         
     def __str__(self) -> str:
         retStr = "  a b c d e f g h\n"
@@ -26,14 +35,18 @@ class ChessBoard:
         return "\n".join(["".join([repr(self._board[y][x]) if self._board[y][x] is not None else " " for x in range(8)]) for y in range(8)])
     
     def __getitem__(self, key: Tuple[str, int]) -> Optional[Piece]:
-        row = key[1]-1
-        col = ord(key[0].lower()) - ord('a')
-        return self._board[row][col]
+        try:
+            square = toSquare(key)
+        except KeyError:
+            return None
+        return self._board[square >> 3][square & 7]
     
     def __setitem__(self, key: Tuple[str, int], value: Piece) -> None:
-        row = key[1]-1
-        col = ord(key[0].lower()) - ord('a')
-        self._board[row][col] = value
+        square = toSquare(key)
+        self._board[square >> 3][square & 7] = value
+        self._position.removePiece(square ^ self._flip)
+        if value is not None:
+            self._position.putPiece(square ^ self._flip, _pieceIndex(value))
         
     def __iter__(self) -> Iterable[Piece]:
         for row in self._board:
@@ -48,6 +61,20 @@ class ChessBoard:
         """
         return self._board
     
+    @property
+    def position(self) -> Position:
+        """
+        Returns the bitboard position backing the board.
+        """
+        return self._position
+    
+    @property
+    def flipped(self) -> bool:
+        """
+        Returns True if the ranks are mirrored for a black player.
+        """
+        return self._flip != 0
+    
     @property
     def moves(self) -> List[Tuple[str, int]]:
         """
@@ -82,6 +109,18 @@ class ChessBoard:
         """
         return self[position] is not None
 
+    def toSquare(self, position: Tuple[str, int]) -> int:
+        """
+        Converts a board position to a square index of the backing position.
+        """
+        return toSquare(position) ^ self._flip
+    
+    def toPosition(self, square: int) -> Tuple[str, int]:
+        """
+        Converts a square index of the backing position to a board position.
+        """
+        return toPosition(square ^ self._flip)
+
     def isValidPosition(self, position: Tuple[str, int]) -> bool:
         """
         Returns True if the position is valid.
@@ -90,102 +129,159 @@ class ChessBoard:
         col = ord(position[0].lower()) - ord('a')
         return 0 <= row <= 7 and 0 <= col <= 7
     
-    def draw(self, screen: pygame.Surface) -> None:
+    def draw(self, screen: "pygame.Surface") -> None:
         """
         Draws the board.
         """
-        for row, col in itertools.product(range(8), range(8)):
-            if (row + col) % 2 == 0:
-                pygame.draw.rect(screen, (195, 160, 130), ((7 - col) * 100, row * 100, 100, 100))
-            else:
-                pygame.draw.rect(screen, (242, 225, 195), ((7 - col) * 100, row * 100, 100, 100))
-        for piece in self:
-            if piece is not None:
-                piece.draw(screen)
+        from renderer import drawBoard
+        drawBoard(screen, self)
                     
+    def makeMove(self, move: int) -> None:
+        """
+        Plays an encoded move on the position and moves the pieces to match.
+        """
+        fromPosition = self.toPosition(moveFrom(move))
+        toPosition = self.toPosition(moveTo(move))
+        flags = moveFlags(move)
+        piece = self[fromPosition]
+        captured = None
+        if isCapture(move):
+            capturedPosition = self.toPosition(moveTo(move) ^ 8) if flags == EN_PASSANT else toPosition
+            captured = self[capturedPosition]
+            captured.isCaptured = True
+            self._captured[piece.pieceColor.name].append(captured)
+            self._setPiece(capturedPosition, None)
+        self._setPiece(fromPosition, None)
+        piece.move(toPosition)
+        placed = piece
+        if isPromotion(move):
+            placed = Piece(PieceType(promotionType(move) + 1), piece.pieceColor, toPosition)
+        self._setPiece(toPosition, placed)
+        rook = None
+        if flags in (KING_CASTLE, QUEEN_CASTLE):
+            rookFrom = moveTo(move) + 1 if flags == KING_CASTLE else moveTo(move) - 2
+            rookTo = moveTo(move) - 1 if flags == KING_CASTLE else moveTo(move) + 1
+            rook = self[self.toPosition(rookFrom)]
+            self._setPiece(self.toPosition(rookFrom), None)
+            rook.move(self.toPosition(rookTo))
+            self._setPiece(self.toPosition(rookTo), rook)
+            self._moves.append(("O-O" if flags == KING_CASTLE else "O-O-O", piece.pieceColor))
+        else:
+            self._moves.append((fromPosition, toPosition))
+        self._position.makeMove(move)
+        self._undo.append((piece, captured, rook))
+        
+    def unmakeMove(self) -> None:
+        """
+        Takes back the last move played with makeMove.
+        """
+        move = self._position.unmakeMove()
+        piece, captured, rook = self._undo.pop()
+        self._setPiece(self.toPosition(moveTo(move)), None)
+        piece.undoMove()
+        self._setPiece(piece.piecePosition, piece)
+        if captured is not None:
+            captured.isCaptured = False
+            self._captured[piece.pieceColor.name].pop()
+            self._setPiece(captured.piecePosition, captured)
+        if rook is not None:
+            self._setPiece(rook.piecePosition, None)
+            rook.undoMove()
+            self._setPiece(rook.piecePosition, rook)
+        self._moves.pop()
+        
+    def _setPiece(self, position: Tuple[str, int], piece: Optional[Piece]) -> None:
+        """
+        Places the piece without touching the bitboards, which makeMove keeps in sync.
+        """
+        square = toSquare(position)
+        self._board[square >> 3][square & 7] = piece
+    
     def getPieces(self, color: PieceColor) -> List[Piece]:
         """
         Returns the pieces of the given color.
         """
-        return [piece for piece in self if piece.pieceColor == color]
+        squares = iterSquares(self._position.occupancy[color.value - 1])
+        return [self[self.toPosition(square)] for square in squares]
     
     def toFEN(self) -> str:
         """
-        Returns the FEN representation of the board.
+        Returns the FEN representation of the board with all six fields.
         """
-        fen = ""
-        for row in range(8):
-            empty = 0
-            for col in range(8):
-                if self._board[row][col] is None:
-                    empty += 1
-                else:
-                    if empty != 0:
-                        fen += str(empty)
-                        empty = 0
-                    fen += repr(self._board[row][col])
-            if empty != 0:
-                fen += str(empty)
-            if row != 7:
-                fen += "/"
-        return fen
-    
-    def _toSpaces(self, fen: str) -> str:
-        """
-        Converts the FEN representation to spaces.
-        """
-        return "".join(" " * int(char) if char.isdigit() else char for char in fen)
-    
-    # TODO: Fix this
+        return self._position.toFEN()
+    
     def fromFEN(self, fen: str) -> None:
         """
         Sets the board to the given FEN representation.
+
+        Raises:
+            ValueError: If the FEN string is malformed.
+        """
+        # setFEN validates before it assigns anything, so a bad FEN leaves the board as it was.
+        self._position.setFEN(fen)
+        self._loadPieces()
+    
+    def toBytes(self) -> bytes:
+        """
+        Returns the position of the board packed into position.PACKED_SIZE bytes.
+
+        Raises:
+            ValueError: If the position cannot be packed.
+        """
+        return self._position.toBytes()
+    
+    def fromBytes(self, data: bytes) -> None:
         """
-        self.reset()
-        rows = self._toSpaces(fen).split("/")
-        for row, col in itertools.product(range(8), range(8)):
-            if rows[row][col] != " ":
-                col = chr(ord('a') + col)
-                print(row, col)
-                self._board[row][col] = self._fenCharToPiece(rows[col][row], (col, row))
-                print(self._board[row][col])
+        Sets the board to a position packed by toBytes.
+
+        Raises:
+            ValueError: If the data is not a packed position.
+        """
+        self._position.setBytes(data)
+        self._loadPieces()
+    
+    def _loadPieces(self) -> None:
+        """
+        Replaces the pieces, moves and captures with those of the position, which was set directly.
+        """
+        self._board = [[None for _ in range(8)] for _ in range(8)]
         self._moves = []
         self._captured = {"WHITE": [], "BLACK": []}
-        
-    def _fenCharToPiece(self, fenChar: str, position: Tuple[str, int]) -> Optional[Piece]:
-        if fenChar.isupper():
-            match fenChar:
-                case "P":
-                    return Piece(PieceType.PAWN, PieceColor.WHITE, position)
-                case "R":
-                    return Piece(PieceType.ROOK, PieceColor.WHITE, position)
-                case "N":
-                    return Piece(PieceType.KNIGHT, PieceColor.WHITE, position)
-                case "B":
-                    return Piece(PieceType.BISHOP, PieceColor.WHITE, position)
-                case "Q":
-                    return Piece(PieceType.QUEEN, PieceColor.WHITE, position)
-                case "K":
-                    return Piece(PieceType.KING, PieceColor.WHITE, position)
-        else:
-            match fenChar:
-                case "p":
-                    return Piece(PieceType.PAWN, PieceColor.BLACK, position)
-                case "r":
-                    return Piece(PieceType.ROOK, PieceColor.BLACK, position)
-                case "n":
-                    return Piece(PieceType.KNIGHT, PieceColor.BLACK, position)
-                case "b":
-                    return Piece(PieceType.BISHOP, PieceColor.BLACK, position)
-                case "q":
-                    return Piece(PieceType.QUEEN, PieceColor.BLACK, position)
-                case "k":
-                    return Piece(PieceType.KING, PieceColor.BLACK, position)
-    
-    def reset(self) -> None:
-        """
-        Resets the board.
+        self._undo = []
+        for square, piece in self._position.pieceList():
+            boardPosition = self.toPosition(square)
+            pieceType, pieceColor = PieceType(typeOf(piece) + 1), PieceColor(colorOf(piece) + 1)
+            self._setPiece(boardPosition, Piece(pieceType, pieceColor, boardPosition))
+    
+    def toPGN(self, headers: Optional[Dict[str, str]] = None) -> str:
+        """
+        Returns the moves played on the board as a PGN game with the given tags.
+        """
+        return gameToPGN(PGNGame.fromPosition(self._position, headers))
+    
+    def probeEndgame(self) -> Optional[int]:
+        """
+        Returns WIN, DRAW or LOSS of the bitbase module for the side to move, or None if no bitbase holds the position.
+        """
+        return probe(self._position)
+    
+    def reset(self, flipped: Optional[bool] = None) -> None:
+        """
+        Resets the board to empty. If flipped is given, the ranks are
+        mirrored for a black player from then on; the orientation only
+        changes here, while no pieces are on the board.
         """
         self._board = [[None for _ in range(8)] for _ in range(8)]
         self._moves = []
-        self._captured = {"WHITE": [], "BLACK": []}
\ No newline at end of file
+        self._captured = {"WHITE": [], "BLACK": []}
+        self._undo = []
+        self._position.clear()
+        if flipped is not None:
+            self._flip = 56 if flipped else 0
+
+
+def _pieceIndex(piece: Piece) -> int:
+    """
+    Returns the bitboard index of the piece.
+    """
+    return pieceIndex(piece.pieceColor.value - 1, piece.pieceType.value - 1)
@@ -0,0 +1,176 @@
+import argparse
+import mmap
+import os
+import pathlib
+import struct
+import sys
+from typing import Iterable, Iterator, List, Optional, Union
+from position import Position, PACKED_SIZE
+from pgn import readGames
+
+# Dataset files: a 16-byte header of magic, version and record size, then
+# one Position.toBytes record per position. Fixed-width records make the
+# n-th position a multiplication away, so the file is memory-mapped and
+# sliced instead of being read.
+DATASET_MAGIC = b"CPY2DATA"
+DATASET_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+HEADER_SIZE = _HEADER.size
+
+
+class PositionDataset:
+    """
+    Read-only view of a dataset file of packed positions.
+
+    The file is memory-mapped, so opening it reads nothing and positions are
+    decoded only when indexed or iterated. Slicing returns another dataset
+    over the same mapping without copying, and records exposes the raw
+    records for tools such as numpy.frombuffer. The views share the mapping
+    and must not be used after close.
+
+    Raises:
+        OSError: If the file cannot be opened.
+        ValueError: If the file is not a dataset.
+    """
+    def __init__(self, path) -> None:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            header = file.read(HEADER_SIZE)
+            if len(header) != HEADER_SIZE:
+                raise ValueError(f"{path} is not a position dataset.")
+            magic, version, recordSize = _HEADER.unpack(header)
+            if magic != DATASET_MAGIC or version != DATASET_VERSION or recordSize != PACKED_SIZE:
+                raise ValueError(f"{path} is not a version {DATASET_VERSION} position dataset.")
+            if (size - HEADER_SIZE) % PACKED_SIZE:
+                raise ValueError(f"{path} ends in a partial record.")
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._records = memoryview(self._map)[HEADER_SIZE:]
+        self._indexes = range((size - HEADER_SIZE) // PACKED_SIZE)
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Position, "PositionDataset"]:
+        if isinstance(key, slice):
+            view = PositionDataset.__new__(PositionDataset)
+            view._map = self._map
+            view._records = self._records[:]
+            view._indexes = self._indexes[key]
+            return view
+        offset = self._indexes[key] * PACKED_SIZE
+        return Position.fromBytes(self._records[offset:offset + PACKED_SIZE])
+
+    def __iter__(self) -> Iterator[Position]:
+        records = self._records
+        for index in self._indexes:
+            offset = index * PACKED_SIZE
+            yield Position.fromBytes(records[offset:offset + PACKED_SIZE])
+
+    def __enter__(self) -> "PositionDataset":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def records(self) -> memoryview:
+        """
+        Returns the PACKED_SIZE-byte records of the dataset as one memoryview into the mapping.
+
+        Raises:
+            ValueError: If the dataset is a slice with a step other than 1.
+        """
+        indexes = self._indexes
+        if indexes.step != 1 and len(indexes) > 1:
+            raise ValueError("Only contiguous datasets have a single block of records.")
+        start = indexes.start if indexes else 0
+        return self._records[start * PACKED_SIZE:(start + len(indexes)) * PACKED_SIZE]
+
+    def close(self) -> None:
+        """
+        Releases the memoryview of this dataset and unmaps the file if no
+        other view or record memoryview still uses it.
+        """
+        self._records.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+
+def writeDataset(path, positions: Iterable[Position]) -> int:
+    """
+    Writes the positions to a dataset file, streaming them, and returns how many were written.
+
+    Raises:
+        ValueError: If a position cannot be packed.
+    """
+    count = 0
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(DATASET_MAGIC, DATASET_VERSION, PACKED_SIZE))
+        for position in positions:
+            file.write(position.toBytes())
+            count += 1
+    return count
+
+
+def _gamePositions(file) -> Iterator[Position]:
+    """
+    Yields every position of the main lines of the PGN games in the file,
+    starting positions included. The same Position is yielded again after
+    each move, so pack it before taking the next one.
+    """
+    for game in readGames(file):
+        try:
+            position = game.startingPosition()
+        except ValueError:
+            continue
+        yield position
+        for move in game.moves:
+            position.makeMove(move)
+            yield position
+
+
+def readFENPositions(file) -> Iterator[Position]:
+    """
+    Yields the position of every FEN or EPD line of the file; EPD operations are ignored.
+
+    Raises:
+        ValueError: If a line is neither.
+    """
+    for line in file:
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            position = Position.fromFEN(" ".join(fields[:6]))
+        except ValueError:
+            # EPD lines have four position fields followed by operations.
+            position = Position.fromFEN(" ".join(fields[:4]))
+        yield position
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Converts FEN, EPD or PGN files to a dataset from the command line and returns the exit code.
+    """
+    parser = argparse.ArgumentParser(description="Pack the positions of FEN, EPD or PGN files into a dataset.")
+    parser.add_argument("input", help="FEN or EPD file with one position per line, or PGN file")
+    parser.add_argument("output", help="dataset file to write")
+    parser.add_argument("--format", choices=("fen", "pgn"), default=None,
+                        help="input format (default: from the file extension)")
+    args = parser.parse_args(argv)
+    fileFormat = args.format or ("pgn" if pathlib.Path(args.input).suffix.lower() == ".pgn" else "fen")
+    with open(args.input, errors="replace") as file:
+        positions = _gamePositions(file) if fileFormat == "pgn" else readFENPositions(file)
+        try:
+            count = writeDataset(args.output, positions)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+    print(f"{count} positions written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
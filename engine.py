@@ -0,0 +1,461 @@
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+from position import Position, WHITE, PAWN, ROOK, KNIGHT, BISHOP, QUEEN, EMPTY, iterSquares
+from movegen import generateLegalMoves, generateLegalCaptures, generateLegalQuiets, isInCheck
+from move import isCapture, promotionType, NULL_MOVE
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from bitbase import probe as probeBitbase, DRAW, MAX_PIECES as MAX_BITBASE_PIECES
+
+MATE_SCORE = 30000
+# Scores beyond this are mate in some number of plies.
+MATE_BOUND = MATE_SCORE - 1000
+INFINITY = 32000
+# Added to the evaluation of bitbase wins so they rank above any material gain but below mates.
+KNOWN_WIN = 10000
+MAX_DEPTH = 64
+# Quiet moves that caused a beta cutoff, remembered per ply.
+KILLER_MOVES = 2
+
+# Indexed by piece type: PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING.
+PIECE_VALUES = (100, 500, 320, 330, 900, 0)
+
+# Search depth and seconds per move for computer levels 1-10.
+LEVEL_LIMITS = ((1, 0.1), (2, 0.2), (2, 0.4), (3, 0.6), (3, 1.0),
+                (4, 1.5), (4, 2.5), (5, 4.0), (6, 6.0), (MAX_DEPTH, 10.0))
+
+# Piece-square tables as seen by white, eighth rank first.
+_PAWN_TABLE = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0)
+_KNIGHT_TABLE = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50)
+_BISHOP_TABLE = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20)
+_ROOK_TABLE = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0)
+_QUEEN_TABLE = (
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20)
+_KING_TABLE = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20)
+_KING_ENDGAME_TABLE = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50)
+
+
+def _buildTables(kingTable: Tuple[int, ...]) -> List[List[int]]:
+    """
+    Returns material plus placement per piece index and square, positive for
+    white pieces and negative for black ones.
+    """
+    tables = [_PAWN_TABLE, _ROOK_TABLE, _KNIGHT_TABLE, _BISHOP_TABLE, _QUEEN_TABLE, kingTable]
+    scores = []
+    for color in range(2):
+        for pieceType in range(6):
+            table = tables[pieceType]
+            if color == WHITE:
+                scores.append([PIECE_VALUES[pieceType] + table[square ^ 56] for square in range(64)])
+            else:
+                scores.append([-PIECE_VALUES[pieceType] - table[square] for square in range(64)])
+    return scores
+
+
+_MIDDLEGAME_SCORES = _buildTables(_KING_TABLE)
+_ENDGAME_SCORES = _buildTables(_KING_ENDGAME_TABLE)
+
+
+def evaluate(position: Position) -> int:
+    """
+    Returns the static evaluation in centipawns from the side to move's point of view.
+    """
+    pieces = position.pieces
+    queens = pieces[QUEEN] | pieces[6 + QUEEN]
+    minors = pieces[ROOK] | pieces[KNIGHT] | pieces[BISHOP] | pieces[6 + ROOK] | pieces[6 + KNIGHT] | pieces[6 + BISHOP]
+    endgame = not queens or (not queens & (queens - 1) and minors.bit_count() <= 2)
+    scores = _ENDGAME_SCORES if endgame else _MIDDLEGAME_SCORES
+    score = 0
+    for piece in range(12):
+        table = scores[piece]
+        for square in iterSquares(pieces[piece]):
+            score += table[square]
+    return score if position.sideToMove == WHITE else -score
+
+
+def _material(position: Position) -> Tuple[int, ...]:
+    return tuple(pieces.bit_count() for pieces in position.pieces)
+
+
+def _captureOrder(squares: List[int], move: int) -> int:
+    """
+    Returns the MVV-LVA sort key of a capture or promotion: the most valuable
+    victim first and, among equal victims, the least valuable attacker.
+    Promotions count as capturing the difference to a pawn.
+    """
+    order = -PIECE_VALUES[squares[move & 63] % 6]
+    if move & 0x4000:
+        victim = squares[(move >> 6) & 63]
+        # The square of an en passant capture is empty.
+        order += 100 * PIECE_VALUES[victim % 6 if victim != EMPTY else PAWN]
+    if move & 0x8000:
+        order += 100 * (PIECE_VALUES[promotionType(move)] - PIECE_VALUES[PAWN])
+    return order
+
+
+def _scoreToTable(score: int, ply: int) -> int:
+    # Mate scores are stored relative to the node so they stay valid at any ply.
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _scoreFromTable(score: int, ply: int) -> int:
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def levelLimits(level: int) -> Tuple[int, float]:
+    """
+    Returns the search depth and seconds per move for a computer level from 1 to 10.
+    """
+    level = min(max(int(round(level)), 1), len(LEVEL_LIMITS))
+    return LEVEL_LIMITS[level - 1]
+
+
+class Search:
+    """
+    Negamax alpha-beta search with quiescence and iterative deepening.
+    Moves are tried hash move first, then captures by MVV-LVA, then
+    killer moves and quiet moves by history score.
+
+    The search plays moves on the given position with makeMove/unmakeMove
+    and leaves it unchanged when it returns. stop() may be called from
+    another thread to end the search early, as does setting stopEvent, a
+    threading or multiprocessing Event. Results are kept in the given
+    transposition table, which may be reused across searches.
+    """
+    def __init__(self, position: Position, table: Optional[TranspositionTable] = None, stopEvent=None) -> None:
+        self._position = position
+        self._table = table if table is not None else TranspositionTable()
+        self._stopEvent = stopEvent
+        self._nodes = 0
+        self._stopped = False
+        self._deadline = None
+        self._nodeLimit = None
+        self._pv = [[] for _ in range(MAX_DEPTH + 1)]
+        self._rootMoves = []
+        self._rootMaterial = None
+        self._killers = [[NULL_MOVE] * KILLER_MOVES for _ in range(MAX_DEPTH + 1)]
+        # Indexed by side to move << 12 | from | to << 6.
+        self._history = [0] * 8192
+
+    @property
+    def nodes(self) -> int:
+        """
+        Returns the number of nodes searched so far.
+        """
+        return self._nodes
+
+    @property
+    def table(self) -> TranspositionTable:
+        """
+        Returns the transposition table of the search.
+        """
+        return self._table
+
+    def stop(self) -> None:
+        """
+        Asks the search to return as soon as possible.
+        """
+        self._stopped = True
+
+    def run(self, maxDepth: int = MAX_DEPTH, timeLimit: Optional[float] = None, nodeLimit: Optional[int] = None,
+            callback: Optional[Callable[[int, int, int, float, List[int]], None]] = None,
+            startDepth: int = 1) -> Tuple[int, int]:
+        """
+        Searches to increasing depths until a limit is reached and returns the
+        best move with its score. The best move is NULL_MOVE if there is no
+        legal move.
+
+        callback is called after every completed depth with the depth, the
+        score, the node count, the elapsed seconds and the principal variation.
+        startDepth lets parallel helpers begin deeper than the main search.
+        """
+        start = time.perf_counter()
+        self._nodes = 0
+        self._stopped = False
+        self._deadline = start + timeLimit if timeLimit is not None else None
+        self._nodeLimit = nodeLimit
+        self._table.newSearch()
+        self._killers = [[NULL_MOVE] * KILLER_MOVES for _ in range(MAX_DEPTH + 1)]
+        self._history = [0] * 8192
+        rootMoves = generateLegalMoves(self._position)
+        if not rootMoves:
+            return NULL_MOVE, -MATE_SCORE if isInCheck(self._position) else 0
+        rootMoves = self._bitbaseMoves(rootMoves)
+        squares = self._position.squares
+        rootMoves.sort(key=lambda move: _captureOrder(squares, move) if move & 0xC000 else -INFINITY, reverse=True)
+        self._rootMoves = rootMoves
+        bestMove, bestScore = rootMoves[0], 0
+        for depth in range(min(startDepth, maxDepth), min(maxDepth, MAX_DEPTH) + 1):
+            score = self._negamax(depth, -INFINITY, INFINITY, 0, bestMove)
+            if self._stopped and depth > startDepth:
+                break
+            if self._pv[0]:
+                bestMove, bestScore = self._pv[0][0], score
+            if callback is not None:
+                callback(depth, score, self._nodes, time.perf_counter() - start, self._pv[0][:])
+            if self._stopped or abs(score) >= MATE_BOUND or len(rootMoves) == 1:
+                break
+        return bestMove, bestScore
+
+    def _bitbaseMoves(self, moves: List[int]) -> List[int]:
+        """
+        Returns the root moves that keep the bitbase result of a root
+        position in a bitbase, all moves for any other position.
+        """
+        position = self._position
+        result = probeBitbase(position) if position.occupancy[2].bit_count() <= MAX_BITBASE_PIECES else None
+        self._rootMaterial = _material(position) if result is not None else None
+        if result is None:
+            return moves
+        kept = []
+        for move in moves:
+            position.makeMove(move)
+            # Captures of the last piece leave a bare king draw outside the bitbases.
+            childResult = probeBitbase(position)
+            position.unmakeMove()
+            if -(childResult or DRAW) == result:
+                kept.append(move)
+        return kept or moves
+
+    def _probe(self, ply: int) -> Optional[int]:
+        """
+        Returns the score of a position in a bitbase, or None if it is not
+        in one. Draws are exact. A win or loss is only scored once the search
+        converts into another ending; in the ending of the root the search
+        has to find the way to mate itself.
+        """
+        position = self._position
+        if ply == 0 or position.occupancy[2].bit_count() > MAX_BITBASE_PIECES:
+            return None
+        result = probeBitbase(position)
+        if result is None or (result != DRAW and _material(position) == self._rootMaterial):
+            return None
+        if result == DRAW:
+            return 0
+        return evaluate(position) + result * KNOWN_WIN
+
+    def _orderedMoves(self, ply: int, hashMove: int) -> Iterator[int]:
+        """
+        Yields the legal moves in search order, generated in stages so a
+        cutoff skips the later ones: the hash move, captures and promotions
+        by MVV-LVA, the killer moves of the ply, then the other quiet moves
+        by history score. The table checks the full key, so the hash move
+        is tried before any move is generated.
+        """
+        position = self._position
+        squares = position.squares
+        us = position.sideToMove
+        if hashMove != NULL_MOVE:
+            piece = squares[hashMove & 63]
+            if piece != EMPTY and piece // 6 == us:
+                yield hashMove
+        captures = generateLegalCaptures(position)
+        captures.sort(key=lambda move: _captureOrder(squares, move), reverse=True)
+        for move in captures:
+            if move != hashMove:
+                yield move
+        quiets = generateLegalQuiets(position)
+        killers = [move for move in self._killers[ply] if move != hashMove and move in quiets]
+        yield from killers
+        history = self._history
+        side = us << 12
+        quiets.sort(key=lambda move: history[side | move & 0xFFF], reverse=True)
+        for move in quiets:
+            if move != hashMove and move not in killers:
+                yield move
+
+    def _storeCutoff(self, move: int, depth: int, ply: int) -> None:
+        """
+        Remembers a quiet move that caused a beta cutoff as a killer of the
+        ply and raises its history score.
+        """
+        if move & 0xC000:
+            return
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1:] = killers[:-1]
+            killers[0] = move
+        self._history[self._position.sideToMove << 12 | move & 0xFFF] += depth * depth
+
+    def _checkLimits(self) -> None:
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            self._stopped = True
+        if self._nodeLimit is not None and self._nodes >= self._nodeLimit:
+            self._stopped = True
+        if self._stopEvent is not None and self._stopEvent.is_set():
+            self._stopped = True
+
+    def _negamax(self, depth: int, alpha: int, beta: int, ply: int, firstMove: int = NULL_MOVE) -> int:
+        position = self._position
+        self._pv[ply] = []
+        if ply > 0 and (position.halfmoveClock >= 100 or position.repetitions()):
+            return 0
+        score = self._probe(ply)
+        if score is not None:
+            return score
+        inCheck = isInCheck(position)
+        if inCheck:
+            depth += 1
+        if depth <= 0 or ply >= MAX_DEPTH:
+            return self._quiesce(alpha, beta, ply)
+        self._nodes += 1
+        if self._nodes & 1023 == 0:
+            self._checkLimits()
+
+        key = position.key
+        entry = self._table.probe(key)
+        if entry is not None:
+            tableMove, tableScore, tableDepth, bound = entry
+            if ply > 0 and tableDepth >= depth:
+                tableScore = _scoreFromTable(tableScore, ply)
+                if (bound == EXACT or (bound == LOWER and tableScore >= beta)
+                        or (bound == UPPER and tableScore <= alpha)):
+                    return tableScore
+            if firstMove == NULL_MOVE:
+                firstMove = tableMove
+
+        if ply > 0:
+            moves = self._orderedMoves(ply, firstMove)
+        else:
+            moves = self._rootMoves[:]
+            if firstMove in moves:
+                moves.remove(firstMove)
+                moves.insert(0, firstMove)
+
+        originalAlpha = alpha
+        bestScore = -INFINITY
+        bestMove = NULL_MOVE
+        for move in moves:
+            position.makeMove(move)
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            position.unmakeMove()
+            if self._stopped:
+                return 0
+            if score > bestScore:
+                bestScore = score
+                bestMove = move
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if score >= beta:
+                        self._storeCutoff(move, depth, ply)
+                        break
+        if bestMove == NULL_MOVE:
+            return -MATE_SCORE + ply if inCheck else 0
+        if bestScore >= beta:
+            bound = LOWER
+        elif bestScore > originalAlpha:
+            bound = EXACT
+        else:
+            bound = UPPER
+            bestMove = NULL_MOVE
+        self._table.store(key, bestMove, _scoreToTable(bestScore, ply), depth, bound)
+        return bestScore
+
+    def _quiesce(self, alpha: int, beta: int, ply: int) -> int:
+        position = self._position
+        self._nodes += 1
+        if self._nodes & 1023 == 0:
+            self._checkLimits()
+        score = self._probe(ply)
+        if score is not None:
+            return score
+        squares = position.squares
+        if ply < MAX_DEPTH and isInCheck(position):
+            # A side in check may not stand pat, so every evasion is searched.
+            moves = generateLegalMoves(position)
+            if not moves:
+                return -MATE_SCORE + ply
+            moves.sort(key=lambda move: _captureOrder(squares, move) if move & 0xC000 else -INFINITY, reverse=True)
+        else:
+            standPat = evaluate(position)
+            if standPat >= beta or ply >= MAX_DEPTH:
+                return standPat
+            if standPat > alpha:
+                alpha = standPat
+            # Biggest victims first keeps the capture tree small.
+            moves = [move for move in generateLegalCaptures(position) if isCapture(move)]
+            moves.sort(key=lambda move: _captureOrder(squares, move), reverse=True)
+        for move in moves:
+            position.makeMove(move)
+            score = -self._quiesce(-beta, -alpha, ply + 1)
+            position.unmakeMove()
+            if self._stopped:
+                return 0
+            if score > alpha:
+                if score >= beta:
+                    return score
+                alpha = score
+        return alpha
+
+
+def findBestMove(position: Position, level: int, table: Optional[TranspositionTable] = None, stopEvent=None,
+                 callback: Optional[Callable[[int, int, int, float, List[int]], None]] = None) -> int:
+    """
+    Returns the move the engine plays at the given computer level, or NULL_MOVE if there is none.
+    """
+    depth, seconds = levelLimits(level)
+    move, _ = Search(position.copy(), table, stopEvent).run(depth, seconds, callback=callback)
+    return move
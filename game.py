@@ -1,23 +1,42 @@
-import pygame
+import os
+import time
 from piece import Piece, PieceColor, PieceType
 from board import ChessBoard
-from typing import List, Tuple, Optional, Dict
+from position import WHITE, BLACK, ALL_CASTLING, WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+from movegen import generateLegalMoves, isInCheck
+from perft import perft, divide
+from engine import findBestMove, levelLimits
+from parallel import ParallelSearch
+from transposition import TranspositionTable, DEFAULT_SIZE_MB
+from worker import EngineWorker
+from book import OpeningBook, DEFAULT_BOOK
+from concurrent.futures import Future
+from move import NULL_MOVE
+from move import moveFrom, moveTo
+from typing import Callable, List, Tuple, Optional, Dict, TYPE_CHECKING
 
-# TODO: Implement computer player as stockfish with stockfishpy module
+if TYPE_CHECKING:
+    import pygame
 
 class ChessGame:
-    def __init__(self, playerColor: PieceColor, computerLevel: int):
-        self._board = ChessBoard()
+    def __init__(self, playerColor: PieceColor, computerLevel: int, hashSize: float = DEFAULT_SIZE_MB,
+                 workers: int = 1, book: Optional[str] = DEFAULT_BOOK):
+        self._board = ChessBoard(flipped=playerColor == PieceColor.BLACK)
         self._playerColor = playerColor
         self._computerLevel = computerLevel
+        self._table = TranspositionTable(hashSize)
+        self._parallel = None
+        self._worker = None
+        self.workers = workers
+        self._book = None
+        if book is not None and os.path.exists(book):
+            self.book = book
         self._initWhites()
         self._initBlacks()
+        self.board.position.castling = ALL_CASTLING
+        self.board.position.updateKey()
         self._selected = None
-        self._turn = PieceColor.WHITE
-        self._castling = {PieceColor.WHITE: { PieceType.KING: True, PieceType.QUEEN: True }, 
-                          PieceColor.BLACK: { PieceType.KING: True, PieceType.QUEEN: True }}
-        self._kingPos = {PieceColor.WHITE: (None, None), PieceColor.BLACK: (None, None)}
-        self._checkMoves = [] # List of moves that are in check
+        self._available = (None, None, [])
         
     @property
     def board(self) -> ChessBoard:
@@ -45,14 +64,18 @@ class ChessGame:
         """
         Returns the turn.
         """
-        return self._turn
+        return PieceColor(self.board.position.sideToMove + 1)
 
     @property
-    def castling(self) -> Dict[str, Dict[str, bool]]:
+    def castling(self) -> Dict[PieceColor, Dict[PieceType, bool]]:
         """
         Returns the castling status.
         """
-        return self._castling
+        rights = self.board.position.castling
+        return {PieceColor.WHITE: {PieceType.KING: rights & WHITE_KINGSIDE != 0,
+                                   PieceType.QUEEN: rights & WHITE_QUEENSIDE != 0},
+                PieceColor.BLACK: {PieceType.KING: rights & BLACK_KINGSIDE != 0,
+                                   PieceType.QUEEN: rights & BLACK_QUEENSIDE != 0}}
     
     @property
     def playerColor(self) -> PieceColor:
@@ -84,32 +107,199 @@ class ChessGame:
         self._computerLevel = level
         
     @property
-    def checkMoves(self) -> List[Tuple[str, str]]:
+    def book(self) -> Optional[OpeningBook]:
         """
-        Returns the moves that are in check.
+        Returns the Polyglot opening book the computer player plays from, or None if it has none.
         """
-        return self._checkMoves
+        return self._book
     
-    @checkMoves.setter
-    def checkMoves(self, moves: List[Tuple[str, str]]):
+    @book.setter
+    def book(self, path: Optional[str]):
         """
-        Sets the moves that are in check.
+        Opens the Polyglot opening book at the path for the computer player, or drops the book if the path is None.
+
+        Raises:
+            OSError: If the book file cannot be opened.
+            ValueError: If the file is not a Polyglot book.
+        """
+        book = OpeningBook(path) if path is not None else None
+        self.cancelComputerMove(block=True)
+        if self._book is not None:
+            self._book.close()
+        self._book = book
+        
+    @property
+    def transpositionTable(self) -> TranspositionTable:
+        """
+        Returns the transposition table the computer player searches with.
+        """
+        return self._parallel.table if self._parallel is not None else self._table
+    
+    @property
+    def hashSize(self) -> float:
+        """
+        Returns the transposition table size in MB.
+        """
+        return self._table.sizeMB
+    
+    @hashSize.setter
+    def hashSize(self, size: float):
+        """
+        Replaces the transposition table with an empty one of at most the given size in MB.
+        """
+        self._table = TranspositionTable(size)
+        self.workers = self.workers
+        
+    @property
+    def workers(self) -> int:
+        """
+        Returns the number of processes the computer player searches with.
+        """
+        return self._parallel.workers if self._parallel is not None else 1
+    
+    @workers.setter
+    def workers(self, workers: int):
+        """
+        Sets the number of processes the computer player searches with. More than one starts a parallel search.
         """
-        self._checkMoves = moves
+        self.cancelComputerMove(block=True)
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+        if workers > 1:
+            self._parallel = ParallelSearch(workers, self._table.sizeMB)
+        
+    @property
+    def checkMoves(self) -> List[Tuple[Tuple[str, int], Tuple[str, int]]]:
+        """
+        Returns the moves that get the side to move out of check, or an empty list if it is not in check.
+        """
+        if not isInCheck(self.board.position):
+            return []
+        return [(self.board.toPosition(moveFrom(move)), self.board.toPosition(moveTo(move)))
+                for move in self.generateMoves()]
         
     @property
     def kingPositions(self) -> Dict[PieceColor, Tuple[str, int]]:
         """
         Returns the king positions.
         """
-        return self._kingPos
+        position = self.board.position
+        return {PieceColor.WHITE: self.board.toPosition(position.kingSquare(WHITE)),
+                PieceColor.BLACK: self.board.toPosition(position.kingSquare(BLACK))}
+    
+    def isCheck(self) -> bool:
+        """
+        Returns True if the side to move is in check.
+        """
+        return isInCheck(self.board.position)
+    
+    def isCheckmate(self) -> bool:
+        """
+        Returns True if the side to move is checkmated.
+        """
+        return self.isCheck() and not self.generateMoves()
+    
+    def isRepetition(self) -> bool:
+        """
+        Returns True if the current position occurred three times.
+        """
+        return self.board.position.repetitions() >= 2
+    
+    def isGameOver(self) -> bool:
+        """
+        Returns True if the side to move has no legal move or the game is drawn by repetition or the fifty move rule.
+        """
+        return not self.generateMoves() or self.isRepetition() or self.board.position.halfmoveClock >= 100
     
-    @kingPositions.setter
-    def kingPositions(self, positions: Dict[PieceColor, Tuple[str, int]]):
+    def result(self) -> str:
         """
-        Sets the king positions.
+        Returns the game result in PGN notation, "1-0", "0-1", "1/2-1/2" or "*" while the game goes on.
         """
-        self._kingPos = positions
+        if not self.isGameOver():
+            return "*"
+        if self.isCheckmate():
+            return "0-1" if self.turn == PieceColor.WHITE else "1-0"
+        return "1/2-1/2"
+    
+    def toPGN(self) -> str:
+        """
+        Returns the game so far in PGN notation.
+        """
+        computer = f"ChessPy2 level {self._computerLevel}"
+        white, black = ("Player", computer) if self._playerColor == PieceColor.WHITE else (computer, "Player")
+        return self.board.toPGN({"Event": "ChessPy2 game", "Date": time.strftime("%Y.%m.%d"),
+                                 "White": white, "Black": black, "Result": self.result()})
+    
+    def isComputerTurn(self) -> bool:
+        """
+        Returns True if the computer is to move.
+        """
+        return self.turn != self._playerColor
+    
+    def computerMove(self) -> Optional[int]:
+        """
+        Returns the move the computer plays in the current position at its level, or None if there is none.
+        """
+        return self._searchMove(self.board.position.copy())
+    
+    def _searchMove(self, position, stopEvent=None, progress=None) -> Optional[int]:
+        if self._book is not None:
+            # Book moves are played at once, without a search.
+            move = self._book.move(position, self._computerLevel)
+            if move is not None:
+                return move
+        if self._parallel is not None:
+            depth, seconds = levelLimits(self._computerLevel)
+            move, _ = self._parallel.run(position, depth, seconds, callback=progress, stopEvent=stopEvent)
+        else:
+            move = findBestMove(position, self._computerLevel, self._table, stopEvent, progress)
+        return None if move == NULL_MOVE else move
+    
+    def startComputerMove(self, progress: Optional[Callable[[int, int, int, float, List[int]], None]] = None,
+                          onDone: Optional[Callable[[Future], None]] = None) -> Future:
+        """
+        Starts searching the computer's move on a background thread and
+        returns a future for the move, None if there is none. The board is
+        not changed; play the result with makeMove if the position is still
+        the same. progress is called from the worker thread after every
+        completed depth with the depth, score, nodes, seconds and principal
+        variation, and onDone with the future when it is done.
+        """
+        if self._worker is None:
+            self._worker = EngineWorker()
+        position = self.board.position.copy()
+        return self._worker.submit(lambda stopEvent: self._searchMove(position, stopEvent, progress), onDone)
+    
+    def cancelComputerMove(self, block: bool = False) -> None:
+        """
+        Stops the background search early; its future then holds the best move
+        found so far. With block set, waits until the search has stopped.
+        """
+        if self._worker is not None:
+            self._worker.cancel(block)
+    
+    def isThinking(self) -> bool:
+        """
+        Returns True while a background search is running.
+        """
+        return self._worker is not None and self._worker.busy
+    
+    def playComputerMove(self) -> Optional[int]:
+        """
+        Searches and plays the computer's move. Returns the move or None if there is none.
+        """
+        move = self.computerMove()
+        if move is not None:
+            self.deselect()
+            self.makeMove(move)
+        return move
+    
+    def isStalemate(self) -> bool:
+        """
+        Returns True if the side to move has no legal move but is not in check.
+        """
+        return not self.isCheck() and not self.generateMoves()
     
     def _initWhites(self):
         row = 1 if self._playerColor == PieceColor.WHITE else 8
@@ -130,7 +320,6 @@ class ChessGame:
         self.board[("F", pawnRow)] = Piece(PieceType.PAWN, PieceColor.WHITE, ("F", pawnRow))
         self.board[("G", pawnRow)] = Piece(PieceType.PAWN, PieceColor.WHITE, ("G", pawnRow))
         self.board[("H", pawnRow)] = Piece(PieceType.PAWN, PieceColor.WHITE, ("H", pawnRow))
-        self.kingPositions[PieceColor.WHITE] = ("E", row)
         
         
     def _initBlacks(self):
@@ -152,7 +341,6 @@ class ChessGame:
         self.board[("F", pawnRow)] = Piece(PieceType.PAWN, PieceColor.BLACK, ("F", pawnRow))
         self.board[("G", pawnRow)] = Piece(PieceType.PAWN, PieceColor.BLACK, ("G", pawnRow))
         self.board[("H", pawnRow)] = Piece(PieceType.PAWN, PieceColor.BLACK, ("H", pawnRow))
-        self.kingPositions[PieceColor.BLACK] = ("E", row)
         
     def posToBoard(self, position: Tuple[int, int]) -> Tuple[str, int]:
         """
@@ -160,23 +348,38 @@ class ChessGame:
         """
         return chr(position[0]//100 + ord('a')).upper(), abs(position[1]//100 - 8)
     
-    def draw(self, screen):
+    def draw(self, screen: "pygame.Surface") -> None:
         """
         Draws the board to the screen.
         """
-        self.board.draw(screen)
-        self.drawAwaliableMoves(screen)
+        from renderer import drawGame
+        drawGame(screen, self)
         
-    def drawAwaliableMoves(self, screen: pygame.Surface) -> None:
+    def drawAwaliableMoves(self, screen: "pygame.Surface") -> None:
         """
         Draws the available moves to the screen.
         """
-        if self.selected is not None:
-            for move in self.avaliableMoves():
-                screenX = (ord(move[0].lower()) - ord('a')) * 100
-                screenY = (8 - int(move[1])) * 100
-                pygame.draw.circle(screen, (0, 170, 0), (screenX + 50, screenY + 50), 20)
+        from renderer import drawAvailableMoves
+        drawAvailableMoves(screen, self)
         
+    def generateMoves(self) -> List[int]:
+        """
+        Returns every legal move of the side to move without touching the selection.
+        """
+        return generateLegalMoves(self.board.position)
+    
+    def perft(self, depth: int) -> int:
+        """
+        Returns the number of leaf nodes of the legal move tree of the given depth from the current position.
+        """
+        return perft(self.board.position, depth)
+    
+    def divide(self, depth: int) -> Dict[str, int]:
+        """
+        Returns the perft node count below each legal move of the current position.
+        """
+        return divide(self.board.position, depth)
+    
     def select(self, position: Tuple[str, int]) -> Optional[Piece]:
         """
         Selects a piece.
@@ -203,143 +406,50 @@ class ChessGame:
         if self._selected is None:
             return
         oldPos = self._selected.piecePosition
-        availableMoves = self.avaliableMoves()
         if oldPos == position:
             return
-        if position not in availableMoves:
+        move = self._findMove(oldPos, position)
+        if move is None:
             return
-        isCastling = self._isCastlingMove(position, oldPos)
-        if isCastling:
-            temp = self.selected
-            if position == ("G", 1):
-                self.select(("H", 1))
-                self.selected.move(("F", 1))
-                self.board[("H", 1)] = None
-                self.board[("F", 1)] = self.selected
-                self.deselect()
-                self.selected = temp
-                self.board.moves.append(("O-O", self.selected.pieceColor))
-                self.castling[self.selected.pieceColor][PieceType.KING] = False
-            elif position == ("C", 1):
-                self.select(("A", 1))
-                self.selected.move(("D", 1))
-                self.board[("A", 1)] = None
-                self.board[("D", 1)] = self.selected
-                self.deselect()
-                self.selected = temp
-                self.board.moves.append(("O-O-O", self.selected.pieceColor))
-                self.castling[self.selected.pieceColor][PieceType.KING] = False
-            elif position == ("G", 8):
-                self.select(("H", 8))
-                self.selected.move(("F", 8))
-                self.board[("H", 8)] = None
-                self.board[("F", 8)] = self.selected
-                self.deselect()
-                self.selected = temp
-                self.board.moves.append(("O-O", self.selected.pieceColor))
-                self.castling[self.selected.pieceColor][PieceType.KING] = False
-            elif position == ("C", 8):
-                self.select(("A", 8))
-                self.selected.move(("D", 8))
-                self.board[("A", 8)] = None
-                self.board[("D", 8)] = self.selected
-                self.deselect()
-                self.selected = temp
-                self.board.moves.append(("O-O-O", self.selected.pieceColor))
-                self.castling[self.selected.pieceColor][PieceType.KING] = False
-        if self.board.isOccupied(position):
-            self.board.captured[self.selected.pieceColor.name].append(self.board[position])
-            self.board[position].isCaptured = True
-        self.board[self.selected.piecePosition] = None
-        self._selected.move(position)
-        self.board[position] = self._selected
-        if not isCastling:
-            self.board.moves.append((oldPos, position))
+        self.makeMove(move)
         
-    def _isCastlingMove(self, position: Tuple[str, int], oldPosition: Tuple[str, int]) -> bool:
+    def _findMove(self, fromPosition: Tuple[str, int], toPosition: Tuple[str, int]) -> Optional[int]:
         """
-        Checks if the given position is a castling move.
+        Returns the encoded move between the given positions or None. Promotions pick the queen.
         """
-        if self.selected.pieceColor == self.playerColor:
-            return self._isCastlingMovePlayer(position, oldPosition)
-        else:
-            return self._isCastlingMoveComputer(position, oldPosition)
-
-    def _isCastlingMovePlayer(self, position: Tuple[str, int], oldPosition: Tuple[str, int]) -> bool:
-        """
-        Checks if the given position is a castling move for the player.
-        """
-        if self.selected.pieceType != PieceType.KING:
-            return False
-        if self.selected.isMoved:
-            return False
-        if position == ("G", 1):
-            if self.board[("H", 1)] is None:
-                return False
-            if self.board[("H", 1)].isMoved:
-                return False
-            if self.board[("H", 1)].pieceType != PieceType.ROOK:
-                return False
-            if self.board[("H", 1)].pieceColor != self.selected.pieceColor:
-                return False
-            if self.board[("H", 1)].piecePosition != ("H", 1):
-                return False
-            if self.board[("H", 1)].isCaptured:
-                return False
-            return True
-        elif position == ("C", 1):
-            if self.board[("A", 1)] is None:
-                return False
-            if self.board[("A", 1)].isMoved:
-                return False
-            if self.board[("A", 1)].pieceType != PieceType.ROOK:
-                return False
-            if self.board[("A", 1)].pieceColor != self.selected.pieceColor:
-                return False
-            if self.board[("A", 1)].piecePosition != ("A", 1):
-                return False
-            if self.board[("A", 1)].isCaptured:
-                return False
-            return True
+        fromSquare = self.board.toSquare(fromPosition)
+        toSquare = self.board.toSquare(toPosition)
+        for move in self.generateMoves():
+            if moveFrom(move) == fromSquare and moveTo(move) == toSquare:
+                return move
+        return None
+    
+    def makeMove(self, move: int) -> None:
+        """
+        Plays an encoded move. It can be taken back with unmakeMove.
+        """
+        self.board.makeMove(move)
+        self._updateChecks()
         
-    def _isCastlingMoveComputer(self, position: Tuple[str, int], oldPosition: Tuple[str, int]) -> bool:
-        """
-        Checks if the given position is a castling move for the computer.
-        """
-        if self.selected.pieceType != PieceType.KING:
-            return False
-        if self.selected.isMoved:
-            return False
-        if position == ("G", 8):
-            if self.board[("H", 8)] is None:
-                return False
-            if self.board[("H", 8)].isMoved:
-                return False
-            if self.board[("H", 8)].pieceType != PieceType.ROOK:
-                return False
-            if self.board[("H", 8)].pieceColor != self.selected.pieceColor:
-                return False
-            if self.board[("H", 8)].piecePosition != ("H", 8):
-                return False
-            if self.board[("H", 8)].isCaptured:
-                return False
-            return True
-        elif position == ("C", 8):
-            if self.board[("A", 8)] is None:
-                return False
-            if self.board[("A", 8)].isMoved:
-                return False
-            if self.board[("A", 8)].pieceType != PieceType.ROOK:
-                return False
-            if self.board[("A", 8)].pieceColor != self.selected.pieceColor:
-                return False
-            if self.board[("A", 8)].piecePosition != ("A", 8):
-                return False
-            if self.board[("A", 8)].isCaptured:
-                return False
-            return True
-    
-    def drag(self, screen: pygame.Surface, position: Tuple[int, int]) -> None:
+    def unmakeMove(self) -> None:
+        """
+        Takes back the last move.
+        """
+        if not self.board.moves:
+            return
+        self.deselect()
+        self.board.unmakeMove()
+        self._updateChecks()
+        
+    def _updateChecks(self) -> None:
+        """
+        Flags the king of the side to move if it is in check.
+        """
+        inCheck = self.isCheck()
+        for color, position in self.kingPositions.items():
+            self.board[position].isChecked = inCheck and color == self.turn
+    
+    def drag(self, screen: "pygame.Surface", position: Tuple[int, int]) -> None:
         """
         Drags the selected piece to the given position.
         """
@@ -350,376 +460,50 @@ class ChessGame:
         """
         Resets the board.
         """
-        self.board.reset()
+        self.cancelComputerMove(block=True)
+        self.board.reset(flipped=self._playerColor == PieceColor.BLACK)
         self._initWhites()
         self._initBlacks()
+        self.board.position.castling = ALL_CASTLING
+        self.board.position.updateKey()
         self._selected = None
-        self._castling = {PieceColor.WHITE: { PieceType.KING: True, PieceType.QUEEN: True },
-                          PieceColor.BLACK: { PieceType.KING: True, PieceType.QUEEN: True }}
-        self._turn = PieceColor.WHITE
+        self.transpositionTable.clear()
+        
+    def close(self) -> None:
+        """
+        Stops the background search and the processes of a parallel search and closes the opening book.
+        """
+        if self._worker is not None:
+            self._worker.close()
+            self._worker = None
+        self.workers = 1
+        self.book = None
         
     def changeTurn(self) -> None:
         """
         Changes the turn.
         """
-        if self._turn == PieceColor.WHITE:
-            self._turn = PieceColor.BLACK
-        else:
-            self._turn = PieceColor.WHITE
+        self.board.position.sideToMove ^= 1
+        self.board.position.enPassant = -1
+        self.board.position.updateKey()
     
-    # TODO: Check if current position is check. If it is prune the moves that are not valid.
     def avaliableMoves(self) -> List[Tuple[str, int]]:
         """
-        Returns a list of avaliable moves of the selected piece.
+        Returns a list of legal moves of the selected piece. The list is kept
+        until the position or the selection changes, so drawing it every frame
+        costs no move generation.
         """
         if self.selected is None:
             return []
-        if self.selected.pieceType == PieceType.PAWN:
-            return self._avaliablePawnMoves()
-        elif self.selected.pieceType == PieceType.ROOK:
-            return self._avaliableRookMoves()
-        elif self.selected.pieceType == PieceType.KNIGHT:
-            return self._avaliableKnightMoves()
-        elif self.selected.pieceType == PieceType.BISHOP:
-            return self._avaliableBishopMoves()
-        elif self.selected.pieceType == PieceType.QUEEN:
-            return self._avaliableQueenMoves()
-        elif self.selected.pieceType == PieceType.KING:
-            return self._avaliableKingMoves()
-        else:
-            return []
-        
-    def _avaliablePawnMoves(self) -> List[Tuple[str, int]]:
-        """
-        Returns a list of avaliable moves of the selected pawn.
-        """
-        if self.selected.pieceColor == self.playerColor:
-            return self._avaliablePawnMovesPlayer()
-        else:
-            return self._avaliablePawnMovesComputer()
-    
-    def _avaliablePawnMovesPlayer(self) -> List[Tuple[str, int]]:
-        """
-        Returns a list of avaliable moves of the selected white pawn.
-        """
-        moves = []
-        if self.board[(self.selected.piecePosition[0], self.selected.piecePosition[1] + 1)] is None:
-            moves.append((self.selected.piecePosition[0], self.selected.piecePosition[1] + 1))
-            if self.board[(self.selected.piecePosition[0], self.selected.piecePosition[1] + 2)] is None and self.selected.isMoved == False:
-                moves.append((self.selected.piecePosition[0], self.selected.piecePosition[1] + 2))
-        if (self.selected.piecePosition[0].lower() != "h" 
-            and self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 1)] is not None 
-            and self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 1)].pieceColor == PieceColor.BLACK):
-            moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 1))
-        if (self.selected.piecePosition[0].lower() != "a" 
-            and self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 1)] is not None 
-            and self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 1)].pieceColor == PieceColor.BLACK):
-            moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 1))
-        return moves
-    
-    def _avaliablePawnMovesComputer(self) -> List[Tuple[str, int]]:
-        """
-        Returns a list of avaliable moves of the selected black pawn.
-        """
-        moves = []
-        if self.board[(self.selected.piecePosition[0], self.selected.piecePosition[1] - 1)] is None:
-            moves.append((self.selected.piecePosition[0], self.selected.piecePosition[1] - 1))
-            if self.board[(self.selected.piecePosition[0], self.selected.piecePosition[1] - 2)] is None and self.selected.isMoved == False:
-                moves.append((self.selected.piecePosition[0], self.selected.piecePosition[1] - 2))
-        if (self.selected.piecePosition[0].lower() != "h" 
-            and self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 1)] is not None 
-            and self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 1)].pieceColor == PieceColor.WHITE):
-            moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 1))
-        if (self.selected.piecePosition[0].lower() != "a" 
-            and self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 1)] is not None 
-            and self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 1)].pieceColor == PieceColor.WHITE):
-            moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 1))
-        return moves
-
-    def _avaliableRookMoves(self) -> List[Tuple[str, int]]:
-        """
-        Returns a list of avaliable moves of the selected rook.
-        """
-        moves = []
-        col = ord(self.selected.piecePosition[0].lower()) - ord("a")
-        for i in range(self.selected.piecePosition[1] + 1, 8):
-            if self.board[(self.selected.piecePosition[0], i)] is None:
-                moves.append((self.selected.piecePosition[0], i))
-            elif self.board[(self.selected.piecePosition[0], i)].pieceColor != self.selected.pieceColor:
-                moves.append((self.selected.piecePosition[0], i))
-                break
-            else:
-                break
-        for i in range(self.selected.piecePosition[1] - 1, -1, -1):
-            if self.board[(self.selected.piecePosition[0], i)] is None:
-                moves.append((self.selected.piecePosition[0], i))
-            elif self.board[(self.selected.piecePosition[0], i)].pieceColor != self.selected.pieceColor:
-                moves.append((self.selected.piecePosition[0], i))
-                break
-            else:
-                break
-        for i in range(col + 1, 8):
-            if self.board[(chr(i + ord("a")), self.selected.piecePosition[1])] is None:
-                moves.append((chr(i + ord("A")), self.selected.piecePosition[1]))
-            elif self.board[(chr(i + ord("a")), self.selected.piecePosition[1])].pieceColor != self.selected.pieceColor:
-                moves.append((self.selected.piecePosition[0], i))
-                break
-            else:
-                break
-        for i in range(col - 1, -1, -1):
-            if self.board[(chr(i + ord("a")), self.selected.piecePosition[1])] is None:
-                moves.append((chr(i + ord("A")), self.selected.piecePosition[1]))
-            elif self.board[(chr(i + ord("a")), self.selected.piecePosition[1])].pieceColor != self.selected.pieceColor:
-                moves.append((self.selected.piecePosition[0], i))
-                break
-            else:
-                break
-        return moves
-    
-    def _avaliableKnightMoves(self) -> List[Tuple[str, int]]:
-        """
-        Returns a list of avaliable moves of the selected knight.
-        """
-        col = ord(self.selected.piecePosition[0].lower()) - ord("a")
-        row = self.selected.piecePosition[1] - 1
+        key = (self.board.position.key, self.board.flipped)
+        fromSquare = self.board.toSquare(self.selected.piecePosition)
+        if self._available[:2] == (key, fromSquare):
+            return self._available[2]
         moves = []
-        self._knightForwardMoves(col, row, moves)
-        self._knightRightMoves(col, row, moves)
-        self._knightBackMoves(col, row, moves)
-        self._knightLeftMoves(col, row, moves)
-        return moves
-    # Knight moves helper functions
-    ###
-    def _knightForwardMoves(self, col, row, moves):
-        if col < 7 and row < 6:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 2)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 2))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 2)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 2))
-        if col > 0 and row < 6:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 2)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 2))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 2)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 2))
-
-    def _knightRightMoves(self, col, row, moves):
-        if col < 6 and row < 7:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) + 2), self.selected.piecePosition[1] + 1)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 2), self.selected.piecePosition[1] + 1))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) + 2), self.selected.piecePosition[1] + 1)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 2), self.selected.piecePosition[1] + 1))
-        if col < 6 and row > 0:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) + 2), self.selected.piecePosition[1] - 1)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 2), self.selected.piecePosition[1] - 1))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) + 2), self.selected.piecePosition[1] - 1)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 2), self.selected.piecePosition[1] - 1))
-
-    def _knightBackMoves(self, col, row, moves):
-        if col < 7 and row > 1:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 2)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 2))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 2)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 2))
-        if col > 0 and row > 1:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 2)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 2))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 2)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 2))
-
-    def _knightLeftMoves(self, col, row, moves):
-        if col > 1 and row < 7:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) - 2), self.selected.piecePosition[1] + 1)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 2), self.selected.piecePosition[1] + 1))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) - 2), self.selected.piecePosition[1] + 1)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 2), self.selected.piecePosition[1] + 1))
-        if col > 1 and row > 0:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) - 2), self.selected.piecePosition[1] - 1)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 2), self.selected.piecePosition[1] - 1))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) - 2), self.selected.piecePosition[1] - 1)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 2), self.selected.piecePosition[1] - 1))
-    ### 
-    # End of Knight moves helper functions
-    
-    def _avaliableBishopMoves(self) -> List[Tuple[str, int]]:
-        """
-        Returns a list of avaliable moves of the selected bishop.
-        """
-        col = ord(self.selected.piecePosition[0].lower()) - ord("a")
-        row = self.selected.piecePosition[1] - 1
-        moves = []
-        self._bishopDownRightMoves(col, row, moves)
-        self._bishopUpLeftMoves(col, row, moves)
-        self._bishopUpRightMoves(col, row, moves)
-        self._bishopDownLeftMoves(col, row, moves)
-        return moves
-
-    # Bishop moves helper functions
-    ###
-    def _bishopDownRightMoves(self, col, row, moves):
-        for i in range(1, 8):
-            if col + i >= 8 or row + i >= 8:
-                break
-            if self.board[(chr(ord(self.selected.piecePosition[0]) + i), self.selected.piecePosition[1] + i)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + i), self.selected.piecePosition[1] + i))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) + i), self.selected.piecePosition[1] + i)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + i), self.selected.piecePosition[1] + i))
-                break
-            else:
-                break
-
-    def _bishopUpLeftMoves(self, col, row, moves):
-        for i in range(1, 8):
-            if col - i <= -1 or row + i >= 8:
-                break
-            if self.board[(chr(ord(self.selected.piecePosition[0]) - i), self.selected.piecePosition[1] + i)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - i), self.selected.piecePosition[1] + i))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) - i), self.selected.piecePosition[1] + i)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - i), self.selected.piecePosition[1] + i))
-                break
-            else:
-                break
-
-    def _bishopUpRightMoves(self, col, row, moves):
-        for i in range(1, 8):
-            if col + i >= 8 or row - i <= -1:
-                break
-            if self.board[(chr(ord(self.selected.piecePosition[0]) + i), self.selected.piecePosition[1] - i)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + i), self.selected.piecePosition[1] - i))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) + i), self.selected.piecePosition[1] - i)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + i), self.selected.piecePosition[1] - i))
-                break
-            else:
-                break
-
-    def _bishopDownLeftMoves(self, col, row, moves):
-        for i in range(1, 8):
-            if col - i <= -1 or row - i <= -1:
-                break
-            if self.board[(chr(ord(self.selected.piecePosition[0]) - i), self.selected.piecePosition[1] - i)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - i), self.selected.piecePosition[1] - i))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) - i), self.selected.piecePosition[1] - i)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - i), self.selected.piecePosition[1] - i))
-                break
-            else:
-                break
-    ###
-    # End of Bishop moves helper functions
-    
-    def _avaliableQueenMoves(self) -> List[Tuple[str, int]]:
-        """
-        Returns a list of avaliable moves of the selected queen.
-        """
-        return self._avaliableRookMoves() + self._avaliableBishopMoves()
-    
-    def _avaliableKingMoves(self) -> List[Tuple[str, int]]:
-        """
-        Returns a list of avaliable moves of the selected king.
-        """
-        col = ord(self.selected.piecePosition[0].lower()) - ord("a")
-        row = self.selected.piecePosition[1] - 1
-        moves = []
-        self._kingLeftMoves(col, row, moves)
-        self._kingBackMoves(row, moves)
-        self._kingFrontMoves(row, moves)
-        self._kingRightMoves(col, row, moves)
-        return self._castlingMoves(moves)
-
-    # King avaliable moves helper functions
-    ###
-    def _kingLeftMoves(self, col, row, moves) -> None:
-        """
-        Adds avaliable moves of the selected king to the list.
-        """
-        if col <= 0:
-            return
-        if row > 0:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 1)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 1))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 1)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] - 1))
-        if self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1])] is None:
-            moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1]))
-        elif self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1])].pieceColor != self.selected.pieceColor:
-            moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1]))
-        if row < 7:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 1)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 1))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 1)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) - 1), self.selected.piecePosition[1] + 1))
-
-    def _kingBackMoves(self, row, moves) -> None:
-        """
-        Adds avaliable moves of the selected king to the list.
-        """
-        if row > 0:
-            if self.board[(self.selected.piecePosition[0], self.selected.piecePosition[1] - 1)] is None:
-                moves.append((self.selected.piecePosition[0], self.selected.piecePosition[1] - 1))
-            elif self.board[(self.selected.piecePosition[0], self.selected.piecePosition[1] - 1)].pieceColor != self.selected.pieceColor:
-                moves.append((self.selected.piecePosition[0], self.selected.piecePosition[1] - 1))
-
-    def _kingFrontMoves(self, row, moves) -> None:
-        """
-        Adds avaliable moves of the selected king to the list.
-        """
-        if row < 7:
-            if self.board[(self.selected.piecePosition[0], self.selected.piecePosition[1] + 1)] is None:
-                moves.append((self.selected.piecePosition[0], self.selected.piecePosition[1] + 1))
-            elif self.board[(self.selected.piecePosition[0], self.selected.piecePosition[1] + 1)].pieceColor != self.selected.pieceColor:
-                moves.append((self.selected.piecePosition[0], self.selected.piecePosition[1] + 1))
-
-    def _kingRightMoves(self, col, row, moves) -> None:
-        """
-        Adds avaliable moves of the selected king to the list.
-        """
-        if col >= 7:
-            return
-        if row > 0:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 1)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 1))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 1)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] - 1))
-        if self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1])] is None:
-            moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1]))
-        elif self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1])].pieceColor != self.selected.pieceColor:
-            moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1]))
-        if row < 7:
-            if self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 1)] is None:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 1))
-            elif self.board[(chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 1)].pieceColor != self.selected.pieceColor:
-                moves.append((chr(ord(self.selected.piecePosition[0]) + 1), self.selected.piecePosition[1] + 1))
-
-    def _castlingMoves(self, moves) -> list:
-        """
-        Returns a list of avaliable moves of the selected king.
-        """
-        if self.selected.isMoved:
-            return moves
-        if self.selected.pieceColor == self.playerColor:
-            # King side
-            if (self.selected.piecePosition == ("E",1) and self.board["F",1] is None 
-                and self.board["G",1] is None 
-                and self._castling[PieceColor.WHITE][PieceType.KING]):
-                moves.append(("G",1))
-            # Queen side
-            if (self.selected.piecePosition == ("E",1) and self.board["B",1] is None 
-                and self.board["C",1] is None 
-                and self.board["D",1] is None 
-                and self._castling[PieceColor.WHITE][PieceType.QUEEN]):
-                moves.append(("C",1))
-        if self.selected.pieceColor != self.playerColor:
-            # King side
-            if (self.selected.piecePosition == ("E",8) 
-                and self.board["F",8] is None 
-                and self.board["G",8] is None
-                and self._castling[PieceColor.BLACK][PieceType.KING]):
-                moves.append(("G",8))
-            # Queen side
-            if (self.selected.piecePosition == ("E",8) 
-                and self.board["B",8] is None 
-                and self.board["C",8] is None 
-                and self.board["D",8] is None 
-                and self._castling[PieceColor.BLACK][PieceType.QUEEN]):
-                moves.append(("C",8))
+        for move in self.generateMoves():
+            if moveFrom(move) == fromSquare:
+                position = self.board.toPosition(moveTo(move))
+                if position not in moves:
+                    moves.append(position)
+        self._available = (key, fromSquare, moves)
         return moves
-    ###
-    # End of king helper functions
\ No newline at end of file
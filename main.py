@@ -1,13 +1,20 @@
 import pygame
 from game import ChessGame
+import os
 import pathlib
 import tkinter as tk
 from PIL import Image, ImageTk
 
-from piece import PieceColor
+from piece import PieceColor, PieceType
+from sprites import getSprite
+from renderer import Renderer
+from move import moveToUCI
 
 pColor = PieceColor.WHITE
 cLevel = 1
+cWorkers = 1
+# Frame rate cap while a piece is dragged; the idle board only redraws on events.
+DRAG_FPS = 60
 
 class LevelSelection:
     def __init__(self, master=None):
@@ -33,6 +40,10 @@ class LevelSelection:
         )
         self.scale1.configure(tickinterval="1.0", to="10")
         self.scale1.grid(column="0", columnspan="2", row="1")
+        self.scale2 = tk.Scale(self.frame1)
+        self.scale2.configure(from_="1", label="Workers", orient="horizontal", resolution="1", showvalue="true")
+        self.scale2.configure(sliderlength="10", to=str(os.cpu_count() or 1))
+        self.scale2.grid(column="0", columnspan="2", row="2")
         self.frame1.configure(height="200", padx="50", pady="50", width="200")
         self.frame1.pack(side="top")
         # Main widget
@@ -43,42 +54,67 @@ class LevelSelection:
         self.mainwindow.mainloop()
         
     def whitesClicked(self):
-        global pColor, cLevel
+        global pColor, cLevel, cWorkers
         pColor = PieceColor.WHITE
         cLevel = self.scale1.get()
+        cWorkers = self.scale2.get()
         self.root.quit()
         self.root.destroy()
     
     def blacksClicked(self):
-        global pColor, cLevel
+        global pColor, cLevel, cWorkers
         pColor = PieceColor.BLACK
         cLevel = self.scale1.get()
+        cWorkers = self.scale2.get()
         self.root.quit()
         self.root.destroy()
 
 # TODO: Shorten this function
 def main():
-    global pColor, cLevel
-    chess = ChessGame(pColor, cLevel)
+    global pColor, cLevel, cWorkers
+    chess = ChessGame(pColor, cLevel, workers=cWorkers)
     pygame.init()
-    icon = pygame.image.load("pieces/white/king.png")
-    icon = pygame.transform.scale(icon, (64, 64))
+    icon = getSprite(PieceType.KING, PieceColor.WHITE, 64)
     pygame.display.set_icon(icon)
     screen = pygame.display.set_mode((800, 800))
     pygame.display.set_caption("Chess")
-    chess.draw(screen)
-    pygame.display.flip()
+    renderer = Renderer(screen)
+    clock = pygame.time.Clock()
+    pygame.display.update(renderer.render(chess))
     # chess.board.fromFEN("rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2")
+    # The engine thinks on a worker thread and reports back through these events.
+    moveReady = pygame.event.custom_type()
+    engineProgress = pygame.event.custom_type()
+    thinking = None
     draging = False
+    dragPosition = None
     done = False
     while not done:
-        chess.draw(screen)
-        for event in pygame.event.get():
+        if thinking is None and chess.isComputerTurn() and not chess.isGameOver():
+            thinking = chess.startComputerMove(
+                progress=lambda *info: pygame.event.post(pygame.event.Event(engineProgress, info=info)),
+                onDone=lambda future: pygame.event.post(pygame.event.Event(moveReady, future=future)))
+        # Sleep until something happens unless a drag needs smooth frames.
+        events = pygame.event.get() if draging else [pygame.event.wait()] + pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 done = True
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate()
+            if event.type == moveReady and event.future is thinking:
+                thinking = None
+                if not event.future.cancelled() and event.future.result() is not None:
+                    chess.deselect()
+                    chess.makeMove(event.future.result())
+                pygame.display.set_caption("Chess")
+            if event.type == engineProgress and thinking is not None:
+                depth, score, nodes, elapsed, pv = event.info
+                pygame.display.set_caption(f"Chess - depth {depth} score {score / 100:+.2f} "
+                                           f"{' '.join(moveToUCI(move) for move in pv[:6])}")
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and thinking is None:
                 p = chess.posToBoard(event.pos)
                 draging = True
+                dragPosition = event.pos
                 chess.select(p)
                 if chess.selected is not None:
                     chess.selected.isDraging = True
@@ -89,13 +125,9 @@ def main():
                 if chess.selected is not None:
                     chess.selected.isDraging = False
                 draging = False
-                chess.draw(screen)
-                if chess.selected is not None and chess.selected.isMoved:
-                    chess.selected.drawPrevious(screen)
-                pygame.display.flip()
+                dragPosition = None
             if event.type == pygame.MOUSEMOTION and draging:
-                chess.drag(screen, event.pos)
-                pygame.display.flip()
+                dragPosition = event.pos
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_p:
                     print(chess.board)
@@ -107,10 +139,18 @@ def main():
                     print(chess.board.captured)
                 if event.key == pygame.K_f:
                     print(chess.board.toFEN())
+                if event.key == pygame.K_g:
+                    print(chess.toPGN())
+                if event.key == pygame.K_ESCAPE:
+                    # Move now: the search stops and plays its best move so far.
+                    chess.cancelComputerMove()
                 if event.key == pygame.K_q:
                     chess.reset()
-                    chess.draw(screen)
-                    pygame.display.flip()
+                    thinking = None
+        pygame.display.update(renderer.render(chess, dragPosition))
+        if draging:
+            clock.tick(DRAG_FPS)
+    chess.close()
     
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,65 @@
+# The move flags are defined next to Position.makeMove, which plays them.
+from position import (QUIET, DOUBLE_PAWN_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EN_PASSANT,
+                      PROMOTION, PROMOTION_CAPTURE, PROMOTION_TYPES, squareName)
+
+NULL_MOVE = 0
+_PROMOTION_CHARS = "nbrq"
+
+
+def encodeMove(fromSquare: int, toSquare: int, flags: int = QUIET) -> int:
+    """
+    Packs a move into an int.
+    """
+    return fromSquare | toSquare << 6 | flags << 12
+
+
+def moveFrom(move: int) -> int:
+    """
+    Returns the origin square of the move.
+    """
+    return move & 63
+
+
+def moveTo(move: int) -> int:
+    """
+    Returns the destination square of the move.
+    """
+    return (move >> 6) & 63
+
+
+def moveFlags(move: int) -> int:
+    """
+    Returns the flags of the move.
+    """
+    return move >> 12
+
+
+def isCapture(move: int) -> bool:
+    """
+    Returns True if the move captures a piece, en passant included.
+    """
+    return move & 0x4000 != 0
+
+
+def isPromotion(move: int) -> bool:
+    """
+    Returns True if the move promotes a pawn.
+    """
+    return move & 0x8000 != 0
+
+
+def promotionType(move: int) -> int:
+    """
+    Returns the piece type a promotion move promotes to.
+    """
+    return PROMOTION_TYPES[(move >> 12) & 3]
+
+
+def moveToUCI(move: int) -> str:
+    """
+    Returns the move in UCI notation, e.g. "e2e4" or "e7e8q".
+    """
+    text = squareName(move & 63) + squareName((move >> 6) & 63)
+    if move & 0x8000:
+        text += _PROMOTION_CHARS[(move >> 12) & 3]
+    return text
@@ -0,0 +1,305 @@
+from typing import Dict, List
+from position import (Position, WHITE, PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING, ALL_SQUARES,
+                      WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE, iterSquares, lsb)
+from attacks import (KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, ROOK_RAYS, BISHOP_RAYS, BETWEEN,
+                     rookAttacks, bishopAttacks)
+from move import (DOUBLE_PAWN_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EN_PASSANT,
+                  PROMOTION, PROMOTION_CAPTURE)
+
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_8 = RANK_1 << 56
+
+_PROMOTION_FLAGS = (PROMOTION | 3, PROMOTION | 2, PROMOTION | 1, PROMOTION)
+_PROMOTION_CAPTURE_FLAGS = (PROMOTION_CAPTURE | 3, PROMOTION_CAPTURE | 2, PROMOTION_CAPTURE | 1, PROMOTION_CAPTURE)
+
+
+def attackersTo(position: Position, square: int, byColor: int, occupied: int) -> int:
+    """
+    Returns the pieces of the given color attacking the square, with sliders
+    blocked by the given occupancy.
+    """
+    pieces = position.pieces
+    base = byColor * 6
+    queens = pieces[base + QUEEN]
+    return (PAWN_ATTACKS[byColor ^ 1][square] & pieces[base + PAWN]
+            | KNIGHT_ATTACKS[square] & pieces[base + KNIGHT]
+            | KING_ATTACKS[square] & pieces[base + KING]
+            | rookAttacks(square, occupied) & (pieces[base + ROOK] | queens)
+            | bishopAttacks(square, occupied) & (pieces[base + BISHOP] | queens))
+
+
+def isSquareAttacked(position: Position, square: int, byColor: int) -> bool:
+    """
+    Returns True if any piece of the given color attacks the square.
+    """
+    pieces = position.pieces
+    base = byColor * 6
+    if PAWN_ATTACKS[byColor ^ 1][square] & pieces[base + PAWN]:
+        return True
+    if KNIGHT_ATTACKS[square] & pieces[base + KNIGHT]:
+        return True
+    if KING_ATTACKS[square] & pieces[base + KING]:
+        return True
+    occupied = position.occupancy[2]
+    queens = pieces[base + QUEEN]
+    if rookAttacks(square, occupied) & (pieces[base + ROOK] | queens):
+        return True
+    return bishopAttacks(square, occupied) & (pieces[base + BISHOP] | queens) != 0
+
+
+def isInCheck(position: Position) -> bool:
+    """
+    Returns True if the side to move is in check.
+    """
+    us = position.sideToMove
+    return isSquareAttacked(position, position.kingSquare(us), us ^ 1)
+
+
+def generateMoves(position: Position) -> List[int]:
+    """
+    Returns every pseudo-legal move of the side to move.
+
+    Moves may still leave the own king attacked. Castling already requires
+    that the king does not start on, cross or land on an attacked square.
+    """
+    moves = []
+    us = position.sideToMove
+    pieces = position.pieces
+    base = us * 6
+    own = position.occupancy[us]
+    enemy = position.occupancy[us ^ 1]
+    occupied = position.occupancy[2]
+    empty = ~occupied & ALL_SQUARES
+
+    _pawnMoves(us, pieces[base + PAWN], moves, enemy, empty, ALL_SQUARES)
+    if position.enPassant >= 0:
+        target = position.enPassant
+        for fromSquare in iterSquares(PAWN_ATTACKS[us ^ 1][target] & pieces[base + PAWN]):
+            moves.append(fromSquare | target << 6 | EN_PASSANT << 12)
+
+    for square in iterSquares(pieces[base + KNIGHT]):
+        _addMoves(moves, square, KNIGHT_ATTACKS[square] & ~own, enemy)
+    for square in iterSquares(pieces[base + BISHOP] | pieces[base + QUEEN]):
+        _addMoves(moves, square, bishopAttacks(square, occupied) & ~own, enemy)
+    for square in iterSquares(pieces[base + ROOK] | pieces[base + QUEEN]):
+        _addMoves(moves, square, rookAttacks(square, occupied) & ~own, enemy)
+    for square in iterSquares(pieces[base + KING]):
+        _addMoves(moves, square, KING_ATTACKS[square] & ~own, enemy)
+
+    _castlingMoves(position, moves, occupied)
+    return moves
+
+
+def generateLegalMoves(position: Position) -> List[int]:
+    """
+    Returns every legal move of the side to move.
+
+    Legality comes from the checking pieces and the pin rays through the own
+    king rather than from playing each move: in check, non-king moves must
+    capture the checker or block its ray, pinned pieces may only move along
+    their pin and king moves are tested with the king removed from the board.
+    """
+    return _legalMoves(position, True, True)
+
+
+def generateLegalCaptures(position: Position) -> List[int]:
+    """
+    Returns the legal captures and promotions of the side to move.
+    """
+    return _legalMoves(position, True, False)
+
+
+def generateLegalQuiets(position: Position) -> List[int]:
+    """
+    Returns the legal moves of the side to move that generateLegalCaptures leaves out.
+    """
+    return _legalMoves(position, False, True)
+
+
+def _legalMoves(position: Position, noisy: bool, quiet: bool) -> List[int]:
+    """
+    Returns the legal captures and promotions if noisy is set and the other
+    legal moves if quiet is set.
+    """
+    moves = []
+    us = position.sideToMove
+    them = us ^ 1
+    pieces = position.pieces
+    base = us * 6
+    own = position.occupancy[us]
+    enemy = position.occupancy[them]
+    occupied = position.occupancy[2]
+    empty = ~occupied & ALL_SQUARES
+    king = lsb(pieces[base + KING])
+    # Pawn pushes are noisy only when they promote, on the last rank.
+    if not quiet:
+        targets = enemy
+        empty &= RANK_1 | RANK_8
+    elif not noisy:
+        targets = empty
+        empty &= ~(RANK_1 | RANK_8)
+        enemy = 0
+    else:
+        targets = ~own
+
+    withoutKing = occupied ^ (1 << king)
+    for toSquare in iterSquares(KING_ATTACKS[king] & targets):
+        if not attackersTo(position, toSquare, them, withoutKing):
+            moves.append(king | toSquare << 6 | (CAPTURE << 12 if enemy >> toSquare & 1 else 0))
+
+    checkers = attackersTo(position, king, them, occupied)
+    if checkers & (checkers - 1):
+        return moves
+    if checkers:
+        checkMask = checkers | BETWEEN[king][lsb(checkers)]
+    else:
+        checkMask = ALL_SQUARES
+    pins = _pinRays(position, king, us, occupied)
+    pinned = 0
+    for square in pins:
+        pinned |= 1 << square
+    targetMask = targets & checkMask
+
+    pawns = pieces[base + PAWN]
+    _pawnMoves(us, pawns & ~pinned, moves, enemy, empty, checkMask)
+    for square in iterSquares(pawns & pinned):
+        _pawnMoves(us, 1 << square, moves, enemy, empty, checkMask & pins[square])
+    if position.enPassant >= 0 and noisy:
+        _enPassantMoves(position, moves, king, checkers, checkMask, occupied)
+
+    for square in iterSquares(pieces[base + KNIGHT] & ~pinned):
+        _addMoves(moves, square, KNIGHT_ATTACKS[square] & targetMask, enemy)
+    for square in iterSquares(pieces[base + BISHOP] | pieces[base + QUEEN]):
+        targets = bishopAttacks(square, occupied) & targetMask
+        if pinned >> square & 1:
+            targets &= pins[square]
+        _addMoves(moves, square, targets, enemy)
+    for square in iterSquares(pieces[base + ROOK] | pieces[base + QUEEN]):
+        targets = rookAttacks(square, occupied) & targetMask
+        if pinned >> square & 1:
+            targets &= pins[square]
+        _addMoves(moves, square, targets, enemy)
+
+    if not checkers and quiet:
+        _castlingMoves(position, moves, occupied)
+    return moves
+
+
+def _pinRays(position: Position, king: int, us: int, occupied: int) -> Dict[int, int]:
+    """
+    Returns the pinned pieces of the given color, mapped to the squares they
+    may still move to: the ray to the pinner and the pinner itself.
+    """
+    pins = {}
+    pieces = position.pieces
+    enemyBase = (us ^ 1) * 6
+    queens = pieces[enemyBase + QUEEN]
+    own = position.occupancy[us]
+    snipers = (ROOK_RAYS[king] & (pieces[enemyBase + ROOK] | queens)
+               | BISHOP_RAYS[king] & (pieces[enemyBase + BISHOP] | queens))
+    for sniper in iterSquares(snipers):
+        ray = BETWEEN[king][sniper]
+        blockers = ray & occupied
+        if blockers and not blockers & (blockers - 1) and blockers & own:
+            pins[lsb(blockers)] = ray | 1 << sniper
+    return pins
+
+
+def _addMoves(moves: List[int], fromSquare: int, targets: int, enemy: int) -> None:
+    for toSquare in iterSquares(targets & enemy):
+        moves.append(fromSquare | toSquare << 6 | CAPTURE << 12)
+    for toSquare in iterSquares(targets & ~enemy):
+        moves.append(fromSquare | toSquare << 6)
+
+
+def _pawnMoves(us: int, pawns: int, moves: List[int], enemy: int, empty: int, mask: int) -> None:
+    """
+    Adds the pushes, captures and promotions of the given pawns that land on the mask.
+    """
+    if us == WHITE:
+        forward = 8
+        single = (pawns << 8) & empty
+        double = ((single & RANK_3) << 8) & empty & mask
+        left = ((pawns & ~FILE_A) << 7) & enemy & mask
+        right = ((pawns & ~FILE_H) << 9) & enemy & mask
+        lastRank = RANK_8
+    else:
+        forward = -8
+        single = (pawns >> 8) & empty
+        double = ((single & RANK_6) >> 8) & empty & mask
+        left = ((pawns & ~FILE_A) >> 9) & enemy & mask
+        right = ((pawns & ~FILE_H) >> 7) & enemy & mask
+        lastRank = RANK_1
+    single &= mask
+
+    for toSquare in iterSquares(single & ~lastRank):
+        moves.append((toSquare - forward) | toSquare << 6)
+    for toSquare in iterSquares(double):
+        moves.append((toSquare - 2 * forward) | toSquare << 6 | DOUBLE_PAWN_PUSH << 12)
+    for toSquare in iterSquares(single & lastRank):
+        move = (toSquare - forward) | toSquare << 6
+        for flags in _PROMOTION_FLAGS:
+            moves.append(move | flags << 12)
+    for captures, delta in ((left, forward - 1), (right, forward + 1)):
+        for toSquare in iterSquares(captures & ~lastRank):
+            moves.append((toSquare - delta) | toSquare << 6 | CAPTURE << 12)
+        for toSquare in iterSquares(captures & lastRank):
+            move = (toSquare - delta) | toSquare << 6
+            for flags in _PROMOTION_CAPTURE_FLAGS:
+                moves.append(move | flags << 12)
+
+
+def _enPassantMoves(position: Position, moves: List[int], king: int, checkers: int,
+                    checkMask: int, occupied: int) -> None:
+    """
+    Adds the legal en passant captures. Two pawns leave the rank at once, so
+    each capture is checked against the sliders with both removed.
+    """
+    us = position.sideToMove
+    them = us ^ 1
+    target = position.enPassant
+    victim = target ^ 8
+    if checkers and not (1 << target | 1 << victim) & checkMask:
+        return
+    pieces = position.pieces
+    enemyBase = them * 6
+    queens = pieces[enemyBase + QUEEN]
+    for fromSquare in iterSquares(PAWN_ATTACKS[them][target] & pieces[us * 6 + PAWN]):
+        after = occupied ^ (1 << fromSquare | 1 << victim | 1 << target)
+        if rookAttacks(king, after) & (pieces[enemyBase + ROOK] | queens):
+            continue
+        if bishopAttacks(king, after) & (pieces[enemyBase + BISHOP] | queens):
+            continue
+        moves.append(fromSquare | target << 6 | EN_PASSANT << 12)
+
+
+def _castlingMoves(position: Position, moves: List[int], occupied: int) -> None:
+    us = position.sideToMove
+    if us == WHITE:
+        kingSide, queenSide, offset = WHITE_KINGSIDE, WHITE_QUEENSIDE, 0
+    else:
+        kingSide, queenSide, offset = BLACK_KINGSIDE, BLACK_QUEENSIDE, 56
+    rights = position.castling & (kingSide | queenSide)
+    if not rights:
+        return
+    rooks = position.pieces[us * 6 + ROOK]
+    king = offset + 4
+    if not position.pieces[us * 6 + KING] >> king & 1:
+        return
+    them = us ^ 1
+    if (rights & kingSide and rooks >> (offset + 7) & 1
+            and not occupied & (0x60 << offset)
+            and not isSquareAttacked(position, king, them)
+            and not isSquareAttacked(position, king + 1, them)
+            and not isSquareAttacked(position, king + 2, them)):
+        moves.append(king | (king + 2) << 6 | KING_CASTLE << 12)
+    if (rights & queenSide and rooks >> offset & 1
+            and not occupied & (0x0E << offset)
+            and not isSquareAttacked(position, king, them)
+            and not isSquareAttacked(position, king - 1, them)
+            and not isSquareAttacked(position, king - 2, them)):
+        moves.append(king | (king - 2) << 6 | QUEEN_CASTLE << 12)
@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import queue
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Tuple
+from position import Position
+from engine import Search, MAX_DEPTH
+from transposition import TranspositionTable, DEFAULT_SIZE_MB
+
+# Seconds between checks that the helpers still owing a result are alive.
+HELPER_POLL = 0.1
+
+
+def _helperMain(name: str, tasks, results, stopEvent, index: int) -> None:
+    # Helpers share the resource tracker of the process that created the
+    # segment, so attaching here does not make them its owner.
+    memory = shared_memory.SharedMemory(name=name)
+    table = TranspositionTable(buffer=memory.buf)
+    # Odd helpers skip a depth so they fill the table ahead of the main search.
+    startDepth = 1 + index % 2
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        searchId, position, maxDepth, timeLimit = task
+        search = Search(position, table, stopEvent)
+        search.run(maxDepth, timeLimit, startDepth=startDepth)
+        results.put((searchId, index, search.nodes))
+    table.release()
+    memory.close()
+
+
+class ParallelSearch:
+    """
+    Lazy SMP search over several processes.
+
+    Helper processes search the same position as the main search and share
+    its transposition table through shared memory, so each reuses the
+    others' results for cutoffs and move ordering. Zobrist keys are seeded,
+    so every process hashes positions the same way. The helpers live until
+    close() is called.
+    """
+    def __init__(self, workers: int = os.cpu_count() or 1, hashSize: float = DEFAULT_SIZE_MB) -> None:
+        self._workers = max(int(workers), 1)
+        self._memory = shared_memory.SharedMemory(create=True, size=TranspositionTable.bytesFor(hashSize))
+        self._table = TranspositionTable(buffer=self._memory.buf)
+        context = multiprocessing.get_context()
+        self._stopEvent = context.Event()
+        self._results = context.Queue()
+        self._tasks = []
+        self._processes = []
+        self._nodes = 0
+        self._searchId = 0
+        for index in range(self._workers - 1):
+            tasks = context.Queue()
+            process = context.Process(target=_helperMain, daemon=True,
+                                      args=(self._memory.name, tasks, self._results, self._stopEvent, index))
+            process.start()
+            self._tasks.append(tasks)
+            self._processes.append(process)
+
+    @property
+    def workers(self) -> int:
+        """
+        Returns the number of processes searching, including this one.
+        """
+        return self._workers
+
+    @property
+    def table(self) -> TranspositionTable:
+        """
+        Returns the shared transposition table.
+        """
+        return self._table
+
+    @property
+    def nodes(self) -> int:
+        """
+        Returns the number of nodes all processes searched in the last search.
+        """
+        return self._nodes
+
+    def stop(self) -> None:
+        """
+        Asks the running search and its helpers to return as soon as possible.
+        """
+        self._stopEvent.set()
+
+    def run(self, position: Position, maxDepth: int = MAX_DEPTH, timeLimit: Optional[float] = None,
+            nodeLimit: Optional[int] = None,
+            callback: Optional[Callable[[int, int, int, float, List[int]], None]] = None,
+            stopEvent=None) -> Tuple[int, int]:
+        """
+        Searches the position with all workers and returns the best move with
+        its score, as Search.run does. The move and the callback come from the
+        main search; nodeLimit and stopEvent, an Event that ends the search
+        when set, apply to it alone and the helpers stop when it returns.
+        """
+        if self._memory is None:
+            raise ValueError("The parallel search is closed.")
+        self._stopEvent.clear()
+        self._searchId += 1
+        for tasks in self._tasks:
+            tasks.put((self._searchId, position, maxDepth, timeLimit))
+        search = Search(position, self._table, stopEvent if stopEvent is not None else self._stopEvent)
+        try:
+            return search.run(maxDepth, timeLimit, nodeLimit, callback)
+        finally:
+            self._stopEvent.set()
+            self._nodes = search.nodes + self._helperNodes()
+
+    def _helperNodes(self) -> int:
+        """
+        Returns the nodes the helpers searched in the current search. A
+        helper that died without reporting counts 0, so the search never
+        waits on it; results left over from earlier searches are skipped.
+        """
+        nodes = 0
+        missing = set(range(len(self._processes)))
+        while missing:
+            try:
+                searchId, index, helperNodes = self._results.get(timeout=HELPER_POLL)
+            except queue.Empty:
+                missing = {index for index in missing if self._processes[index].is_alive()}
+                continue
+            if searchId == self._searchId:
+                missing.discard(index)
+                nodes += helperNodes
+        return nodes
+
+    def close(self) -> None:
+        """
+        Stops the helper processes and frees the shared table.
+        """
+        if self._memory is None:
+            return
+        self._stopEvent.set()
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join()
+        self._tasks = []
+        self._processes = []
+        self._table.release()
+        self._table = None
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
@@ -0,0 +1,115 @@
+import argparse
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from position import Position, STARTING_FEN
+from movegen import generateLegalMoves
+from move import moveToUCI
+
+# The standard perft positions with their known node counts for depth 1, 2, ...
+REFERENCE_POSITIONS = [
+    ("startpos", STARTING_FEN,
+     (20, 400, 8902, 197281, 4865609)),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     (48, 2039, 97862, 4085603)),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     (14, 191, 2812, 43238, 674624)),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     (6, 264, 9467, 422333)),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     (44, 1486, 62379, 2103487)),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     (46, 2079, 89890, 3894594)),
+]
+
+
+def perft(position: Position, depth: int) -> int:
+    """
+    Returns the number of leaf nodes of the legal move tree of the given depth.
+    """
+    if depth <= 0:
+        return 1
+    moves = generateLegalMoves(position)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.makeMove(move)
+        nodes += perft(position, depth - 1)
+        position.unmakeMove()
+    return nodes
+
+
+def divide(position: Position, depth: int) -> Dict[str, int]:
+    """
+    Returns the perft node count below each root move, keyed by its UCI notation.
+    """
+    counts = {}
+    for move in generateLegalMoves(position):
+        position.makeMove(move)
+        counts[moveToUCI(move)] = perft(position, depth - 1)
+        position.unmakeMove()
+    return counts
+
+
+def _timedPerft(position: Position, depth: int) -> Tuple[int, float]:
+    start = time.perf_counter()
+    nodes = perft(position, depth)
+    return nodes, time.perf_counter() - start
+
+
+def _report(name: str, depth: int, nodes: int, elapsed: float, expected: Optional[int] = None) -> None:
+    nps = int(nodes / elapsed) if elapsed > 0 else 0
+    status = ""
+    if expected is not None:
+        status = "ok" if nodes == expected else f"FAIL expected {expected}"
+    print(f"{name:<10} depth {depth}  nodes {nodes:>10}  time {elapsed:8.3f}s  nps {nps:>9}  {status}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs perft from the command line and returns the exit code.
+    """
+    parser = argparse.ArgumentParser(description="Validate and time the move generator.")
+    parser.add_argument("--depth", type=int, default=3, help="search depth (default: 3)")
+    parser.add_argument("--fen", help="run a single position instead of the reference suite")
+    parser.add_argument("--divide", action="store_true", help="print the node count of every root move")
+    parser.add_argument("--position", action="append", dest="positions",
+                        help="only run the named reference positions")
+    args = parser.parse_args(argv)
+    if args.depth < 1:
+        parser.error("--depth must be at least 1")
+
+    if args.fen is not None:
+        position = Position.fromFEN(args.fen)
+        if args.divide:
+            # The root moves' counts add up to the perft, so it is not run again.
+            start = time.perf_counter()
+            counts = divide(position, args.depth)
+            elapsed = time.perf_counter() - start
+            for move, nodes in sorted(counts.items()):
+                print(f"{move}: {nodes}")
+            nodes = sum(counts.values())
+        else:
+            nodes, elapsed = _timedPerft(position, args.depth)
+        _report("fen", args.depth, nodes, elapsed)
+        return 0
+
+    failed = False
+    totalNodes = 0
+    totalTime = 0.0
+    for name, fen, counts in REFERENCE_POSITIONS:
+        if args.positions and name not in args.positions:
+            continue
+        depth = min(args.depth, len(counts))
+        nodes, elapsed = _timedPerft(Position.fromFEN(fen), depth)
+        _report(name, depth, nodes, elapsed, counts[depth - 1])
+        failed |= nodes != counts[depth - 1]
+        totalNodes += nodes
+        totalTime += elapsed
+    _report("total", args.depth, totalNodes, totalTime)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,512 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from position import (Position, STARTING_FEN, WHITE, PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING, FILES,
+                      squareName, iterSquares)
+from movegen import generateLegalMoves, attackersTo, isInCheck, isSquareAttacked
+from attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, ROOK_RAYS, BISHOP_RAYS, rookAttacks, bishopAttacks
+from move import QUIET, DOUBLE_PAWN_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EN_PASSANT, PROMOTION
+
+# The Seven Tag Roster, written first and in this order.
+ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+ROSTER_DEFAULTS = ("?", "?", "????.??.??", "?", "?", "?", "*")
+# Export format lines stay below 80 characters.
+LINE_LENGTH = 79
+
+# Standard suffix annotations and their numeric annotation glyphs.
+SUFFIX_NAGS = {"!": 1, "?": 2, "!!": 3, "??": 4, "!?": 5, "?!": 6}
+
+_SAN_PATTERN = re.compile(r"([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQnbrq]))?")
+_TAG_PATTERN = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# One movetext token: a comment, a rest-of-line comment, a variation
+# bracket, a NAG, a suffix annotation, a result, a move number or a move.
+_TOKEN_PATTERN = re.compile(r"""
+    \{([^}]*)\}?
+  | ;([^\n]*)
+  | ([()])
+  | \$(\d+)
+  | ([!?]{1,2})
+  | (1-0|0-1|1/2-1/2|\*)
+  | \d+\.+
+  | ([^\s{}();$!?]+)
+""", re.VERBOSE)
+_PIECE_LETTERS = {"N": KNIGHT, "B": BISHOP, "R": ROOK, "Q": QUEEN, "K": KING}
+_SAN_LETTERS = "?RNBQK"
+_PROMOTION_INDEX = {"N": 0, "B": 1, "R": 2, "Q": 3}
+_SQUARE_INDEX = {squareName(square): square for square in range(64)}
+_FILE_MASKS = [0x0101010101010101 << file for file in range(8)]
+_RANK_MASKS = [0xFF << (8 * rank) for rank in range(8)]
+_QUEEN_RAYS = [ROOK_RAYS[square] | BISHOP_RAYS[square] for square in range(64)]
+
+
+class PGNLine:
+    """
+    A line of moves with its annotations.
+
+    comments and nags are keyed by the number of moves played before them,
+    so key 0 is before the first move and key n follows moves[n - 1].
+    variations[n] holds the lines played instead of moves[n]. The fields
+    are plain attributes like those of Position.
+    """
+    __slots__ = ("moves", "comments", "nags", "variations")
+
+    def __init__(self) -> None:
+        self.moves: List[int] = []
+        self.comments: Dict[int, str] = {}
+        self.nags: Dict[int, List[int]] = {}
+        self.variations: Dict[int, List["PGNLine"]] = {}
+
+
+class PGNGame(PGNLine):
+    """
+    A game of a PGN file: its tag pairs and its main line.
+
+    error is None for a clean game. Otherwise it describes the first
+    problem found, and moves hold the main line up to that point.
+    """
+    __slots__ = ("headers", "error")
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None) -> None:
+        super().__init__()
+        self.headers: Dict[str, str] = dict(zip(ROSTER, ROSTER_DEFAULTS))
+        if headers:
+            self.headers.update(headers)
+        self.error: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return (f"PGNGame({self.headers['White']!r} - {self.headers['Black']!r}, "
+                f"{len(self.moves)} moves, {self.result})")
+
+    @property
+    def result(self) -> str:
+        """
+        Returns the result tag, "1-0", "0-1", "1/2-1/2" or "*".
+        """
+        return self.headers.get("Result", "*")
+
+    @property
+    def startingFEN(self) -> str:
+        """
+        Returns the FEN of the position the game starts from.
+        """
+        return self.headers.get("FEN", STARTING_FEN)
+
+    def startingPosition(self) -> Position:
+        """
+        Returns the position the game starts from.
+
+        Raises:
+            ValueError: If the FEN tag is malformed.
+        """
+        return Position.fromFEN(self.startingFEN)
+
+    def endPosition(self) -> Position:
+        """
+        Returns the position after the last move of the main line.
+        """
+        position = self.startingPosition()
+        for move in self.moves:
+            position.makeMove(move)
+        return position
+
+    @classmethod
+    def fromPosition(cls, position: Position, headers: Optional[Dict[str, str]] = None) -> "PGNGame":
+        """
+        Returns the game of the moves played on the position, starting where
+        its history starts.
+        """
+        start = position.copy()
+        while start.history:
+            start.unmakeMove()
+        game = cls(headers)
+        fen = start.toFEN()
+        if fen != STARTING_FEN:
+            game.headers["SetUp"] = "1"
+            game.headers["FEN"] = fen
+        game.moves = [record[0] for record in position.history]
+        return game
+
+
+def parseSAN(position: Position, text: str) -> int:
+    """
+    Returns the legal move written in Standard Algebraic Notation, e.g. "Nf3",
+    "exd5", "e8=Q+" or "O-O". Candidates come from the attack tables, so
+    only moves that might be pinned or leave the king in check are played
+    to test their legality.
+
+    Raises:
+        ValueError: If the move is not legal in the position or ambiguous.
+    """
+    san = text.rstrip("+#!?")
+    if san in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        king = position.kingSquare(position.sideToMove)
+        move = (king | (king + 2) << 6 | KING_CASTLE << 12 if len(san) == 3
+                else king | (king - 2) << 6 | QUEEN_CASTLE << 12)
+        if move in generateLegalMoves(position):
+            return move
+        raise ValueError(f"Illegal move {text} in {position.toFEN()}.")
+    match = _SAN_PATTERN.fullmatch(san)
+    if match is None:
+        raise ValueError(f"Invalid move {text}.")
+    letter, fromFile, fromRank, capture, target, promotion = match.groups()
+    us = position.sideToMove
+    base = us * 6
+    pieces = position.pieces
+    occupied = position.occupancy[2]
+    toSquare = _SQUARE_INDEX[target]
+    if position.occupancy[us] >> toSquare & 1:
+        raise ValueError(f"Illegal move {text} in {position.toFEN()}.")
+    flags = CAPTURE if position.occupancy[us ^ 1] >> toSquare & 1 else QUIET
+    if letter is None:
+        pawns = pieces[base + PAWN]
+        forward = 8 if us == WHITE else -8
+        if fromFile is not None and FILES.index(fromFile.upper()) != toSquare & 7:
+            candidates = PAWN_ATTACKS[us ^ 1][toSquare] & pawns & _FILE_MASKS[FILES.index(fromFile.upper())]
+            if toSquare == position.enPassant:
+                flags = EN_PASSANT
+            elif flags != CAPTURE:
+                candidates = 0
+        elif flags == CAPTURE or not 0 <= toSquare - forward < 64:
+            candidates = 0
+        elif pawns >> (toSquare - forward) & 1:
+            candidates = 1 << (toSquare - forward)
+        elif (toSquare >> 3 == (3 if us == WHITE else 4) and not occupied >> (toSquare - forward) & 1
+              and pawns >> (toSquare - 2 * forward) & 1):
+            candidates = 1 << (toSquare - 2 * forward)
+            flags = DOUBLE_PAWN_PUSH
+        else:
+            candidates = 0
+        lastRank = toSquare >> 3 == (7 if us == WHITE else 0)
+        if lastRank != (promotion is not None):
+            raise ValueError(f"Illegal move {text} in {position.toFEN()}.")
+        if promotion is not None:
+            flags |= PROMOTION | _PROMOTION_INDEX[promotion.upper()]
+    else:
+        pieceType = _PIECE_LETTERS[letter]
+        candidates = _pieceAttackers(position, pieceType, toSquare, occupied) & pieces[base + pieceType]
+        if fromFile is not None:
+            candidates &= _FILE_MASKS[FILES.index(fromFile.upper())]
+        if fromRank is not None:
+            candidates &= _RANK_MASKS[int(fromRank) - 1]
+    found = None
+    king = position.kingSquare(us)
+    checked = None
+    while candidates:
+        low = candidates & -candidates
+        candidates ^= low
+        fromSquare = low.bit_length() - 1
+        move = fromSquare | toSquare << 6 | flags << 12
+        if checked is None:
+            checked = isInCheck(position)
+        # Out of check, only king moves, en passant and pinned pieces can
+        # turn a pseudo-legal move illegal.
+        if letter == "K":
+            if attackersTo(position, toSquare, us ^ 1, occupied ^ low):
+                continue
+        elif checked or flags == EN_PASSANT or (_QUEEN_RAYS[king] >> fromSquare & 1
+                                                and _isPinned(position, king, low, occupied)):
+            if not _isLegal(position, move):
+                continue
+        if found is not None:
+            raise ValueError(f"Ambiguous move {text} in {position.toFEN()}.")
+        found = move
+    if found is None:
+        raise ValueError(f"Illegal move {text} in {position.toFEN()}.")
+    return found
+
+
+def moveToSAN(position: Position, move: int) -> str:
+    """
+    Returns the legal move of the position in Standard Algebraic Notation.
+    """
+    fromSquare = move & 63
+    toSquare = (move >> 6) & 63
+    flags = move >> 12
+    if flags == KING_CASTLE:
+        san = "O-O"
+    elif flags == QUEEN_CASTLE:
+        san = "O-O-O"
+    else:
+        pieceType = position.squares[fromSquare] % 6
+        if pieceType == PAWN:
+            san = FILES[fromSquare & 7].lower() + "x" if flags & CAPTURE else ""
+            san += squareName(toSquare)
+            if flags & PROMOTION:
+                san += "=" + "NBRQ"[flags & 3]
+        else:
+            us = position.sideToMove
+            others = (_pieceAttackers(position, pieceType, toSquare, position.occupancy[2])
+                      & position.pieces[us * 6 + pieceType] & ~(1 << fromSquare))
+            rivals = [square for square in iterSquares(others)
+                      if _isLegal(position, square | toSquare << 6 | flags << 12)]
+            san = _SAN_LETTERS[pieceType]
+            if rivals:
+                if all(square & 7 != fromSquare & 7 for square in rivals):
+                    san += FILES[fromSquare & 7].lower()
+                elif all(square >> 3 != fromSquare >> 3 for square in rivals):
+                    san += str((fromSquare >> 3) + 1)
+                else:
+                    san += squareName(fromSquare)
+            if flags & CAPTURE:
+                san += "x"
+            san += squareName(toSquare)
+    position.makeMove(move)
+    if isInCheck(position):
+        san += "#" if not generateLegalMoves(position) else "+"
+    position.unmakeMove()
+    return san
+
+
+def _pieceAttackers(position: Position, pieceType: int, square: int, occupied: int) -> int:
+    """
+    Returns the squares a piece of the type attacks the square from.
+    """
+    if pieceType == KNIGHT:
+        return KNIGHT_ATTACKS[square]
+    if pieceType == BISHOP:
+        return bishopAttacks(square, occupied)
+    if pieceType == ROOK:
+        return rookAttacks(square, occupied)
+    if pieceType == QUEEN:
+        return rookAttacks(square, occupied) | bishopAttacks(square, occupied)
+    return KING_ATTACKS[square]
+
+
+def _isPinned(position: Position, king: int, piece: int, occupied: int) -> bool:
+    """
+    Returns True if an enemy slider attacks the king once the piece is lifted.
+    """
+    pieces = position.pieces
+    base = (position.sideToMove ^ 1) * 6
+    occupied ^= piece
+    queens = pieces[base + QUEEN]
+    return (rookAttacks(king, occupied) & (pieces[base + ROOK] | queens)
+            or bishopAttacks(king, occupied) & (pieces[base + BISHOP] | queens)) != 0
+
+
+def _isLegal(position: Position, move: int) -> bool:
+    """
+    Returns True if the pseudo-legal move does not leave the own king attacked.
+    """
+    us = position.sideToMove
+    position.makeMove(move)
+    legal = not isSquareAttacked(position, position.kingSquare(us), us ^ 1)
+    position.unmakeMove()
+    return legal
+
+
+def parseGame(text: str) -> PGNGame:
+    """
+    Returns the game of the PGN text of a single game. Parsing stops at the
+    first illegal move, which is recorded in the game's error.
+    """
+    lines = text.splitlines()
+    headers = {}
+    index = 0
+    while index < len(lines) and (not lines[index].strip() or lines[index].lstrip().startswith("[")):
+        for name, value in _TAG_PATTERN.findall(lines[index]):
+            headers[name] = value.replace('\\"', '"').replace("\\\\", "\\")
+        index += 1
+    return _parseMovetext(headers, "\n".join(lines[index:]))
+
+
+def _parseMovetext(headers: Dict[str, str], movetext: str) -> PGNGame:
+    game = PGNGame(headers)
+    try:
+        position = game.startingPosition()
+    except ValueError as error:
+        game.error = str(error)
+        return game
+    line: PGNLine = game
+    # The lines and positions the open variations branch from.
+    stack: List[Tuple[PGNLine, Position]] = []
+    # Bracket depth of a broken variation being skipped.
+    skip = 0
+    for match in _TOKEN_PATTERN.finditer(movetext):
+        comment, restOfLine, bracket, nag, suffix, result, san = match.groups()
+        if skip:
+            if bracket == "(":
+                skip += 1
+            elif bracket == ")":
+                skip -= 1
+                if not skip:
+                    line, position = stack.pop()
+            continue
+        if san is not None:
+            try:
+                move = parseSAN(position, san)
+            except ValueError as error:
+                if not stack:
+                    game.error = str(error)
+                    break
+                # A broken variation is dropped, the rest of the game is kept.
+                parent = stack[-1][0]
+                alternatives = parent.variations[len(parent.moves) - 1]
+                alternatives.remove(line)
+                if not alternatives:
+                    del parent.variations[len(parent.moves) - 1]
+                skip = 1
+                continue
+            position.makeMove(move)
+            line.moves.append(move)
+        elif comment is not None or restOfLine is not None:
+            text = " ".join((comment if comment is not None else restOfLine).split())
+            if text:
+                ply = len(line.moves)
+                line.comments[ply] = f"{line.comments[ply]} {text}" if ply in line.comments else text
+        elif nag is not None:
+            line.nags.setdefault(len(line.moves), []).append(int(nag))
+        elif suffix is not None:
+            if suffix in SUFFIX_NAGS:
+                line.nags.setdefault(len(line.moves), []).append(SUFFIX_NAGS[suffix])
+        elif bracket == "(":
+            stack.append((line, position))
+            if not line.moves:
+                skip = 1
+                continue
+            variation = PGNLine()
+            line.variations.setdefault(len(line.moves) - 1, []).append(variation)
+            position = position.copy()
+            position.unmakeMove()
+            line = variation
+        elif bracket == ")":
+            if stack:
+                line, position = stack.pop()
+        elif result is not None and not stack:
+            if "Result" not in headers:
+                game.headers["Result"] = result
+            break
+    return game
+
+
+def _splitGames(file: TextIO) -> Iterator[Tuple[List[str], List[str]]]:
+    """
+    Yields the tag lines and the movetext lines of every game in the file,
+    holding one game in memory at a time.
+    """
+    tags: List[str] = []
+    movetext: List[str] = []
+    inComment = False
+    for text in file:
+        if text.startswith("%"):
+            continue
+        stripped = text.strip()
+        if not stripped:
+            continue
+        if not inComment and stripped.startswith("["):
+            if movetext:
+                yield tags, movetext
+                tags, movetext = [], []
+            tags.append(stripped)
+            continue
+        movetext.append(text)
+        # A tag-like line inside a multi-line comment is still movetext.
+        if inComment:
+            inComment = "}" not in text or text.rfind("{") > text.rfind("}")
+        elif "{" in text:
+            inComment = text.rfind("{") > text.rfind("}")
+    if tags or movetext:
+        yield tags, movetext
+
+
+def readGameTexts(file: TextIO) -> Iterator[str]:
+    """
+    Yields the PGN text of every game in the file without parsing it, for
+    handing games to other processes.
+    """
+    for tags, movetext in _splitGames(file):
+        yield "\n".join(tags) + "\n\n" + "".join(movetext)
+
+
+def readGames(file: TextIO, headersOnly: bool = False) -> Iterator[PGNGame]:
+    """
+    Yields the games of a PGN file one at a time, so files of any size are
+    read in constant memory. With headersOnly the movetext is skipped, which
+    is much faster for filtering games by their tags.
+    """
+    for tags, movetext in _splitGames(file):
+        headers = {}
+        for tag in tags:
+            for name, value in _TAG_PATTERN.findall(tag):
+                headers[name] = value.replace('\\"', '"').replace("\\\\", "\\")
+        if headersOnly:
+            yield PGNGame(headers)
+        else:
+            yield _parseMovetext(headers, "".join(movetext))
+
+
+def gameToPGN(game: PGNGame) -> str:
+    """
+    Returns the game in PGN export format, ending with a blank line.
+    """
+    tags = [name for name in ROSTER if name in game.headers]
+    tags += [name for name in game.headers if name not in ROSTER]
+    lines = [f'[{name} "{_escape(game.headers[name])}"]' for name in tags]
+    lines.append("")
+    tokens = _lineTokens(game, game.startingPosition())
+    tokens.append(game.result)
+    lines.extend(_wrap(tokens))
+    lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def writeGames(file: TextIO, games: Iterable[PGNGame]) -> int:
+    """
+    Writes the games to a PGN file and returns how many were written.
+    """
+    count = 0
+    for game in games:
+        file.write(gameToPGN(game))
+        count += 1
+    return count
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _lineTokens(line: PGNLine, position: Position) -> List[str]:
+    """
+    Returns the movetext tokens of the line played from the position, which
+    is left unchanged.
+    """
+    tokens = []
+    position = position.copy()
+    # Black's move needs its number after anything that interrupts the moves.
+    needNumber = True
+    if 0 in line.comments:
+        tokens.append("{" + line.comments[0].replace("}", ")") + "}")
+    for ply, move in enumerate(line.moves):
+        if position.sideToMove == WHITE:
+            tokens.append(f"{position.fullmoveNumber}.")
+        elif needNumber:
+            tokens.append(f"{position.fullmoveNumber}...")
+        needNumber = False
+        tokens.append(moveToSAN(position, move))
+        for nag in line.nags.get(ply + 1, ()):
+            tokens.append(f"${nag}")
+        if ply + 1 in line.comments:
+            tokens.append("{" + line.comments[ply + 1].replace("}", ")") + "}")
+            needNumber = True
+        for variation in line.variations.get(ply, ()):
+            variationTokens = _lineTokens(variation, position)
+            if variationTokens:
+                tokens.append("(" + variationTokens[0])
+                tokens.extend(variationTokens[1:])
+                tokens[-1] += ")"
+                needNumber = True
+        position.makeMove(move)
+    return tokens
+
+
+def _wrap(tokens: List[str]) -> List[str]:
+    lines = []
+    current = ""
+    for token in tokens:
+        if current and len(current) + 1 + len(token) > LINE_LENGTH:
+            lines.append(current)
+            current = token
+        else:
+            current = f"{current} {token}" if current else token
+    if current:
+        lines.append(current)
+    return lines
@@ -1,6 +1,9 @@
 from enum import Enum
-from typing import List, Tuple
-import pygame
+from typing import List, Tuple, TYPE_CHECKING
+
+# Drawing lives in renderer.py so the rules model runs without pygame.
+if TYPE_CHECKING:
+    import pygame
 
 
 
@@ -42,8 +45,6 @@ class Piece:
         self._isChecked = False
         self._isCaptured = False
         self._isDraging = False
-        self._image = self._getImage()
-        self._image = pygame.transform.scale(self._image, (100, 100))
     
     def __str__(self) -> str:
         return f"{self._pieceColor.name} {self._pieceType.name}"
@@ -54,38 +55,14 @@ class Piece:
         else:
             return "n" if self._pieceType == PieceType.KNIGHT else self._pieceType.name[0].lower()
         
-    def _getImage(self):
-        if self._pieceType == PieceType.PAWN:
-            if self._pieceColor == PieceColor.WHITE:
-                return pygame.image.load("pieces/white/pawn.png")
-            else:
-                return pygame.image.load("pieces/black/pawn.png")
-        elif self._pieceType == PieceType.ROOK:
-            if self._pieceColor == PieceColor.WHITE:
-                return pygame.image.load("pieces/white/rook.png")
-            else:
-                return pygame.image.load("pieces/black/rook.png")
-        elif self._pieceType == PieceType.KNIGHT:
-            if self._pieceColor == PieceColor.WHITE:
-                return pygame.image.load("pieces/white/knight.png")
-            else:
-                return pygame.image.load("pieces/black/knight.png")
-        elif self._pieceType == PieceType.BISHOP:
-            if self._pieceColor == PieceColor.WHITE:
-                return pygame.image.load("pieces/white/bishop.png")
-            else:
-                return pygame.image.load("pieces/black/bishop.png")
-        elif self._pieceType == PieceType.QUEEN:
-            if self._pieceColor == PieceColor.WHITE:
-                return pygame.image.load("pieces/white/queen.png")
-            else:
-                return pygame.image.load("pieces/black/queen.png")
-        elif self._pieceType == PieceType.KING:
-            if self._pieceColor == PieceColor.WHITE:
-                return pygame.image.load("pieces/white/king.png")
-            else:
-                return pygame.image.load("pieces/black/king.png")
-            
+    @property
+    def image(self) -> "pygame.Surface":
+        """
+        Returns the sprite of the piece from the shared sprite cache.
+        """
+        from sprites import getSprite
+        return getSprite(self._pieceType, self._pieceColor)
+    
     @property
     def pieceType(self) -> PieceType:
         """
@@ -190,39 +167,35 @@ class Piece:
         self._piecePosition = newPosition
         self._isMoved = True
         self.pieceMoves.append(newPosition)
+        
+    def undoMove(self) -> None:
+        """
+        Moves the piece back to where it was before its last move.
+        """
+        self._pieceMoves.pop()
+        self._piecePosition = self._pieceMoves[-1]
+        self._isMoved = len(self._pieceMoves) > 1
     
-    # TODO: Implement is checked.
-    def draw(self, screen: pygame.Surface) -> None:
+    def draw(self, screen: "pygame.Surface") -> None:
         """
         Draws the piece on the screen.
         """
-        screenY = 700 - (self._piecePosition[1] - 1) * 100
-        screenX = ((ord(self._piecePosition[0].lower()) - ord('a')) * 100)
-        if self.isDraging:
-            return
-        if self.isSelected:
-            pygame.draw.rect(screen, (0, 0, 255), (screenX, screenY, 100, 100), 2)
-        screen.blit(self._image, (screenX, screenY))
+        from renderer import drawPiece
+        drawPiece(screen, self)
         
-    def drawPrevious(self, screen: pygame.Surface) -> None:
+    def drawPrevious(self, screen: "pygame.Surface") -> None:
         """
         Draws the previous position of the piece on the screen.
         """
-        previousPosition = self.pieceMoves[-2]
-        col = ord(previousPosition[0].lower()) - ord('a')
-        row = previousPosition[1] - 1
-        s = pygame.Surface((100, 100))
-        s.set_alpha(128)
-        s.fill((255, 255, 0))
-        screen.blit(s, (col * 100, 700 - row * 100))
+        from renderer import drawPrevious
+        drawPrevious(screen, self)
         
-    def drag(self, screen: pygame.Surface, mousePosition: Tuple[int, int]) -> None:
+    def drag(self, screen: "pygame.Surface", mousePosition: Tuple[int, int]) -> None:
         """
         Draws the piece on the screen while dragging.
         """
-        screenY = mousePosition[1] - self._image.get_rect().height / 2
-        screenX = mousePosition[0] - self._image.get_rect().width / 2
-        screen.blit(self._image, (screenX, screenY))
+        from renderer import dragPiece
+        dragPiece(screen, self, mousePosition)
         
     def select(self) -> None:
         """
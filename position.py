@@ -0,0 +1,636 @@
+import struct
+import sys
+from array import array
+from typing import Iterator, List, Optional, Tuple
+from zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS
+
+# Colors and piece types follow the order of PieceColor and PieceType,
+# so enum.value - 1 gives the index used by the bitboards.
+WHITE = 0
+BLACK = 1
+
+PAWN = 0
+ROOK = 1
+KNIGHT = 2
+BISHOP = 3
+QUEEN = 4
+KING = 5
+
+EMPTY = -1
+
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLING = WHITE_KINGSIDE | WHITE_QUEENSIDE | BLACK_KINGSIDE | BLACK_QUEENSIDE
+
+# Moves are plain ints: bits 0-5 hold the origin square, bits 6-11 the
+# destination and bits 12-15 one of these flags. Promotion flags carry the
+# promoted piece in their two low bits. move.py has the helpers.
+QUIET = 0
+DOUBLE_PAWN_PUSH = 1
+KING_CASTLE = 2
+QUEEN_CASTLE = 3
+CAPTURE = 4
+EN_PASSANT = 5
+PROMOTION = 8
+PROMOTION_CAPTURE = 12
+PROMOTION_TYPES = (KNIGHT, BISHOP, ROOK, QUEEN)
+
+FILES = "ABCDEFGH"
+PIECE_CHARS = "PRNBQKprnbqk"
+CASTLING_CHARS = "KQkq"
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+SQUARE_BB = [1 << square for square in range(64)]
+
+# Castling rights that survive a move touching the square.
+CASTLING_MASK = [ALL_CASTLING] * 64
+CASTLING_MASK[0] &= ~WHITE_QUEENSIDE
+CASTLING_MASK[4] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[7] &= ~WHITE_KINGSIDE
+CASTLING_MASK[56] &= ~BLACK_QUEENSIDE
+CASTLING_MASK[60] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASK[63] &= ~BLACK_KINGSIDE
+ALL_SQUARES = 0xFFFFFFFFFFFFFFFF
+
+# Squares are numbered a1 = 0, b1 = 1, ..., h8 = 63.
+_SQUARES = {}
+for _square in range(64):
+    _SQUARES[(FILES[_square & 7], (_square >> 3) + 1)] = _square
+    _SQUARES[(FILES[_square & 7].lower(), (_square >> 3) + 1)] = _square
+_POSITIONS = [(FILES[square & 7], (square >> 3) + 1) for square in range(64)]
+
+
+def pieceIndex(color: int, pieceType: int) -> int:
+    """
+    Returns the bitboard index of the piece with the given color and type.
+    """
+    return color * 6 + pieceType
+
+
+def colorOf(piece: int) -> int:
+    """
+    Returns the color of the given piece index.
+    """
+    return piece // 6
+
+
+def typeOf(piece: int) -> int:
+    """
+    Returns the type of the given piece index.
+    """
+    return piece % 6
+
+
+def toSquare(position: Tuple[str, int]) -> int:
+    """
+    Converts a board position like ("E", 2) to a square index.
+    """
+    return _SQUARES[position]
+
+
+def toPosition(square: int) -> Tuple[str, int]:
+    """
+    Converts a square index to a board position like ("E", 2).
+    """
+    return _POSITIONS[square]
+
+
+def squareName(square: int) -> str:
+    """
+    Returns the algebraic name of the square, e.g. "e2".
+    """
+    return FILES[square & 7].lower() + str((square >> 3) + 1)
+
+
+def lsb(bitboard: int) -> int:
+    """
+    Returns the index of the least significant set bit.
+    """
+    return (bitboard & -bitboard).bit_length() - 1
+
+
+def iterSquares(bitboard: int) -> Iterator[int]:
+    """
+    Yields the index of every set bit, lowest first.
+    """
+    while bitboard:
+        low = bitboard & -bitboard
+        yield low.bit_length() - 1
+        bitboard ^= low
+
+
+# FEN tables. Reading decodes each rank string once and caches it, since
+# real positions reuse a small set of rank strings. A cached rank holds its
+# eight squares and one packed integer with the rank's share of the twelve
+# piece bitboards, the two color bitboards and the Zobrist key, one 64-bit
+# word each. The shares of different ranks never overlap, so XOR merges the
+# ranks and a single to_bytes splits the words out again.
+_FEN_RANK_CACHE_SIZE = 1 << 14
+_FEN_RANKS = tuple({} for _ in range(8))
+_FEN_WORDS = 15
+_FEN_PIECES = {char: piece for piece, char in enumerate(PIECE_CHARS)}
+# Indexed by piece, so EMPTY (-1) picks the trailing "1".
+_FEN_CHARS = PIECE_CHARS + "1"
+_EMPTY_RUNS = tuple(("1" * length, str(length)) for length in range(8, 1, -1))
+_CASTLING_STRINGS = ["".join(char for bit, char in enumerate(CASTLING_CHARS) if rights & 1 << bit) or "-"
+                     for rights in range(16)]
+_CASTLING_FIELDS = {text: rights for rights, text in enumerate(_CASTLING_STRINGS)}
+# Indexed by square, so no en passant square (-1) picks the trailing "-".
+_EN_PASSANT_STRINGS = [squareName(square) for square in range(64)] + ["-"]
+# Indexed by side to move: white captures en passant on the sixth rank, black on the third.
+_EN_PASSANT_FIELDS = tuple(dict([(squareName(square), square) for square in squares] + [("-", -1)])
+                           for squares in (range(40, 48), range(16, 24)))
+_BACK_RANKS = 0xFF000000000000FF
+
+# Packed positions: the occupancy bitboard, the piece index of every
+# occupied square in square order as 4-bit nibbles, side to move and
+# castling rights in one byte, then the en passant square, halfmove clock
+# and fullmove number, padded to 32 bytes.
+PACKED_SIZE = 32
+_PACKED = struct.Struct("<Q16sBbBH3x")
+_PACKED_EN_PASSANT = set(_EN_PASSANT_FIELDS[WHITE].values()) | set(_EN_PASSANT_FIELDS[BLACK].values())
+# Reading caches the ranks like the FEN reader, keyed by the occupancy byte
+# and the piece nibbles of the rank.
+_PACKED_RANKS = tuple({} for _ in range(8))
+_NIBBLE_MASKS = [(1 << 4 * count) - 1 for count in range(9)]
+_BYTE_WIDTHS = [4 * byte.bit_count() for byte in range(256)]
+
+
+def _unpackWords(packed: int) -> List[int]:
+    """
+    Returns the _FEN_WORDS 64-bit words of a packed integer, lowest first,
+    in the same order on little- and big-endian hosts.
+    """
+    words = array("Q", packed.to_bytes(_FEN_WORDS * 8, "little"))
+    if sys.byteorder == "big":
+        words.byteswap()
+    return words.tolist()
+
+
+def _decodeRank(rank: int, text: str) -> Optional[Tuple[List[int], int]]:
+    """
+    Returns the squares and the packed bitboard and key share of the FEN
+    text of a rank, or None if the text is not a valid rank.
+    """
+    squares = []
+    previousDigit = False
+    for char in text:
+        if char in "12345678":
+            if previousDigit:
+                return None
+            squares += [EMPTY] * int(char)
+            previousDigit = True
+        elif char in _FEN_PIECES:
+            squares.append(_FEN_PIECES[char])
+            previousDigit = False
+        else:
+            return None
+    if len(squares) != 8:
+        return None
+    return squares, _packRank(rank, squares)
+
+
+def _packRank(rank: int, squares: List[int]) -> int:
+    """
+    Returns the packed bitboard and key share of the eight squares of a rank.
+    """
+    packed = key = 0
+    for file, piece in enumerate(squares):
+        if piece != EMPTY:
+            square = rank * 8 + file
+            packed |= 1 << (piece * 64 + square) | 1 << ((12 + piece // 6) * 64 + square)
+            key ^= PIECE_KEYS[piece * 64 + square]
+    return packed | key << 14 * 64
+
+
+def _decodePackedRank(rank: int, code: int) -> Optional[Tuple[List[int], int]]:
+    """
+    Returns the squares and the packed bitboard and key share of a rank of
+    a packed position, given as its occupancy byte followed by the nibbles
+    of its pieces, or None if a nibble is not a piece.
+    """
+    squares = [EMPTY] * 8
+    nibbles = code >> 8
+    for file in range(8):
+        if code >> file & 1:
+            if nibbles & 15 >= 12:
+                return None
+            squares[file] = nibbles & 15
+            nibbles >>= 4
+    return squares, _packRank(rank, squares)
+
+
+class Position:
+    """
+    Bitboard representation of a chess position.
+
+    The twelve piece sets are indexed by pieceIndex(color, type) and
+    occupancy holds the white, black and combined sets. squares mirrors the
+    bitboards as a 64 entry mailbox so the piece on a square is one lookup.
+    The fields are plain attributes because move generation reads them in
+    its innermost loops.
+
+    makeMove pushes an undo record of (move, captured piece, castling rights,
+    en passant square, halfmove clock, key) on history so unmakeMove can
+    restore the position without copying it.
+
+    key is a 64-bit Zobrist hash kept up to date by putPiece, removePiece and
+    makeMove. Call updateKey after assigning sideToMove, castling or
+    enPassant directly.
+    """
+    __slots__ = ("pieces", "occupancy", "squares", "sideToMove", "castling",
+                 "enPassant", "halfmoveClock", "fullmoveNumber", "history", "key")
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Position):
+            return NotImplemented
+        return (self.pieces == other.pieces
+                and self.sideToMove == other.sideToMove
+                and self.castling == other.castling
+                and self.enPassant == other.enPassant
+                and self.halfmoveClock == other.halfmoveClock
+                and self.fullmoveNumber == other.fullmoveNumber)
+
+    def __str__(self) -> str:
+        rows = []
+        for rank in range(7, -1, -1):
+            row = []
+            for file in range(8):
+                piece = self.squares[rank * 8 + file]
+                row.append("." if piece == EMPTY else PIECE_CHARS[piece])
+            rows.append(f"{rank + 1} " + " ".join(row))
+        rows.append("  a b c d e f g h")
+        return "\n".join(rows)
+
+    def clear(self) -> None:
+        """
+        Removes every piece and resets the game state.
+        """
+        self.pieces = [0] * 12
+        self.occupancy = [0, 0, 0]
+        self.squares = [EMPTY] * 64
+        self.sideToMove = WHITE
+        self.castling = 0
+        self.enPassant = -1
+        self.halfmoveClock = 0
+        self.fullmoveNumber = 1
+        self.history = []
+        self.key = 0
+
+    def copy(self) -> "Position":
+        """
+        Returns an independent copy of the position.
+        """
+        other = Position.__new__(Position)
+        other.pieces = self.pieces[:]
+        other.occupancy = self.occupancy[:]
+        other.squares = self.squares[:]
+        other.sideToMove = self.sideToMove
+        other.castling = self.castling
+        other.enPassant = self.enPassant
+        other.halfmoveClock = self.halfmoveClock
+        other.fullmoveNumber = self.fullmoveNumber
+        other.history = self.history[:]
+        other.key = self.key
+        return other
+
+    @classmethod
+    def fromFEN(cls, fen: str) -> "Position":
+        """
+        Returns the position described by the FEN string.
+
+        Raises:
+            ValueError: If the FEN string is malformed.
+        """
+        position = cls.__new__(cls)
+        position.setFEN(fen)
+        return position
+
+    def setFEN(self, fen: str) -> None:
+        """
+        Sets the position to the FEN string in a single pass. The halfmove
+        clock and fullmove number may be left out and default to 0 and 1.
+        Each side needs exactly one king, pawns may not stand on the first or
+        last rank and the en passant square must be on the rank the side to
+        move captures on. Nothing is assigned unless the whole string is valid.
+
+        Raises:
+            ValueError: If the FEN string is malformed.
+        """
+        fields = fen.split()
+        ranks = fields[0].split("/") if fields else ()
+        if len(fields) not in (4, 6) or len(ranks) != 8:
+            raise ValueError(f"Invalid FEN: {fen}")
+        squares = []
+        packed = 0
+        ranks.reverse()
+        for cache, text in zip(_FEN_RANKS, ranks):
+            entry = cache.get(text)
+            if entry is None:
+                entry = _decodeRank(len(squares) >> 3, text)
+                if entry is None:
+                    raise ValueError(f"Invalid FEN: {fen}")
+                if len(cache) >= _FEN_RANK_CACHE_SIZE:
+                    cache.clear()
+                cache[text] = entry
+            squares += entry[0]
+            packed ^= entry[1]
+        words = _unpackWords(packed)
+        if (words[KING].bit_count() != 1 or words[6 + KING].bit_count() != 1
+                or (words[PAWN] | words[6 + PAWN]) & _BACK_RANKS):
+            raise ValueError(f"Invalid FEN: {fen}")
+        key = words[14]
+        side = fields[1]
+        castling = _CASTLING_FIELDS.get(fields[2])
+        enPassant = _EN_PASSANT_FIELDS[side == "b"].get(fields[3])
+        if side not in ("w", "b") or castling is None or enPassant is None:
+            raise ValueError(f"Invalid FEN: {fen}")
+        halfmoveClock, fullmoveNumber = 0, 1
+        if len(fields) == 6:
+            if not (fields[4].isdecimal() and fields[5].isdecimal()):
+                raise ValueError(f"Invalid FEN: {fen}")
+            halfmoveClock, fullmoveNumber = int(fields[4]), int(fields[5])
+            if fullmoveNumber < 1:
+                raise ValueError(f"Invalid FEN: {fen}")
+        key ^= CASTLING_KEYS[castling]
+        if side == "b":
+            key ^= SIDE_KEY
+        if enPassant >= 0:
+            key ^= EN_PASSANT_KEYS[enPassant & 7]
+        self.pieces = words[:12]
+        self.occupancy = [words[12], words[13], words[12] | words[13]]
+        self.squares = squares
+        self.sideToMove = WHITE if side == "w" else BLACK
+        self.castling = castling
+        self.enPassant = enPassant
+        self.halfmoveClock = halfmoveClock
+        self.fullmoveNumber = fullmoveNumber
+        self.history = []
+        self.key = key
+
+    def toFEN(self) -> str:
+        """
+        Returns the FEN representation of the position with all six fields.
+        """
+        board = "".join([_FEN_CHARS[piece] for piece in self.squares])
+        placement = "/".join((board[56:64], board[48:56], board[40:48], board[32:40],
+                              board[24:32], board[16:24], board[8:16], board[0:8]))
+        # Empty squares were written as "1"; merge the runs, longest first.
+        for run, digit in _EMPTY_RUNS:
+            placement = placement.replace(run, digit)
+        return (f"{placement} {'w' if self.sideToMove == WHITE else 'b'} {_CASTLING_STRINGS[self.castling]} "
+                f"{_EN_PASSANT_STRINGS[self.enPassant]} {self.halfmoveClock} {self.fullmoveNumber}")
+
+    @classmethod
+    def fromBytes(cls, data: bytes) -> "Position":
+        """
+        Returns the position packed by toBytes.
+
+        Raises:
+            ValueError: If the data is not a packed position.
+        """
+        position = cls.__new__(cls)
+        position.setBytes(data)
+        return position
+
+    def setBytes(self, data: bytes) -> None:
+        """
+        Sets the position to one packed by toBytes. data may be any bytes-like
+        object, such as a slice of a memory-mapped file.
+
+        Raises:
+            ValueError: If the data is not a packed position.
+        """
+        if len(data) != PACKED_SIZE:
+            raise ValueError(f"Packed positions are {PACKED_SIZE} bytes, not {len(data)}.")
+        occupied, pieceBytes, state, enPassant, halfmoveClock, fullmoveNumber = _PACKED.unpack(data)
+        if occupied.bit_count() > 32 or state >> 5 or enPassant not in _PACKED_EN_PASSANT:
+            raise ValueError("Invalid packed position.")
+        nibbles = int.from_bytes(pieceBytes, "little")
+        squares = []
+        packed = 0
+        for rank, cache in enumerate(_PACKED_RANKS):
+            byte = occupied >> 8 * rank & 255
+            width = _BYTE_WIDTHS[byte]
+            code = byte | (nibbles & _NIBBLE_MASKS[width >> 2]) << 8
+            nibbles >>= width
+            entry = cache.get(code)
+            if entry is None:
+                entry = _decodePackedRank(rank, code)
+                if entry is None:
+                    raise ValueError("Invalid packed position.")
+                if len(cache) >= _FEN_RANK_CACHE_SIZE:
+                    cache.clear()
+                cache[code] = entry
+            squares += entry[0]
+            packed ^= entry[1]
+        words = _unpackWords(packed)
+        if words[KING].bit_count() != 1 or words[6 + KING].bit_count() != 1 or fullmoveNumber < 1:
+            raise ValueError("Invalid packed position.")
+        key = words[14]
+        castling = state >> 1
+        key ^= CASTLING_KEYS[castling]
+        if state & 1:
+            key ^= SIDE_KEY
+        if enPassant >= 0:
+            key ^= EN_PASSANT_KEYS[enPassant & 7]
+        self.pieces = words[:12]
+        self.occupancy = [words[12], words[13], occupied]
+        self.squares = squares
+        self.sideToMove = state & 1
+        self.castling = castling
+        self.enPassant = enPassant
+        self.halfmoveClock = halfmoveClock
+        self.fullmoveNumber = fullmoveNumber
+        self.history = []
+        self.key = key
+
+    def toBytes(self) -> bytes:
+        """
+        Returns the position packed into PACKED_SIZE bytes. The move history is not kept.
+
+        Raises:
+            ValueError: If the position has more than 32 pieces, a halfmove
+                clock above 255 or a fullmove number above 65535.
+        """
+        occupied = self.occupancy[2]
+        squares = self.squares
+        nibbles = shift = 0
+        for square in iterSquares(occupied):
+            nibbles |= squares[square] << shift
+            shift += 4
+        if shift > 128 or self.halfmoveClock > 255 or self.fullmoveNumber > 65535:
+            raise ValueError(f"Cannot pack {self.toFEN()}.")
+        return _PACKED.pack(occupied, nibbles.to_bytes(16, "little"), self.sideToMove | self.castling << 1,
+                            self.enPassant, self.halfmoveClock, self.fullmoveNumber)
+
+    def pieceAt(self, square: int) -> int:
+        """
+        Returns the piece index on the square or EMPTY.
+        """
+        return self.squares[square]
+
+    def putPiece(self, square: int, piece: int) -> None:
+        """
+        Puts the piece on an empty square.
+        """
+        bit = SQUARE_BB[square]
+        self.pieces[piece] |= bit
+        self.occupancy[piece // 6] |= bit
+        self.occupancy[2] |= bit
+        self.squares[square] = piece
+        self.key ^= PIECE_KEYS[piece * 64 + square]
+
+    def removePiece(self, square: int) -> int:
+        """
+        Removes and returns the piece on the square or EMPTY.
+        """
+        piece = self.squares[square]
+        if piece != EMPTY:
+            mask = ~SQUARE_BB[square]
+            self.pieces[piece] &= mask
+            self.occupancy[piece // 6] &= mask
+            self.occupancy[2] &= mask
+            self.squares[square] = EMPTY
+            self.key ^= PIECE_KEYS[piece * 64 + square]
+        return piece
+
+    def _movePiece(self, fromSquare: int, toSquare: int) -> None:
+        piece = self.squares[fromSquare]
+        bits = SQUARE_BB[fromSquare] | SQUARE_BB[toSquare]
+        self.pieces[piece] ^= bits
+        self.occupancy[piece // 6] ^= bits
+        self.occupancy[2] ^= bits
+        self.squares[fromSquare] = EMPTY
+        self.squares[toSquare] = piece
+        self.key ^= PIECE_KEYS[piece * 64 + fromSquare] ^ PIECE_KEYS[piece * 64 + toSquare]
+
+    def makeMove(self, move: int) -> None:
+        """
+        Plays the move and pushes its undo record on history.
+        """
+        fromSquare = move & 63
+        toSquare = (move >> 6) & 63
+        flags = move >> 12
+        piece = self.squares[fromSquare]
+        oldKey = self.key
+        if flags == EN_PASSANT:
+            captured = self.removePiece(toSquare ^ 8)
+        elif flags & CAPTURE:
+            captured = self.removePiece(toSquare)
+        else:
+            captured = EMPTY
+        self.history.append((move, captured, self.castling, self.enPassant, self.halfmoveClock, oldKey))
+
+        if flags & PROMOTION:
+            self.removePiece(fromSquare)
+            self.putPiece(toSquare, piece - PAWN + PROMOTION_TYPES[flags & 3])
+        else:
+            self._movePiece(fromSquare, toSquare)
+            if flags == KING_CASTLE:
+                self._movePiece(toSquare + 1, toSquare - 1)
+            elif flags == QUEEN_CASTLE:
+                self._movePiece(toSquare - 2, toSquare + 1)
+
+        key = self.key ^ SIDE_KEY ^ CASTLING_KEYS[self.castling]
+        if self.enPassant >= 0:
+            key ^= EN_PASSANT_KEYS[self.enPassant & 7]
+        self.castling &= CASTLING_MASK[fromSquare] & CASTLING_MASK[toSquare]
+        key ^= CASTLING_KEYS[self.castling]
+        if flags == DOUBLE_PAWN_PUSH:
+            self.enPassant = (fromSquare + toSquare) >> 1
+            key ^= EN_PASSANT_KEYS[fromSquare & 7]
+        else:
+            self.enPassant = -1
+        self.key = key
+        if piece % 6 == PAWN or captured != EMPTY:
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        if self.sideToMove == BLACK:
+            self.fullmoveNumber += 1
+        self.sideToMove ^= 1
+
+    def unmakeMove(self) -> int:
+        """
+        Takes back the last move made with makeMove and returns it.
+        """
+        move, captured, self.castling, self.enPassant, self.halfmoveClock, key = self.history.pop()
+        self.sideToMove ^= 1
+        if self.sideToMove == BLACK:
+            self.fullmoveNumber -= 1
+        fromSquare = move & 63
+        toSquare = (move >> 6) & 63
+        flags = move >> 12
+
+        if flags & PROMOTION:
+            self.removePiece(toSquare)
+            self.putPiece(fromSquare, self.sideToMove * 6 + PAWN)
+        else:
+            self._movePiece(toSquare, fromSquare)
+            if flags == KING_CASTLE:
+                self._movePiece(toSquare - 1, toSquare + 1)
+            elif flags == QUEEN_CASTLE:
+                self._movePiece(toSquare + 1, toSquare - 2)
+
+        if captured != EMPTY:
+            self.putPiece(toSquare ^ 8 if flags == EN_PASSANT else toSquare, captured)
+        self.key = key
+        return move
+
+    def computeKey(self) -> int:
+        """
+        Returns the Zobrist key of the position computed from scratch.
+        """
+        key = CASTLING_KEYS[self.castling]
+        for square, piece in self.pieceList():
+            key ^= PIECE_KEYS[piece * 64 + square]
+        if self.sideToMove == BLACK:
+            key ^= SIDE_KEY
+        if self.enPassant >= 0:
+            key ^= EN_PASSANT_KEYS[self.enPassant & 7]
+        return key
+
+    def updateKey(self) -> None:
+        """
+        Recomputes key after the state fields were assigned directly.
+        """
+        self.key = self.computeKey()
+
+    def repetitions(self) -> int:
+        """
+        Returns how often the current position occurred before since the last
+        capture or pawn move.
+        """
+        count = 0
+        history = self.history
+        # Every history record holds the key of the position before its move.
+        for index in range(len(history) - 2, max(len(history) - self.halfmoveClock, 0) - 1, -2):
+            if history[index][5] == self.key:
+                count += 1
+        return count
+
+    def pieceSet(self, color: int, pieceType: int) -> int:
+        """
+        Returns the bitboard of the pieces with the given color and type.
+        """
+        return self.pieces[color * 6 + pieceType]
+
+    def kingSquare(self, color: int) -> int:
+        """
+        Returns the square of the king of the given color or -1.
+        """
+        return lsb(self.pieces[color * 6 + KING])
+
+    def pieceList(self) -> List[Tuple[int, int]]:
+        """
+        Returns (square, piece) pairs for every occupied square.
+        """
+        squares = self.squares
+        return [(square, squares[square]) for square in iterSquares(self.occupancy[2])]
@@ -0,0 +1,228 @@
+import itertools
+from typing import Dict, List, Optional, Tuple
+import pygame
+from sprites import getSprite, SQUARE_SIZE
+from move import moveFrom
+
+LIGHT_SQUARE = (242, 225, 195)
+DARK_SQUARE = (195, 160, 130)
+CHECK_COLOR = (255, 0, 0)
+SELECTED_COLOR = (0, 0, 255)
+PREVIOUS_COLOR = (255, 255, 0)
+MOVE_DOT_COLOR = (0, 170, 0)
+
+
+# Layer names. The board layer is the whole static board, the others are
+# one-square overlays composed over it.
+BOARD_LAYER = "board"
+LAST_MOVE_LAYER = "lastMove"
+CHECK_LAYER = "check"
+SELECTED_LAYER = "selected"
+MOVE_DOT_LAYER = "moveDot"
+
+_layers: Dict[str, pygame.Surface] = {}
+
+
+def _buildBoard() -> pygame.Surface:
+    board = pygame.Surface((8 * SQUARE_SIZE, 8 * SQUARE_SIZE))
+    for row, col in itertools.product(range(8), range(8)):
+        color = DARK_SQUARE if (row + col) % 2 else LIGHT_SQUARE
+        board.fill(color, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    return board
+
+
+def _buildOverlay(kind: str) -> pygame.Surface:
+    overlay = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+    bounds = (0, 0, SQUARE_SIZE, SQUARE_SIZE)
+    if kind == LAST_MOVE_LAYER:
+        overlay.fill(PREVIOUS_COLOR + (128,))
+    elif kind == CHECK_LAYER:
+        pygame.draw.rect(overlay, CHECK_COLOR, bounds, 4)
+    elif kind == SELECTED_LAYER:
+        pygame.draw.rect(overlay, SELECTED_COLOR, bounds, 2)
+    elif kind == MOVE_DOT_LAYER:
+        pygame.draw.circle(overlay, MOVE_DOT_COLOR, (SQUARE_SIZE // 2, SQUARE_SIZE // 2), 20)
+    else:
+        raise ValueError(f"Unknown layer {kind}.")
+    return overlay
+
+
+def getLayer(name: str) -> pygame.Surface:
+    """
+    Returns a pre-rendered layer, drawn once per process and converted to the
+    display format when a display exists.
+    """
+    layer = _layers.get(name)
+    if layer is None:
+        layer = _buildBoard() if name == BOARD_LAYER else _buildOverlay(name)
+        if pygame.display.get_surface() is not None:
+            layer = layer.convert() if name == BOARD_LAYER else layer.convert_alpha()
+        _layers[name] = layer
+    return layer
+
+
+def clearLayers() -> None:
+    """
+    Drops every cached layer, for example after the display mode changed.
+    """
+    _layers.clear()
+
+
+def squareOrigin(position: Tuple[str, int]) -> Tuple[int, int]:
+    """
+    Returns the top left screen coordinates of a board position such as ("A", 2).
+    """
+    return (ord(position[0].lower()) - ord('a')) * SQUARE_SIZE, (8 - position[1]) * SQUARE_SIZE
+
+
+def drawPiece(screen: pygame.Surface, piece) -> None:
+    """
+    Draws a piece on its square unless it is being dragged.
+    """
+    if piece.isDraging:
+        return
+    origin = squareOrigin(piece.piecePosition)
+    if piece.isChecked:
+        screen.blit(getLayer(CHECK_LAYER), origin)
+    if piece.isSelected:
+        screen.blit(getLayer(SELECTED_LAYER), origin)
+    screen.blit(getSprite(piece.pieceType, piece.pieceColor), origin)
+
+
+def drawPrevious(screen: pygame.Surface, piece) -> None:
+    """
+    Highlights the square a piece moved from.
+    """
+    screen.blit(getLayer(LAST_MOVE_LAYER), squareOrigin(piece.pieceMoves[-2]))
+
+
+def dragPiece(screen: pygame.Surface, piece, mousePosition: Tuple[int, int]) -> None:
+    """
+    Draws a piece centered on the mouse while it is dragged.
+    """
+    image = getSprite(piece.pieceType, piece.pieceColor)
+    screen.blit(image, image.get_rect(center=mousePosition))
+
+
+def drawBoard(screen: pygame.Surface, board) -> None:
+    """
+    Draws the squares and the pieces of a ChessBoard.
+    """
+    screen.blit(getLayer(BOARD_LAYER), (0, 0))
+    for piece in board:
+        if piece is not None:
+            drawPiece(screen, piece)
+
+
+def drawAvailableMoves(screen: pygame.Surface, game) -> None:
+    """
+    Draws a dot on every square the selected piece of a ChessGame can move to.
+    """
+    if game.selected is not None:
+        dot = getLayer(MOVE_DOT_LAYER)
+        for position in game.avaliableMoves():
+            screen.blit(dot, squareOrigin(position))
+
+
+def drawGame(screen: pygame.Surface, game) -> None:
+    """
+    Draws the board of a ChessGame with the moves of its selected piece.
+    """
+    drawBoard(screen, game.board)
+    drawAvailableMoves(screen, game)
+
+
+class Renderer:
+    """
+    Draws a ChessGame incrementally.
+
+    The renderer remembers what every square showed in the last frame and
+    only redraws the squares that changed, so render() returns just the
+    rectangles to pass to pygame.display.update. A square is composed from
+    the pre-rendered layers: the board, the last move highlight, the check
+    and selection frames, the piece sprite and the move dot, so a frame is
+    a handful of blits.
+    """
+    def __init__(self, screen: pygame.Surface) -> None:
+        self._screen = screen
+        self._squares = [None] * 64
+        self._dragRect = None
+
+    def invalidate(self) -> None:
+        """
+        Forces the next frame to redraw every square, for example after the window was exposed.
+        """
+        self._squares = [None] * 64
+
+    def render(self, game, dragPosition: Optional[Tuple[int, int]] = None) -> List[pygame.Rect]:
+        """
+        Draws what changed since the last frame, with the selected piece
+        following dragPosition if it is being dragged, and returns the dirty rectangles.
+        """
+        states = self._squareStates(game)
+        dirty = []
+        redraw = set(index for index in range(64) if states[index] != self._squares[index])
+        if self._dragRect is not None:
+            redraw.update(_coveredSquares(self._dragRect))
+            dirty.append(self._dragRect)
+            self._dragRect = None
+        for index in redraw:
+            self._drawSquare(index, states[index])
+            dirty.append(pygame.Rect((index & 7) * SQUARE_SIZE, (index >> 3) * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+        self._squares = states
+
+        piece = game.selected
+        if dragPosition is not None and piece is not None and piece.isDraging:
+            image = getSprite(piece.pieceType, piece.pieceColor)
+            rect = image.get_rect(center=dragPosition).clip(self._screen.get_rect())
+            self._screen.blit(image, image.get_rect(center=dragPosition))
+            self._dragRect = rect
+            dirty.append(rect)
+        return dirty
+
+    def _squareStates(self, game) -> List[Tuple]:
+        """
+        Returns what every square shows, indexed by screen row * 8 + column.
+        """
+        states = [(None, False, False, False, False)] * 64
+        for piece in game.board:
+            if piece is not None:
+                index = _screenIndex(piece.piecePosition)
+                sprite = None if piece.isDraging else (piece.pieceType, piece.pieceColor)
+                states[index] = (sprite, piece.isSelected, piece.isChecked, False, False)
+        for position in game.avaliableMoves():
+            index = _screenIndex(position)
+            states[index] = states[index][:3] + (True, False)
+        history = game.board.position.history
+        if history:
+            index = _screenIndex(game.board.toPosition(moveFrom(history[-1][0])))
+            states[index] = states[index][:4] + (True,)
+        return states
+
+    def _drawSquare(self, index: int, state: Tuple) -> None:
+        sprite, selected, checked, dot, previous = state
+        screen = self._screen
+        origin = ((index & 7) * SQUARE_SIZE, (index >> 3) * SQUARE_SIZE)
+        screen.blit(getLayer(BOARD_LAYER), origin, (origin, (SQUARE_SIZE, SQUARE_SIZE)))
+        if previous:
+            screen.blit(getLayer(LAST_MOVE_LAYER), origin)
+        if checked:
+            screen.blit(getLayer(CHECK_LAYER), origin)
+        if selected:
+            screen.blit(getLayer(SELECTED_LAYER), origin)
+        if sprite is not None:
+            screen.blit(getSprite(*sprite), origin)
+        if dot:
+            screen.blit(getLayer(MOVE_DOT_LAYER), origin)
+
+
+def _screenIndex(position: Tuple[str, int]) -> int:
+    return (8 - position[1]) * 8 + ord(position[0].lower()) - ord('a')
+
+
+def _coveredSquares(rect: pygame.Rect) -> List[int]:
+    squares = []
+    for row in range(max(rect.top // SQUARE_SIZE, 0), min((rect.bottom - 1) // SQUARE_SIZE, 7) + 1):
+        for col in range(max(rect.left // SQUARE_SIZE, 0), min((rect.right - 1) // SQUARE_SIZE, 7) + 1):
+            squares.append(row * 8 + col)
+    return squares
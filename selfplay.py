@@ -0,0 +1,485 @@
+import argparse
+import math
+import os
+import pathlib
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, TextIO, Tuple
+from position import Position, STARTING_FEN, WHITE, PAWN, ROOK, QUEEN, pieceIndex
+from movegen import generateLegalMoves, isInCheck
+from move import moveToUCI
+from uci import parseUCIMove
+from pgn import PGNGame, gameToPGN, readGames
+from bitbase import probe as probeBitbase, DRAW
+from dataset import readFENPositions
+
+# Openings played when no suite is given, as UCI moves from the starting
+# position. Each is played twice with the colors swapped.
+DEFAULT_OPENINGS = (
+    "e2e4 e7e5 g1f3 b8c6 f1b5", "e2e4 e7e5 g1f3 b8c6 f1c4", "e2e4 c7c5 g1f3 d7d6", "e2e4 c7c5 b1c3 b8c6",
+    "e2e4 e7e6 d2d4 d7d5", "e2e4 c7c6 d2d4 d7d5", "e2e4 d7d5 e4d5 d8d5", "e2e4 g8f6 e4e5 f6d5",
+    "d2d4 d7d5 c2c4 e7e6", "d2d4 d7d5 c2c4 c7c6", "d2d4 g8f6 c2c4 g7g6", "d2d4 g8f6 c2c4 e7e6 g1f3 b7b6",
+    "c2c4 e7e5 b1c3 g8f6", "c2c4 c7c5 g1f3 b8c6", "g1f3 d7d5 g2g3 g8f6", "d2d4 f7f5 g2g3 g8f6",
+)
+# Games still running after this many plies are drawn.
+MAX_PLIES = 400
+# Seconds an engine may take beyond its move time before it loses on time.
+MOVE_TIMEOUT = 60.0
+# Seconds an engine may take to answer uci and isready.
+START_TIMEOUT = 30.0
+
+
+class EngineError(Exception):
+    """
+    Raised when an engine process dies, stops answering or sends an illegal move.
+    """
+
+
+class UCIProcess:
+    """
+    Chess engine speaking UCI in a child process. A reader thread queues its
+    output lines so every wait can time out.
+
+    Raises:
+        OSError: If the command cannot be started.
+        EngineError: If the engine does not complete the UCI handshake.
+    """
+    def __init__(self, command: List[str], options: Optional[Dict[str, str]] = None) -> None:
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+        self.name = " ".join(command)
+        self.send("uci")
+        for line in self._readUntil("uciok", START_TIMEOUT):
+            if line.startswith("id name "):
+                self.name = line[8:]
+        for name, value in (options or {}).items():
+            self.send(f"setoption name {name} value {value}")
+        self.isReady()
+
+    def _read(self) -> None:
+        for line in self._process.stdout:
+            self._lines.put(line.strip())
+        self._lines.put(None)
+
+    def _readUntil(self, prefix: str, timeout: float) -> List[str]:
+        """
+        Returns the lines the engine sends up to and including the first that starts with the prefix.
+
+        Raises:
+            EngineError: If the engine exits or the timeout passes first.
+        """
+        deadline = time.monotonic() + timeout
+        lines = []
+        while True:
+            try:
+                line = self._lines.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                raise EngineError(f"{self.name} did not answer in {timeout:.1f} s.") from None
+            if line is None:
+                raise EngineError(f"{self.name} exited.")
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+
+    def send(self, line: str) -> None:
+        """
+        Writes one command to the engine.
+
+        Raises:
+            EngineError: If the engine has exited.
+        """
+        try:
+            self._process.stdin.write(line + "\n")
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            raise EngineError(f"{self.name} exited.") from None
+
+    def isReady(self) -> None:
+        """
+        Waits until the engine has processed every command sent so far.
+        """
+        self.send("isready")
+        self._readUntil("readyok", START_TIMEOUT)
+
+    def newGame(self) -> None:
+        """
+        Tells the engine the next position belongs to a new game.
+        """
+        self.send("ucinewgame")
+        self.isReady()
+
+    def bestMove(self, positionCommand: str, goCommand: str, timeout: float) -> str:
+        """
+        Sets the position, searches it and returns the best move in UCI notation.
+
+        Raises:
+            EngineError: If the engine does not answer within the timeout.
+        """
+        self.send(positionCommand)
+        self.send(goCommand)
+        fields = self._readUntil("bestmove", timeout)[-1].split()
+        if len(fields) < 2:
+            raise EngineError(f"{self.name} sent no best move.")
+        return fields[1]
+
+    def close(self) -> None:
+        """
+        Asks the engine to quit and kills it if it does not.
+        """
+        try:
+            self.send("quit")
+            self._process.wait(timeout=2)
+        except (EngineError, subprocess.TimeoutExpired):
+            self._process.kill()
+            self._process.wait()
+
+
+class SPRT:
+    """
+    Sequential probability ratio test of the first engine's Elo gain.
+
+    H0 is that the gain is elo0 and H1 that it is elo1, in logistic Elo.
+    The log-likelihood ratio uses the normal approximation of the
+    generalized SPRT over win, draw and loss counts, so draws lower the
+    variance as they should. The test accepts H1 once the ratio reaches
+    the upper bound and H0 once it falls to the lower bound, with false
+    positive rate alpha and false negative rate beta.
+    """
+    def __init__(self, elo0: float = 0.0, elo1: float = 10.0, alpha: float = 0.05, beta: float = 0.05) -> None:
+        self.elo0, self.elo1 = elo0, elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.wins = self.draws = self.losses = 0
+
+    @property
+    def games(self) -> int:
+        """
+        Returns the number of games recorded.
+        """
+        return self.wins + self.draws + self.losses
+
+    def add(self, score: float) -> None:
+        """
+        Records a game scored 1, 0.5 or 0 for the first engine.
+        """
+        if score == 1:
+            self.wins += 1
+        elif score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def _meanAndVariance(self) -> Tuple[float, float]:
+        games = self.games
+        mean = (self.wins + self.draws / 2) / games
+        variance = (self.wins * (1 - mean) ** 2 + self.draws * (0.5 - mean) ** 2 + self.losses * mean ** 2) / games
+        return mean, variance
+
+    def llr(self) -> float:
+        """
+        Returns the log-likelihood ratio of H1 against H0, 0 until both sides have scored.
+        """
+        if self.games == 0:
+            return 0.0
+        mean, variance = self._meanAndVariance()
+        if variance == 0:
+            return 0.0
+        score0, score1 = _expectedScore(self.elo0), _expectedScore(self.elo1)
+        return self.games * (score1 - score0) * (2 * mean - score0 - score1) / (2 * variance)
+
+    def status(self) -> Optional[str]:
+        """
+        Returns "H1" or "H0" once the test has accepted a hypothesis, otherwise None.
+        """
+        llr = self.llr()
+        if llr >= self.upper:
+            return "H1"
+        if llr <= self.lower:
+            return "H0"
+        return None
+
+    def elo(self) -> Tuple[float, float]:
+        """
+        Returns the Elo difference measured so far with its 95% error margin.
+        The margin is infinite until the results vary.
+        """
+        if self.games == 0:
+            return 0.0, math.inf
+        mean, variance = self._meanAndVariance()
+        mean = min(max(mean, 1e-6), 1 - 1e-6)
+        if variance == 0:
+            return _eloFromScore(mean), math.inf
+        margin = 1.96 * math.sqrt(variance / self.games)
+        low, high = max(mean - margin, 1e-6), min(mean + margin, 1 - 1e-6)
+        return _eloFromScore(mean), (_eloFromScore(high) - _eloFromScore(low)) / 2
+
+    def __str__(self) -> str:
+        elo, margin = self.elo()
+        return (f"Games {self.games} +{self.wins} ={self.draws} -{self.losses}  Elo {elo:+.1f} +/- {margin:.1f}  "
+                f"LLR {self.llr():+.2f} [{self.lower:+.2f}, {self.upper:+.2f}]")
+
+
+def _expectedScore(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def _eloFromScore(score: float) -> float:
+    return -400 * math.log10(1 / score - 1) + 0.0
+
+
+def engineCommand(spec: Optional[str]) -> List[str]:
+    """
+    Returns the command that starts an engine: this checkout's UCI engine
+    for None, the uci.py of a directory holding another build, or the
+    given command line.
+    """
+    if spec is None:
+        return [sys.executable, str(pathlib.Path(__file__).parent.absolute() / "uci.py")]
+    if os.path.isdir(spec):
+        return [sys.executable, str(pathlib.Path(spec).absolute() / "uci.py")]
+    return shlex.split(spec)
+
+
+def readOpenings(path) -> List[Tuple[str, List[str]]]:
+    """
+    Returns the openings of a suite file as starting FEN and UCI moves: the
+    main lines of a PGN file, or one FEN or EPD position per line.
+
+    Raises:
+        ValueError: If a line is not a position.
+    """
+    with open(path, errors="replace") as file:
+        if pathlib.Path(path).suffix.lower() == ".pgn":
+            return [(game.startingFEN, [moveToUCI(move) for move in game.moves]) for game in readGames(file)
+                    if game.error is None]
+        return [(position.toFEN(), []) for position in readFENPositions(file)]
+
+
+def _insufficientMaterial(position: Position) -> bool:
+    """
+    Returns True if neither side can mate: kings alone or with a single minor piece.
+    """
+    pieces = position.pieces
+    for color in range(2):
+        if pieces[pieceIndex(color, PAWN)] | pieces[pieceIndex(color, ROOK)] | pieces[pieceIndex(color, QUEEN)]:
+            return False
+    return position.occupancy[2].bit_count() <= 3
+
+
+def adjudicate(position: Position) -> Optional[Tuple[str, str]]:
+    """
+    Returns the result and reason if the game is over, by the rules or by
+    the endgame bitbases, otherwise None.
+    """
+    sideToMoveLoses = "0-1" if position.sideToMove == WHITE else "1-0"
+    if not generateLegalMoves(position):
+        return (sideToMoveLoses, "checkmate") if isInCheck(position) else ("1/2-1/2", "stalemate")
+    if position.halfmoveClock >= 100:
+        return "1/2-1/2", "fifty move rule"
+    if position.repetitions() >= 2:
+        return "1/2-1/2", "threefold repetition"
+    if _insufficientMaterial(position):
+        return "1/2-1/2", "insufficient material"
+    result = probeBitbase(position)
+    if result is not None:
+        if result == DRAW:
+            return "1/2-1/2", "bitbase draw"
+        sideToMoveWins = "1-0" if position.sideToMove == WHITE else "0-1"
+        return (sideToMoveWins if result > 0 else sideToMoveLoses), "bitbase win"
+    return None
+
+
+def playGame(white: UCIProcess, black: UCIProcess, opening: Tuple[str, List[str]], goCommand: str,
+             timeout: float = MOVE_TIMEOUT, maxPlies: int = MAX_PLIES,
+             stopEvent: Optional[threading.Event] = None) -> Optional[PGNGame]:
+    """
+    Plays one game from the opening and returns it with its Result tag and a
+    Termination comment, or None if stopEvent was set first. An engine that
+    crashes, times out or plays an illegal move loses.
+    """
+    fen, openingMoves = opening
+    position = Position.fromFEN(fen)
+    for text in openingMoves:
+        position.makeMove(parseUCIMove(position, text))
+    white.newGame()
+    black.newGame()
+    start = position.copy()
+    while start.history:
+        start.unmakeMove()
+    startCommand = "position startpos" if start.toFEN() == STARTING_FEN else f"position fen {start.toFEN()}"
+    played = [moveToUCI(record[0]) for record in position.history]
+    outcome = adjudicate(position)
+    while outcome is None:
+        if stopEvent is not None and stopEvent.is_set():
+            return None
+        if len(played) >= maxPlies:
+            outcome = "1/2-1/2", "move limit"
+            break
+        engine = white if position.sideToMove == WHITE else black
+        loses = "0-1" if position.sideToMove == WHITE else "1-0"
+        command = f"{startCommand} moves {' '.join(played)}" if played else startCommand
+        try:
+            text = engine.bestMove(command, goCommand, timeout)
+            position.makeMove(parseUCIMove(position, text))
+        except EngineError as error:
+            outcome = loses, str(error)
+            break
+        except ValueError:
+            outcome = loses, f"illegal move {text}"
+            break
+        played.append(text)
+        outcome = adjudicate(position)
+    game = PGNGame.fromPosition(position, {"Event": "ChessPy2 self-play", "White": white.name,
+                                           "Black": black.name, "Result": outcome[0]})
+    game.comments[len(game.moves)] = outcome[1]
+    return game
+
+
+def runMatch(first: List[str], second: List[str], openings: List[Tuple[str, List[str]]], games: int,
+             goCommand: str, concurrency: int = 1, sprt: Optional[SPRT] = None,
+             firstOptions: Optional[Dict[str, str]] = None, secondOptions: Optional[Dict[str, str]] = None,
+             timeout: float = MOVE_TIMEOUT, maxPlies: int = MAX_PLIES, output: Optional[TextIO] = None,
+             pgnFile: Optional[TextIO] = None) -> SPRT:
+    """
+    Plays up to the given number of games between the two engine commands
+    and returns the SPRT holding the first engine's results.
+
+    Game 2n and 2n+1 play the same opening with the colors swapped. Up to
+    concurrency games run at once, each worker keeping its own pair of
+    engine processes, so the engines search in parallel processes while
+    the threads only relay moves. The match stops early once the SPRT
+    accepts a hypothesis. A progress line per game goes to output and the
+    games to pgnFile.
+    """
+    sprt = sprt if sprt is not None else SPRT()
+    stopEvent = threading.Event()
+    local = threading.local()
+    processes = []
+    lock = threading.Lock()
+
+    def engines() -> Tuple[UCIProcess, UCIProcess]:
+        if not hasattr(local, "engines"):
+            local.engines = (UCIProcess(first, firstOptions), UCIProcess(second, secondOptions))
+            with lock:
+                processes.extend(local.engines)
+        return local.engines
+
+    def play(index: int) -> Optional[Tuple[int, PGNGame]]:
+        if stopEvent.is_set():
+            return None
+        firstEngine, secondEngine = engines()
+        firstIsWhite = index % 2 == 0
+        white, black = (firstEngine, secondEngine) if firstIsWhite else (secondEngine, firstEngine)
+        game = playGame(white, black, openings[index // 2 % len(openings)], goCommand, timeout, maxPlies, stopEvent)
+        return None if game is None else (index, game)
+
+    executor = ThreadPoolExecutor(max(concurrency, 1))
+    try:
+        pending = set()
+        nextGame = 0
+        while nextGame < games or pending:
+            while nextGame < games and len(pending) < max(concurrency, 1) * 2 and not stopEvent.is_set():
+                pending.add(executor.submit(play, nextGame))
+                nextGame += 1
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished = future.result()
+                if finished is None:
+                    continue
+                index, game = finished
+                firstIsWhite = index % 2 == 0
+                score = {"1-0": 1.0, "0-1": 0.0}.get(game.result, 0.5)
+                sprt.add(score if firstIsWhite else 1 - score)
+                if output is not None:
+                    output.write(f"Game {index + 1} {game.result} ({game.comments[len(game.moves)]})  {sprt}\n")
+                    output.flush()
+                if pgnFile is not None:
+                    pgnFile.write(gameToPGN(game))
+                    pgnFile.flush()
+                if sprt.status() is not None:
+                    stopEvent.set()
+    finally:
+        stopEvent.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        for process in processes:
+            process.close()
+    return sprt
+
+
+def _options(pairs: List[str]) -> Dict[str, str]:
+    options = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        options[name] = value
+    return options
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs a self-play match from the command line and returns the exit code:
+    0 if the SPRT accepted H1 or no hypothesis, 1 if it accepted H0.
+    """
+    parser = argparse.ArgumentParser(description="Play two engines against each other and test the Elo gain "
+                                                 "of the first with an SPRT.")
+    parser.add_argument("--first", help="first engine: build directory with uci.py or command (default: this one)")
+    parser.add_argument("--second", help="second engine, the baseline (default: this one)")
+    parser.add_argument("--first-option", action="append", default=[], metavar="NAME=VALUE",
+                        help="UCI option of the first engine, e.g. Hash=64 (repeatable)")
+    parser.add_argument("--second-option", action="append", default=[], metavar="NAME=VALUE",
+                        help="UCI option of the second engine (repeatable)")
+    parser.add_argument("--openings", help="opening suite, a PGN file or FEN/EPD lines (default: built in)")
+    parser.add_argument("--games", type=int, default=1000, help="most games to play (default: 1000)")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1,
+                        help="games played at once (default: CPU count)")
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument("--nodes", type=int, help="nodes per move")
+    limit.add_argument("--movetime", type=int, help="milliseconds per move")
+    limit.add_argument("--depth", type=int, help="plies per move")
+    parser.add_argument("--elo0", type=float, default=0.0, help="Elo gain of H0 (default: 0)")
+    parser.add_argument("--elo1", type=float, default=10.0, help="Elo gain of H1 (default: 10)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="false positive rate (default: 0.05)")
+    parser.add_argument("--beta", type=float, default=0.05, help="false negative rate (default: 0.05)")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES, help=f"draw after (default: {MAX_PLIES})")
+    parser.add_argument("--pgn", help="write the games to this PGN file")
+    args = parser.parse_args(argv)
+
+    if args.nodes is not None:
+        goCommand, timeout = f"go nodes {args.nodes}", MOVE_TIMEOUT
+    elif args.depth is not None:
+        goCommand, timeout = f"go depth {args.depth}", MOVE_TIMEOUT
+    else:
+        movetime = args.movetime if args.movetime is not None else 100
+        goCommand, timeout = f"go movetime {movetime}", movetime / 1000 * 3 + 5
+    if args.openings is not None:
+        openings = readOpenings(args.openings)
+    else:
+        openings = [(STARTING_FEN, line.split()) for line in DEFAULT_OPENINGS]
+    if not openings:
+        parser.error("the opening suite is empty")
+    sprt = SPRT(args.elo0, args.elo1, args.alpha, args.beta)
+    pgnFile = open(args.pgn, "w") if args.pgn is not None else None
+    try:
+        runMatch(engineCommand(args.first), engineCommand(args.second), openings, args.games, goCommand,
+                 args.concurrency, sprt, _options(args.first_option), _options(args.second_option), timeout,
+                 args.max_plies, sys.stdout, pgnFile)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pgnFile is not None:
+            pgnFile.close()
+    status = sprt.status()
+    print(f"{sprt}\n{'H1 accepted' if status == 'H1' else 'H0 accepted' if status == 'H0' else 'No decision'}")
+    return 1 if status == "H0" else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
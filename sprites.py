@@ -0,0 +1,47 @@
+import pathlib
+from enum import Enum
+from typing import Dict, Tuple
+import pygame
+
+PIECES_DIR = pathlib.Path(__file__).parent.absolute() / "pieces"
+SQUARE_SIZE = 100
+
+# Decoded images by (type, color) and scaled sprites by (type, color, size),
+# keyed by the PieceType and PieceColor names and shared by every Piece so no
+# image is read from disk twice.
+_images: Dict[Tuple[str, str], pygame.Surface] = {}
+_sprites: Dict[Tuple[str, str, int], pygame.Surface] = {}
+
+
+def _loadImage(pieceType: Enum, pieceColor: Enum) -> pygame.Surface:
+    key = (pieceType.name, pieceColor.name)
+    image = _images.get(key)
+    if image is None:
+        path = PIECES_DIR / pieceColor.name.lower() / f"{pieceType.name.lower()}.png"
+        image = pygame.image.load(str(path))
+        _images[key] = image
+    return image
+
+
+def getSprite(pieceType: Enum, pieceColor: Enum, size: int = SQUARE_SIZE) -> pygame.Surface:
+    """
+    Returns the image of the piece scaled to size x size pixels, loaded once
+    per process. Sprites made after the display is set up are converted to
+    its pixel format so they blit fast.
+    """
+    key = (pieceType.name, pieceColor.name, size)
+    sprite = _sprites.get(key)
+    if sprite is None:
+        sprite = pygame.transform.scale(_loadImage(pieceType, pieceColor), (size, size))
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert_alpha()
+        _sprites[key] = sprite
+    return sprite
+
+
+def clearSprites() -> None:
+    """
+    Drops every cached sprite, for example after the display mode changed.
+    """
+    _images.clear()
+    _sprites.clear()
@@ -0,0 +1,90 @@
+import sys, os, json
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import analysis
+from analysis import analyzeGame, analyzeFEN, analyzeFile, BLUNDER_NAG
+from pgn import parseGame, readGames
+from move import moveToUCI
+
+GAMES = """[Event "Scholar"]
+[Result "1-0"]
+
+1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0
+
+[Event "Short"]
+
+1. d4 d5 2. Bf4 {London} *
+"""
+
+def test_analyzeGame():
+    """
+    Tests that blunders are flagged with the better move as a variation.
+    """
+    game = parseGame(GAMES.split("\n\n[Event")[0])
+    assert analyzeGame(game, 2) == 8
+    assert game.nags[6] == [BLUNDER_NAG]
+    assert game.comments[6] == "[%eval #1]"
+    assert moveToUCI(game.variations[5][0].moves[0]) != "g8f6"
+    assert all(comment.startswith("[%eval ") for comment in game.comments.values())
+
+def test_analyzeFEN():
+    """
+    Tests the EPD output of a position.
+    """
+    assert analyzeFEN("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", 2) == "6k1/5ppp/8/8/8/8/8/R5K1 w - - bm Ra8#; ce 29999; acd 1;"
+    assert analyzeFEN("8/8/8 w - - 0 1").endswith('c0 "Invalid FEN: 8/8/8 w - - 0 1";')
+
+def test_analyzeFile(tmp_path):
+    """
+    Tests analysing a file on a process pool and resuming from a checkpoint.
+    """
+    source = tmp_path / "games.pgn"
+    source.write_text(GAMES)
+    output = tmp_path / "annotated.pgn"
+    progress = []
+    assert analyzeFile(str(source), str(output), 1, workers=2, progress=lambda *info: progress.append(info)) == 2
+    games = list(readGames(open(output)))
+    assert [game.headers["Event"] for game in games] == ["Scholar", "Short"]
+    assert games[1].comments[3].endswith("London")
+    assert [info[0] for info in progress] == [1, 2]
+    assert not os.path.exists(str(output) + ".checkpoint")
+
+    # An interrupted run left one game and some partial output behind.
+    complete = output.read_text()
+    first = complete[:complete.index("[Event \"Short\"]")]
+    output.write_text(first + "[Event \"Sho")
+    checkpoint = tmp_path / "run.checkpoint"
+    checkpoint.write_text(json.dumps({"input": str(source), "done": 1, "outputSize": len(first.encode())}))
+    assert analyzeFile(str(source), str(output), 1, workers=1, checkpointPath=str(checkpoint)) == 2
+    assert output.read_text() == complete
+    assert not checkpoint.exists()
+
+    positions = tmp_path / "positions.fen"
+    positions.write_text("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1\n\n4k3/8/8/8/8/8/8/4K3 b - - 0 1\n")
+    assert analyzeFile(str(positions), str(tmp_path / "positions.epd"), 1, workers=1) == 2
+    assert (tmp_path / "positions.epd").read_text().splitlines()[0].startswith("6k1/5ppp/8/8/8/8/8/R5K1 w - - bm Ra8#")
+
+def test_analyzeFile_errors(tmp_path, monkeypatch):
+    """
+    Tests that a failing game or FEN is written with its error and the run goes on.
+    """
+    search = analysis.analyzePosition
+
+    def failOnBareKings(position, *args):
+        if position.occupancy[2].bit_count() == 2:
+            raise KeyError(56)
+        return search(position, *args)
+
+    monkeypatch.setattr(analysis, "analyzePosition", failOnBareKings)
+    positions = tmp_path / "positions.fen"
+    positions.write_text("4k3/8/8/8/8/8/8/4K3 w - - 0 1\n6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1\n")
+    output = tmp_path / "positions.epd"
+    assert analyzeFile(str(positions), str(output), 1, workers=1) == 2
+    lines = output.read_text().splitlines()
+    assert lines[0] == '4k3/8/8/8/8/8/8/4K3 w - - 0 1 c0 "Analysis failed: KeyError: 56";'
+    assert " bm Ra8#" in lines[1]
+    assert not os.path.exists(str(output) + ".checkpoint")
+    games = tmp_path / "games.pgn"
+    games.write_text('[Event "Bare"]\n[SetUp "1"]\n[FEN "4k3/8/8/8/8/8/8/4K3 w - - 0 1"]\n\n1. Kd1 *\n\n' + GAMES)
+    assert analyzeFile(str(games), str(tmp_path / "games.out.pgn"), 1, workers=1) == 3
+    annotated = list(readGames(open(tmp_path / "games.out.pgn")))
+    assert annotated[0].comments[0] == "Analysis failed: KeyError: 56" and len(annotated) == 3
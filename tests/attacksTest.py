@@ -0,0 +1,62 @@
+import sys, os, random
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import toSquare
+from attacks import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, rookAttacks, bishopAttacks, queenAttacks
+from attacks import MAGIC_CACHE, _rayRookAttacks, _rayBishopAttacks, _loadMagics, _saveMagics
+
+def _squares(*names):
+    bitboard = 0
+    for name in names:
+        bitboard |= 1 << toSquare((name[0], int(name[1])))
+    return bitboard
+
+def test_stepAttacks():
+    """
+    Tests the knight, king and pawn attack tables.
+    """
+    assert KNIGHT_ATTACKS[toSquare(("A", 1))] == _squares("B3", "C2")
+    assert KING_ATTACKS[toSquare(("H", 8))] == _squares("G8", "G7", "H7")
+    assert PAWN_ATTACKS[0][toSquare(("E", 4))] == _squares("D5", "F5")
+    assert PAWN_ATTACKS[1][toSquare(("A", 7))] == _squares("B6")
+
+def test_slidingAttacks():
+    """
+    Tests that sliding attacks stop on the first blocker of every ray.
+    """
+    occupied = _squares("D6", "F4", "B2", "D2", "G7")
+    d4 = toSquare(("D", 4))
+    assert rookAttacks(d4, occupied) == _squares("D5", "D6", "E4", "F4", "D3", "D2", "C4", "B4", "A4")
+    assert bishopAttacks(d4, occupied) == _squares("E5", "F6", "G7", "C5", "B6", "A7", "C3", "B2", "E3", "F2", "G1")
+    assert queenAttacks(d4, 0) == rookAttacks(d4, 0) | bishopAttacks(d4, 0)
+
+def test_BETWEEN():
+    """
+    Tests the squares between two squares.
+    """
+    assert BETWEEN[toSquare(("A", 1))][toSquare(("D", 4))] == _squares("B2", "C3")
+    assert BETWEEN[toSquare(("H", 8))][toSquare(("H", 5))] == _squares("H7", "H6")
+    assert BETWEEN[toSquare(("A", 1))][toSquare(("B", 3))] == 0
+
+def test_magics():
+    """
+    Tests the magic lookups against walking the rays on random occupancies.
+    """
+    generator = random.Random(7)
+    for _ in range(2000):
+        square = generator.randrange(64)
+        occupied = generator.getrandbits(64) & generator.getrandbits(64)
+        assert rookAttacks(square, occupied) == _rayRookAttacks(square, occupied)
+        assert bishopAttacks(square, occupied) == _rayBishopAttacks(square, occupied)
+
+def test_magicCache(tmp_path):
+    """
+    Tests that the magic cache round-trips and that a damaged cache is ignored.
+    """
+    cached = _loadMagics(MAGIC_CACHE)
+    assert cached is not None
+    path = tmp_path / "magics.bin"
+    _saveMagics(path, *cached)
+    assert _loadMagics(path) == cached
+    path.write_bytes(path.read_bytes()[:-8])
+    assert _loadMagics(path) is None
+    assert _loadMagics(tmp_path / "missing.bin") is None
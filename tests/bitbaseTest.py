@@ -0,0 +1,47 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import Position, WHITE, BLACK, PAWN, KING, pieceIndex
+from board import ChessBoard
+from engine import Search
+from move import moveToUCI
+from bitbase import BITBASE_DIR, WIN, DRAW, LOSS, generateBitbase, writeBitbase, probe
+
+def test_probe():
+    """
+    Tests probing the shipped bitbases from either side and with either side to move.
+    """
+    assert probe(Position.fromFEN("4k3/8/4K3/4P3/8/8/8/8 w - - 0 1")) == WIN
+    assert probe(Position.fromFEN("4k3/8/4K3/4P3/8/8/8/8 b - - 0 1")) == LOSS
+    assert probe(Position.fromFEN("k7/8/1K6/8/8/8/P7/8 w - - 0 1")) == DRAW
+    assert probe(Position.fromFEN("8/8/8/8/8/8/p7/k1K5 w - - 0 1")) == DRAW
+    assert probe(Position.fromFEN("8/8/8/8/8/4k3/8/R3K3 b - - 0 1")) == LOSS
+    assert probe(Position.fromFEN("k7/2Q5/1K6/8/8/8/8/8 b - - 0 1")) == DRAW
+    assert probe(Position.fromFEN("8/8/8/8/5k2/8/1KN5/3B4 w - - 0 1")) == WIN
+    assert probe(Position.fromFEN("8/8/8/8/8/2k5/1NB5/K7 b - - 0 1")) == DRAW
+    assert probe(Position.fromFEN("8/8/8/8/8/4k3/4P3/4K2R w - - 0 1")) is None
+    # Pawns on the first or last rank have no bitbase entry.
+    backRank = Position()
+    for square, piece in ((4, pieceIndex(WHITE, KING)), (7, pieceIndex(WHITE, PAWN)), (60, pieceIndex(BLACK, KING))):
+        backRank.putPiece(square, piece)
+    assert probe(backRank) is None
+    board = ChessBoard()
+    board.fromFEN("8/8/8/2k5/8/8/8/3QK3 w - - 0 1")
+    assert board.probeEndgame() == WIN
+
+def test_generateBitbase(tmp_path):
+    """
+    Tests that generating the KRK bitbase reproduces the shipped file.
+    """
+    strong, weak = generateBitbase("KRK")
+    writeBitbase(tmp_path / "KRK.bin", "KRK", strong, weak)
+    assert (tmp_path / "KRK.bin").read_bytes() == (BITBASE_DIR / "KRK.bin").read_bytes()
+
+def test_Search_bitbase():
+    """
+    Tests that the search keeps bitbase wins and stops at bitbase draws.
+    """
+    search = Search(Position.fromFEN("8/8/8/8/8/4k3/4P3/4K3 w - - 0 1"))
+    _, score = search.run(maxDepth=8)
+    assert score == 0 and search.nodes < 100
+    move, _ = Search(Position.fromFEN("8/8/8/3k4/8/8/3PK3/8 w - - 0 1")).run(maxDepth=4)
+    assert moveToUCI(move) == "e2d3"
@@ -26,3 +26,38 @@ def test_ChessBoard_str():
                             7 . . . . . . . .
                             8 . . . . . . . .
                             """
+
+def test_ChessBoard_position():
+    """
+    Tests that the ChessBoard class keeps its bitboard position in sync.
+    """
+    from piece import Piece, PieceType, PieceColor
+    board = ChessBoard(flipped=True)
+    board[("E", 1)] = Piece(PieceType.KING, PieceColor.BLACK, ("E", 1))
+    assert board.position.kingSquare(1) == 60
+    assert board.toSquare(("E", 1)) == 60
+    assert board.toPosition(60) == ("E", 1)
+    board[("E", 1)] = None
+    assert board.position.occupancy[2] == 0
+    board.reset(flipped=False)
+    assert not board.flipped and board.toSquare(("E", 1)) == 4
+
+def test_ChessBoard_fromFEN():
+    """
+    Tests the ChessBoard class' fromFEN and toFEN methods.
+    """
+    from piece import PieceType, PieceColor
+    fen = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R b Kq - 3 17"
+    for flipped in (False, True):
+        board = ChessBoard(flipped=flipped)
+        board.fromFEN(fen)
+        assert board.toFEN() == fen
+        king = board[board.toPosition(60)]
+        assert (king.pieceType, king.pieceColor, king.piecePosition) == (PieceType.KING, PieceColor.BLACK, board.toPosition(60))
+        assert len(list(board)) == 32
+        try:
+            board.fromFEN("8/8/8 w - - 0 1")
+            assert False
+        except ValueError:
+            pass
+        assert board.toFEN() == fen
@@ -0,0 +1,92 @@
+import sys, os, io, random, struct
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import Position, STARTING_FEN
+from book import OpeningBook, polyglotKey, polyglotMove, BEST_MOVE_LEVEL
+from uci import UCIEngine, parseUCIMove
+from move import moveToUCI
+from game import ChessGame
+from piece import PieceColor
+
+def _play(*moves: str) -> Position:
+    position = Position.fromFEN(STARTING_FEN)
+    for text in moves:
+        position.makeMove(parseUCIMove(position, text))
+    return position
+
+def _writeBook(path, lines) -> None:
+    """
+    Writes a Polyglot book of (position, move, weight) lines, sorted by key.
+    """
+    entries = sorted((polyglotKey(position), polyglotMove(parseUCIMove(position, move)), weight)
+                     for position, move, weight in lines)
+    with open(path, "wb") as file:
+        for key, move, weight in entries:
+            file.write(struct.pack(">QHHI", key, move, weight, 0))
+
+def test_polyglotKey():
+    """
+    Tests the Polyglot keys of the format's reference positions.
+    """
+    assert polyglotKey(_play()) == 0x463B96181691FC9C
+    assert polyglotKey(_play("e2e4")) == 0x823C9B50FD114196
+    assert polyglotKey(_play("e2e4", "d7d5", "e4e5", "f7f5")) == 0x22A48B5A8E47FF78
+    assert polyglotKey(_play("e2e4", "d7d5", "e4e5", "f7f5", "e1e2", "e8f7")) == 0x00FDD303C946BDD9
+    assert polyglotKey(_play("a2a4", "b7b5", "h2h4", "b5b4", "c2c4", "b4c3", "a1a3")) == 0x5C3F9B829B279560
+
+def test_OpeningBook(tmp_path):
+    """
+    Tests looking up, choosing and decoding book moves, castling included.
+    """
+    start = _play()
+    castle = Position.fromFEN("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+    path = tmp_path / "book.bin"
+    _writeBook(path, [(start, "e2e4", 10), (start, "d2d4", 30), (start, "g1f3", 0),
+                      (castle, "e1g1", 1), (castle, "e1c1", 2), (_play("e2e4"), "c7c5", 5)])
+    with OpeningBook(path) as book:
+        assert len(book) == 6
+        assert sorted((moveToUCI(move), weight) for move, weight in book.entries(start)) == \
+            [("d2d4", 30), ("e2e4", 10), ("g1f3", 0)]
+        assert moveToUCI(book.bestMove(start)) == "d2d4"
+        assert sorted(moveToUCI(move) for move, _ in book.entries(castle)) == ["e1c1", "e1g1"]
+        generator = random.Random(1)
+        picks = {moveToUCI(book.weightedMove(start, generator)) for _ in range(50)}
+        assert picks == {"d2d4", "e2e4"}
+        assert moveToUCI(book.move(start, BEST_MOVE_LEVEL)) == "d2d4"
+        assert book.bestMove(_play("d2d4")) is None
+        assert book.entries(_play("e2e4", "e7e5")) == []
+    assert book.entries(start) == []
+
+def test_OpeningBook_invalid(tmp_path):
+    """
+    Tests empty books and files that are not books.
+    """
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    with OpeningBook(path) as book:
+        assert len(book) == 0 and book.bestMove(_play()) is None
+    path.write_bytes(b"\0" * 17)
+    try:
+        OpeningBook(path)
+        assert False
+    except ValueError:
+        pass
+
+def test_book_players(tmp_path):
+    """
+    Tests that the computer player and the UCI engine play book moves without searching.
+    """
+    path = tmp_path / "book.bin"
+    _writeBook(path, [(_play("e2e4"), "c7c5", 1)])
+    game = ChessGame(PieceColor.WHITE, 10, book=str(path))
+    game.makeMove(parseUCIMove(game.board.position, "e2e4"))
+    assert moveToUCI(game.computerMove()) == "c7c5"
+    game.close()
+    assert game.book is None
+    output = io.StringIO()
+    engine = UCIEngine(output)
+    for command in (f"setoption name BookFile value {path}", "setoption name OwnBook value true",
+                    "position startpos moves e2e4", "go depth 20"):
+        engine.handle(command)
+    engine.wait()
+    engine.close()
+    assert output.getvalue().splitlines() == ["bestmove c7c5"]
@@ -0,0 +1,60 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import Position, STARTING_FEN, PACKED_SIZE
+from board import ChessBoard
+from benchmark import randomFENs
+from dataset import PositionDataset, writeDataset, main
+
+def test_Position_toBytes():
+    """
+    Tests that positions survive packing with their state fields and keys.
+    """
+    fens = randomFENs(300, seed=3) + ["r3k2r/8/8/3pP3/8/8/8/R3K2R w Kq d6 17 250"]
+    for fen in fens:
+        position = Position.fromFEN(fen)
+        data = position.toBytes()
+        assert len(data) == PACKED_SIZE
+        unpacked = Position.fromBytes(data)
+        assert unpacked.toFEN() == fen and unpacked == position and unpacked.key == position.key
+    for data in (b"\0" * 31, b"\xff" * 32, Position().toBytes()):
+        try:
+            Position.fromBytes(data)
+            assert False
+        except ValueError:
+            pass
+    board = ChessBoard()
+    board.fromFEN(STARTING_FEN)
+    data = board.toBytes()
+    board.fromFEN("8/8/8/4k3/8/8/8/4K3 w - - 0 1")
+    board.fromBytes(data)
+    assert board.toFEN() == STARTING_FEN and len(board.getPieces(board[("E", 1)].pieceColor)) == 16
+
+def test_PositionDataset(tmp_path):
+    """
+    Tests writing, indexing, slicing and converting position datasets.
+    """
+    fens = randomFENs(100, seed=4)
+    path = tmp_path / "positions.bin"
+    assert writeDataset(path, (Position.fromFEN(fen) for fen in fens)) == 100
+    with PositionDataset(path) as dataset:
+        assert len(dataset) == 100
+        assert dataset[0].toFEN() == fens[0] and dataset[-1].toFEN() == fens[-1]
+        view = dataset[10:50:2]
+        assert len(view) == 20 and view[1].toFEN() == fens[12]
+        assert [position.toFEN() for position in dataset[90:]] == fens[90:]
+        records = dataset[5:7].records
+        assert bytes(records) == Position.fromFEN(fens[5]).toBytes() + Position.fromFEN(fens[6]).toBytes()
+        records.release()
+        view.close()
+    fenPath = tmp_path / "positions.epd"
+    fenPath.write_text("\n".join(" ".join(fen.split()[:4]) + " bm e4;" for fen in fens[:3]) + "\n")
+    assert main([str(fenPath), str(path)]) == 0
+    with PositionDataset(path) as dataset:
+        assert [" ".join(position.toFEN().split()[:4]) for position in dataset] == \
+            [" ".join(fen.split()[:4]) for fen in fens[:3]]
+    path.write_bytes(b"not a dataset")
+    try:
+        PositionDataset(path)
+        assert False
+    except ValueError:
+        pass
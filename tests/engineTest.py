@@ -0,0 +1,67 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import Position, STARTING_FEN
+from move import moveToUCI, NULL_MOVE
+from movegen import generateLegalMoves
+from engine import Search, evaluate, levelLimits, findBestMove, MATE_SCORE, MATE_BOUND, LEVEL_LIMITS
+
+def test_evaluate():
+    """
+    Tests that the evaluation is symmetric.
+    """
+    assert evaluate(Position.fromFEN(STARTING_FEN)) == 0
+    white = Position.fromFEN("4k3/8/8/8/8/8/8/3QK3 w - - 0 1")
+    black = Position.fromFEN("3qk3/8/8/8/8/8/8/4K3 b - - 0 1")
+    assert evaluate(white) == evaluate(black) > 800
+
+def test_Search_mate():
+    """
+    Tests that the search finds a mate in one and leaves the position unchanged.
+    """
+    fen = "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4"
+    position = Position.fromFEN(fen)
+    move, score = Search(position).run(3)
+    assert moveToUCI(move) == "h5f7"
+    assert score >= MATE_BOUND
+    assert position.toFEN() == fen
+
+def test_Search_noMoves():
+    """
+    Tests the search in a checkmated position.
+    """
+    position = Position.fromFEN("7k/6Q1/6K1/8/8/8/8/8 b - - 0 1")
+    move, score = Search(position).run(2)
+    assert move == NULL_MOVE
+    assert score <= -MATE_BOUND
+
+def test_levelLimits():
+    """
+    Tests the levelLimits function.
+    """
+    assert levelLimits(1) == LEVEL_LIMITS[0]
+    assert levelLimits(0) == LEVEL_LIMITS[0]
+    assert levelLimits(10.0) == LEVEL_LIMITS[-1]
+    assert findBestMove(Position.fromFEN(STARTING_FEN), 1) != NULL_MOVE
+
+def test_Search_moveOrdering():
+    """
+    Tests that captures are ordered by MVV-LVA and that ordering keeps the tree small.
+    """
+    position = Position.fromFEN("4k3/8/2n1q2r/3P4/8/5N2/8/K6Q w - - 0 1")
+    moves = [moveToUCI(move) for move in Search(position)._orderedMoves(1, NULL_MOVE)]
+    assert moves[:3] == ["d5e6", "h1h6", "d5c6"]
+    assert sorted(moves) == sorted(moveToUCI(move) for move in generateLegalMoves(position))
+    kiwipete = Position.fromFEN("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    search = Search(kiwipete)
+    search.run(4)
+    # Unordered, this search visits close to 900,000 nodes.
+    assert search.nodes < 100000
+
+def test_Search_quiesceCheck():
+    """
+    Tests that quiescence searches the evasions of a side in check instead of standing pat.
+    """
+    mated = Position.fromFEN("Q5k1/5ppp/8/8/8/8/5PPP/6K1 b - - 1 1")
+    assert Search(mated)._quiesce(-MATE_SCORE, MATE_SCORE, 1) == -MATE_SCORE + 1
+    checked = Position.fromFEN("Q5k1/5pp1/7p/8/8/8/5PPP/6K1 b - - 1 1")
+    assert -MATE_BOUND < Search(checked)._quiesce(-MATE_SCORE, MATE_SCORE, 1) < 0
@@ -0,0 +1,20 @@
+import sys, os, subprocess
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def test_headlessImports():
+    """
+    Tests that the rules model plays a game without importing pygame, tkinter or PIL.
+    """
+    script = (
+        "import sys\n"
+        "from game import ChessGame\n"
+        "from piece import PieceColor\n"
+        "game = ChessGame(PieceColor.WHITE, 1)\n"
+        "game.makeMove(game.generateMoves()[0])\n"
+        "game.playComputerMove()\n"
+        "loaded = [name for name in ('pygame', 'tkinter', 'PIL') if name in sys.modules]\n"
+        "assert not loaded, loaded\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True)
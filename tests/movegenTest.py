@@ -0,0 +1,111 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import (Position, WHITE, BLACK, PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING,
+                      ALL_CASTLING, pieceIndex)
+from move import moveToUCI
+from move import isCapture, isPromotion
+from movegen import generateMoves, generateLegalMoves, generateLegalCaptures, generateLegalQuiets, isSquareAttacked
+from benchmark import randomFENs
+
+BACK_RANK = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+
+def _startingPosition() -> Position:
+    position = Position()
+    for file in range(8):
+        position.putPiece(file, pieceIndex(WHITE, BACK_RANK[file]))
+        position.putPiece(8 + file, pieceIndex(WHITE, PAWN))
+        position.putPiece(48 + file, pieceIndex(BLACK, PAWN))
+        position.putPiece(56 + file, pieceIndex(BLACK, BACK_RANK[file]))
+    position.castling = ALL_CASTLING
+    return position
+
+def test_generateMoves_start():
+    """
+    Tests the move generator on the starting position.
+    """
+    position = _startingPosition()
+    moves = sorted(moveToUCI(move) for move in generateMoves(position))
+    assert len(moves) == 20
+    assert "e2e4" in moves and "g1f3" in moves
+    position.sideToMove = BLACK
+    assert len(generateMoves(position)) == 20
+
+def test_generateMoves_castling():
+    """
+    Tests that castling is generated only through unattacked squares.
+    """
+    position = Position()
+    position.putPiece(4, pieceIndex(WHITE, KING))
+    position.putPiece(0, pieceIndex(WHITE, ROOK))
+    position.putPiece(7, pieceIndex(WHITE, ROOK))
+    position.putPiece(60, pieceIndex(BLACK, KING))
+    position.castling = ALL_CASTLING
+    moves = [moveToUCI(move) for move in generateMoves(position)]
+    assert "e1g1" in moves and "e1c1" in moves
+    position.putPiece(45, pieceIndex(BLACK, ROOK))
+    moves = [moveToUCI(move) for move in generateMoves(position)]
+    assert "e1g1" not in moves and "e1c1" in moves
+
+def test_generateMoves_pawns():
+    """
+    Tests en passant and promotion generation.
+    """
+    position = Position()
+    position.putPiece(4, pieceIndex(WHITE, KING))
+    position.putPiece(60, pieceIndex(BLACK, KING))
+    position.putPiece(36, pieceIndex(WHITE, PAWN))
+    position.putPiece(35, pieceIndex(BLACK, PAWN))
+    position.putPiece(49, pieceIndex(WHITE, PAWN))
+    position.enPassant = 43
+    moves = [moveToUCI(move) for move in generateMoves(position)]
+    assert "e5d6" in moves
+    assert {"b7b8q", "b7b8r", "b7b8b", "b7b8n"} <= set(moves)
+
+def test_isSquareAttacked():
+    """
+    Tests the isSquareAttacked function.
+    """
+    position = _startingPosition()
+    assert isSquareAttacked(position, 21, WHITE)
+    assert not isSquareAttacked(position, 28, WHITE)
+    assert isSquareAttacked(position, 42, BLACK)
+
+def test_generateLegalMoves_pins():
+    """
+    Tests that pinned pieces only move along their pin.
+    """
+    position = Position()
+    position.putPiece(4, pieceIndex(WHITE, KING))
+    position.putPiece(12, pieceIndex(WHITE, ROOK))
+    position.putPiece(11, pieceIndex(WHITE, KNIGHT))
+    position.putPiece(60, pieceIndex(BLACK, ROOK))
+    position.putPiece(32, pieceIndex(BLACK, BISHOP))
+    position.putPiece(63, pieceIndex(BLACK, KING))
+    moves = [moveToUCI(move) for move in generateLegalMoves(position)]
+    assert not [move for move in moves if move.startswith("d2")]
+    assert sorted(move for move in moves if move.startswith("e2")) == ["e2e3", "e2e4", "e2e5", "e2e6", "e2e7", "e2e8"]
+
+def test_generateLegalMoves_check():
+    """
+    Tests that only evasions are generated in check.
+    """
+    position = _startingPosition()
+    position.removePiece(13)
+    position.removePiece(52)
+    position.putPiece(31, pieceIndex(BLACK, QUEEN))
+    moves = sorted(moveToUCI(move) for move in generateLegalMoves(position))
+    assert moves == ["g2g3"]
+    assert len(generateMoves(position)) > len(moves)
+
+def test_generateLegalCaptures():
+    """
+    Tests that captures and quiet moves split the legal moves.
+    """
+    fens = randomFENs(200, seed=5) + ["r3k2r/1P6/8/3pP3/8/8/6p1/R3K2R w KQkq d6 0 1"]
+    for fen in fens:
+        position = Position.fromFEN(fen)
+        captures = generateLegalCaptures(position)
+        quiets = generateLegalQuiets(position)
+        assert sorted(captures + quiets) == sorted(generateLegalMoves(position))
+        assert all(isCapture(move) or isPromotion(move) for move in captures)
+        assert not any(isCapture(move) or isPromotion(move) for move in quiets)
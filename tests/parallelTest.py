@@ -0,0 +1,38 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import Position
+from move import moveToUCI
+from engine import MATE_BOUND
+from parallel import ParallelSearch
+
+def test_ParallelSearch_mate():
+    """
+    Tests that the parallel search finds a mate in one with its helpers running.
+    """
+    fen = "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4"
+    search = ParallelSearch(3, 1)
+    try:
+        assert search.workers == 3
+        move, score = search.run(Position.fromFEN(fen), 3)
+        assert moveToUCI(move) == "h5f7"
+        assert score >= MATE_BOUND
+        assert search.nodes > 0
+        assert search.table.probes > 0
+    finally:
+        search.close()
+    search.close()
+
+def test_ParallelSearch_deadHelper():
+    """
+    Tests that the search returns when a helper process has died.
+    """
+    search = ParallelSearch(3, 1)
+    try:
+        search._processes[0].kill()
+        search._processes[0].join()
+        move, _ = search.run(Position.fromFEN("4k3/8/8/8/8/8/8/R3K3 w - - 0 1"), 3)
+        assert move != 0 and search.nodes > 0
+        move, _ = search.run(Position.fromFEN("4k3/8/8/8/8/8/8/R3K3 w - - 0 1"), 2)
+        assert move != 0
+    finally:
+        search.close()
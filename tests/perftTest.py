@@ -0,0 +1,38 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import Position, STARTING_FEN
+from perft import perft, divide, main, REFERENCE_POSITIONS
+
+def test_perft_reference():
+    """
+    Tests the move generator against the reference positions at shallow depths.
+    """
+    for name, fen, counts in REFERENCE_POSITIONS:
+        position = Position.fromFEN(fen)
+        for depth, expected in enumerate(counts, start=1):
+            if expected > 10000:
+                break
+            assert perft(position, depth) == expected, name
+        assert position.toFEN() == fen
+
+def test_divide():
+    """
+    Tests the divide function.
+    """
+    counts = divide(Position.fromFEN(STARTING_FEN), 2)
+    assert len(counts) == 20
+    assert counts["e2e4"] == 20
+    assert sum(counts.values()) == 400
+
+def test_main(capsys):
+    """
+    Tests that the divide total comes from the root moves and that depth 0 is refused.
+    """
+    assert main(["--fen", STARTING_FEN, "--depth", "2", "--divide"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 21 and "e2e4: 20" in lines and " nodes        400 " in lines[-1]
+    try:
+        main(["--depth", "0"])
+        assert False
+    except SystemExit as error:
+        assert error.code == 2
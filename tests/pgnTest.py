@@ -0,0 +1,100 @@
+import sys, os, io
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import Position, STARTING_FEN
+from movegen import generateLegalMoves
+from move import moveToUCI
+from pgn import PGNGame, parseSAN, moveToSAN, parseGame, readGames, gameToPGN, writeGames
+
+GAME = """[Event "Casual \\"blitz\\""]
+[Site "?"]
+[Date "2023.01.02"]
+[Round "1"]
+[White "A"]
+[Black "B"]
+[Result "1-0"]
+
+{Opening} 1. e4 e5 2. Nf3 (2. Bc4 Nf6 (2... Bc5) 3. d3) 2... Nc6 $1 3. Bb5 a6!?
+; the Ruy Lopez
+4. Ba4 Nf6 5. O-O Be7 {[%eval 0.3]} 1-0
+
+[Event "Second"]
+[Result "*"]
+
+1. d4 d5 2. Qd3 Qd6 3. Ke3 *
+"""
+
+def test_parseSAN():
+    """
+    Tests that every legal move survives the SAN round trip, including
+    disambiguation, promotions, castling and en passant.
+    """
+    for fen in ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                "4k3/8/8/3pP3/8/8/8/R3K2R w KQ d6 0 1",
+                "4k3/8/8/R7/8/8/8/RN2KN2 w - - 0 1"):
+        position = Position.fromFEN(fen)
+        names = set()
+        for move in generateLegalMoves(position):
+            san = moveToSAN(position, move)
+            names.add(san)
+            assert parseSAN(position, san) == move
+        assert len(names) == len(generateLegalMoves(position))
+    position = Position.fromFEN("4k3/8/8/R7/8/8/8/RN2KN2 w - - 0 1")
+    assert {"Nbd2", "Nfd2", "R1a3", "R5a3"} <= {moveToSAN(position, move) for move in generateLegalMoves(position)}
+    assert moveToSAN(Position.fromFEN("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"), parseSAN(
+        Position.fromFEN("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"), "Ra8")) == "Ra8#"
+    for san in ("e5", "Nd4", "O-O", "Ke2", "exd5", "e8=Q", "Qh5x"):
+        try:
+            parseSAN(Position.fromFEN(STARTING_FEN), san)
+            assert False, san
+        except ValueError:
+            pass
+
+def test_parseGame():
+    """
+    Tests reading tags, comments, NAGs and nested variations.
+    """
+    games = list(readGames(io.StringIO(GAME)))
+    assert len(games) == 2
+    game = games[0]
+    assert game.error is None
+    assert game.headers["Event"] == 'Casual "blitz"'
+    assert game.result == "1-0"
+    assert [moveToUCI(move) for move in game.moves[:4]] == ["e2e4", "e7e5", "g1f3", "b8c6"]
+    assert len(game.moves) == 10
+    assert game.comments == {0: "Opening", 6: "the Ruy Lopez", 10: "[%eval 0.3]"}
+    assert game.nags == {4: [1], 6: [5]}
+    variation = game.variations[2][0]
+    assert [moveToUCI(move) for move in variation.moves] == ["f1c4", "g8f6", "d2d3"]
+    assert [moveToUCI(move) for move in variation.variations[1][0].moves] == ["f8c5"]
+    assert games[1].error is not None and len(games[1].moves) == 4
+    assert list(readGames(io.StringIO(GAME), headersOnly=True))[1].headers["Event"] == "Second"
+
+def test_gameToPGN():
+    """
+    Tests that written games read back the same.
+    """
+    game = parseGame(GAME.split("\n\n[Event")[0])
+    text = gameToPGN(game)
+    assert "2. Nf3 (2. Bc4 Nf6 (2... Bc5) 3. d3) 2... Nc6 $1" in text
+    assert all(len(line) < 80 for line in text.splitlines())
+    again = parseGame(text)
+    assert (again.headers, again.moves, again.comments, again.nags) == (game.headers, game.moves, game.comments, game.nags)
+    output = io.StringIO()
+    assert writeGames(output, [game, again]) == 2
+    assert len(list(readGames(io.StringIO(output.getvalue())))) == 2
+
+def test_PGNGame_fromPosition():
+    """
+    Tests that games played from a FEN record their starting position.
+    """
+    fen = "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"
+    position = Position.fromFEN(fen)
+    position.makeMove(parseSAN(position, "e4"))
+    position.makeMove(parseSAN(position, "Kd7"))
+    game = PGNGame.fromPosition(position, {"White": "Me"})
+    assert game.headers["FEN"] == fen and game.headers["SetUp"] == "1"
+    assert game.endPosition() == position
+    again = parseGame(gameToPGN(game))
+    assert again.moves == game.moves and again.headers["White"] == "Me"
@@ -0,0 +1,168 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import (Position, EMPTY, WHITE, BLACK, PAWN, ROOK, QUEEN, KING, ALL_CASTLING,
+                      pieceIndex, toSquare, toPosition, squareName, iterSquares)
+from move import encodeMove, DOUBLE_PAWN_PUSH, KING_CASTLE, EN_PASSANT, PROMOTION_CAPTURE
+
+def test_Position_init():
+    """
+    Tests the Position class' init method.
+    """
+    position = Position()
+    assert position.pieces == [0] * 12
+    assert position.occupancy == [0, 0, 0]
+    assert position.squares == [EMPTY] * 64
+    assert position.sideToMove == WHITE
+    assert position.enPassant == -1
+
+def test_Position_putPiece():
+    """
+    Tests the Position class' putPiece method.
+    """
+    position = Position()
+    position.putPiece(toSquare(("E", 2)), pieceIndex(WHITE, PAWN))
+    assert position.pieceAt(12) == pieceIndex(WHITE, PAWN)
+    assert position.pieceSet(WHITE, PAWN) == 1 << 12
+    assert position.occupancy == [1 << 12, 0, 1 << 12]
+
+def test_Position_removePiece():
+    """
+    Tests the Position class' removePiece method.
+    """
+    position = Position()
+    position.putPiece(60, pieceIndex(BLACK, KING))
+    assert position.kingSquare(BLACK) == 60
+    assert position.removePiece(60) == pieceIndex(BLACK, KING)
+    assert position.removePiece(60) == EMPTY
+    assert position.occupancy == [0, 0, 0]
+    assert position.kingSquare(BLACK) == -1
+
+def test_Position_copy():
+    """
+    Tests the Position class' copy method.
+    """
+    position = Position()
+    position.putPiece(0, pieceIndex(WHITE, KING))
+    other = position.copy()
+    other.removePiece(0)
+    assert position.pieceAt(0) == pieceIndex(WHITE, KING)
+    assert other != position
+
+def test_squares():
+    """
+    Tests the square conversion helpers.
+    """
+    assert toSquare(("A", 1)) == 0
+    assert toSquare(("h", 8)) == 63
+    assert toPosition(12) == ("E", 2)
+    assert squareName(28) == "e4"
+    assert list(iterSquares(0b10010001)) == [0, 4, 7]
+
+def test_Position_makeMove():
+    """
+    Tests the Position class' makeMove and unmakeMove methods.
+    """
+    position = Position()
+    position.putPiece(4, pieceIndex(WHITE, KING))
+    position.putPiece(7, pieceIndex(WHITE, ROOK))
+    position.putPiece(12, pieceIndex(WHITE, PAWN))
+    position.putPiece(60, pieceIndex(BLACK, KING))
+    position.putPiece(29, pieceIndex(BLACK, PAWN))
+    position.castling = ALL_CASTLING
+    before = position.copy()
+    position.makeMove(encodeMove(12, 28, DOUBLE_PAWN_PUSH))
+    assert position.enPassant == 20
+    assert position.sideToMove == BLACK
+    position.makeMove(encodeMove(29, 20, EN_PASSANT))
+    assert position.pieceAt(28) == EMPTY
+    assert position.pieceAt(20) == pieceIndex(BLACK, PAWN)
+    assert position.fullmoveNumber == 2
+    position.makeMove(encodeMove(4, 6, KING_CASTLE))
+    assert position.pieceAt(5) == pieceIndex(WHITE, ROOK)
+    assert position.castling == ALL_CASTLING & ~3
+    assert len(position.history) == 3
+    for _ in range(3):
+        position.unmakeMove()
+    assert position == before
+    assert position.squares == before.squares
+
+def test_Position_promotion():
+    """
+    Tests that promotions can be made and taken back.
+    """
+    position = Position()
+    position.putPiece(54, pieceIndex(WHITE, PAWN))
+    position.putPiece(63, pieceIndex(BLACK, ROOK))
+    position.castling = ALL_CASTLING
+    before = position.copy()
+    position.makeMove(encodeMove(54, 63, PROMOTION_CAPTURE | 3))
+    assert position.pieceAt(63) == pieceIndex(WHITE, QUEEN)
+    assert position.castling == ALL_CASTLING & ~4
+    assert position.halfmoveClock == 0
+    position.unmakeMove()
+    assert position == before
+
+def test_Position_fromFEN():
+    """
+    Tests the Position class' fromFEN and toFEN methods.
+    """
+    fen = "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2"
+    position = Position.fromFEN(fen)
+    assert position.sideToMove == WHITE
+    assert position.enPassant == 42
+    assert position.castling == ALL_CASTLING
+    assert position.fullmoveNumber == 2
+    assert position.toFEN() == fen
+
+def test_Position_setFEN():
+    """
+    Tests that malformed FEN strings are rejected and that the clocks may be left out.
+    """
+    from benchmark import randomFENs
+    for fen in randomFENs(300):
+        position = Position.fromFEN(fen)
+        assert position.toFEN() == fen
+        assert position.key == position.computeKey()
+    position = Position.fromFEN("4k3/8/8/8/8/8/8/4K2R b K -")
+    assert (position.halfmoveClock, position.fullmoveNumber) == (0, 1)
+    assert position.toFEN() == "4k3/8/8/8/8/8/8/4K2R b K - 0 1"
+    for fen in ("", "8/8/8/8/8/8/8 w - - 0 1", "9/8/8/8/8/8/8/8 w - - 0 1", "44/8/8/8/8/8/8/8 w - - 0 1",
+                "7/8/8/8/8/8/8/8 w - - 0 1", "x7/8/8/8/8/8/8/8 w - - 0 1", "8/8/8/8/8/8/8/8 x - - 0 1",
+                "8/8/8/8/8/8/8/8 w KX - 0 1", "8/8/8/8/8/8/8/8 w - e4 0 1", "8/8/8/8/8/8/8/8 w - - -1 1",
+                "8/8/8/8/8/8/8/8 w - - 0", "8/8/8/8/8/8/8/K7 b - - 0 1", "4k3/8/8/8/8/8/8/K3K3 w - - 0 1",
+                "4k3/8/8/8/8/8/8/4K3 w - - 0 0", "4k3/8/8/8/8/8/8/4K2P w - - 0 1", "p3k3/8/8/8/8/8/8/4K3 b - - 0 1",
+                "4k3/8/8/8/4P3/8/8/4K3 w - e3 0 1", "4k3/8/8/3pP3/8/8/8/4K3 b - d6 0 1"):
+        try:
+            position.setFEN(fen)
+            assert False, fen
+        except ValueError:
+            pass
+    assert position.toFEN() == "4k3/8/8/8/8/8/8/4K2R b K - 0 1"
+
+def test_Position_key():
+    """
+    Tests that the Zobrist key is kept up to date by makeMove and unmakeMove.
+    """
+    from movegen import generateLegalMoves
+    position = Position.fromFEN("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+    before = position.key
+    for move in generateLegalMoves(position):
+        position.makeMove(move)
+        assert position.key == position.computeKey()
+        for reply in generateLegalMoves(position):
+            position.makeMove(reply)
+            assert position.key == position.computeKey()
+            position.unmakeMove()
+        position.unmakeMove()
+        assert position.key == before
+
+def test_Position_repetitions():
+    """
+    Tests the Position class' repetitions method and that transpositions share a key.
+    """
+    from move import encodeMove
+    position = Position.fromFEN("4k3/8/8/8/8/8/8/4K1N1 w - - 0 1")
+    for move in (encodeMove(6, 21), encodeMove(60, 59), encodeMove(21, 6), encodeMove(59, 60)):
+        position.makeMove(move)
+    assert position.repetitions() == 1
+    assert position.key == Position.fromFEN("4k3/8/8/8/8/8/8/4K1N1 w - - 4 3").key
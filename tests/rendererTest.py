@@ -0,0 +1,46 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+from game import ChessGame
+from piece import PieceColor
+from renderer import Renderer, getLayer, BOARD_LAYER, MOVE_DOT_LAYER
+
+def _sameImage(first: pygame.Surface, second: pygame.Surface) -> bool:
+    return pygame.image.tobytes(first, "RGB") == pygame.image.tobytes(second, "RGB")
+
+def test_Renderer_dirtyRects():
+    """
+    Tests that only changed squares are redrawn and that the result matches a full redraw.
+    """
+    screen = pygame.Surface((800, 800))
+    game = ChessGame(PieceColor.WHITE, 1)
+    renderer = Renderer(screen)
+    assert len(renderer.render(game)) == 64
+    assert renderer.render(game) == []
+    game.select(("E", 2))
+    game.selected.isDraging = True
+    assert renderer.render(game, (420, 620))
+    game.move(("E", 4))
+    game.selected.isDraging = False
+    dirty = renderer.render(game)
+    assert 0 < len(dirty) < 64
+    full = pygame.Surface((800, 800))
+    Renderer(full).render(game)
+    assert _sameImage(screen, full)
+    renderer.invalidate()
+    assert len(renderer.render(game)) == 64
+
+def test_layers():
+    """
+    Tests that layers are built once and that a full draw matches the renderer.
+    """
+    assert getLayer(BOARD_LAYER) is getLayer(BOARD_LAYER)
+    assert getLayer(MOVE_DOT_LAYER).get_size() == (100, 100)
+    game = ChessGame(PieceColor.WHITE, 1)
+    game.select(("G", 1))
+    drawn = pygame.Surface((800, 800))
+    game.draw(drawn)
+    rendered = pygame.Surface((800, 800))
+    Renderer(rendered).render(game)
+    assert _sameImage(drawn, rendered)
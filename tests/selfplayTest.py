@@ -0,0 +1,68 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import math
+from position import Position, STARTING_FEN
+from pgn import parseGame
+from selfplay import SPRT, adjudicate, engineCommand, readOpenings, runMatch
+
+def test_SPRT():
+    """
+    Tests the log-likelihood ratio, its bounds and the Elo estimate.
+    """
+    sprt = SPRT(0, 10, 0.05, 0.05)
+    assert round(sprt.upper, 3) == 2.944 and sprt.lower == -sprt.upper
+    assert sprt.llr() == 0 and sprt.status() is None
+    for score in [1] * 300 + [0.5] * 400 + [0] * 300:
+        sprt.add(score)
+    assert (sprt.wins, sprt.draws, sprt.losses) == (300, 400, 300)
+    # An even score is nearer H0 than H1: N (s1 - s0)(2 m - s0 - s1) / (2 var).
+    assert round(sprt.llr(), 3) == round(-1000 * 0.014387 ** 2 / (2 * 0.15), 3)
+    elo, margin = sprt.elo()
+    assert elo == 0 and 15 < margin < 20
+    winning = SPRT()
+    for score in [1] * 60 + [0.5] * 30 + [0] * 10:
+        winning.add(score)
+    assert winning.status() == "H1" and winning.elo()[0] > 100
+    losing = SPRT()
+    for score in [0] * 60 + [0.5] * 40:
+        losing.add(score)
+    assert losing.status() == "H0"
+    drawn = SPRT()
+    drawn.add(0.5)
+    assert drawn.elo() == (0, math.inf) and drawn.status() is None
+
+def test_adjudicate():
+    """
+    Tests adjudication by the rules and by the bitbases.
+    """
+    assert adjudicate(Position.fromFEN(STARTING_FEN)) is None
+    assert adjudicate(Position.fromFEN("7k/6Q1/6K1/8/8/8/8/8 b - - 0 1")) == ("1-0", "checkmate")
+    assert adjudicate(Position.fromFEN("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")) == ("1/2-1/2", "stalemate")
+    assert adjudicate(Position.fromFEN("8/8/4k3/8/8/2N5/8/4K3 w - - 0 1"))[1] == "insufficient material"
+    assert adjudicate(Position.fromFEN("8/8/4k3/8/8/8/8/R3K3 b - - 0 1")) == ("1-0", "bitbase win")
+    assert adjudicate(Position.fromFEN("8/8/4k3/8/8/8/8/R3K3 b - - 100 80")) == ("1/2-1/2", "fifty move rule")
+
+def test_readOpenings(tmp_path):
+    """
+    Tests reading opening suites from EPD and PGN files.
+    """
+    epd = tmp_path / "openings.epd"
+    epd.write_text('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - id "e4";\n\n')
+    assert readOpenings(epd) == [("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1", [])]
+    pgn = tmp_path / "openings.pgn"
+    pgn.write_text('[Event "?"]\n\n1. d4 d5 2. c4 *\n')
+    assert readOpenings(pgn) == [(STARTING_FEN, ["d2d4", "d7d5", "c2c4"])]
+
+def test_runMatch():
+    """
+    Tests a short match between two engine processes.
+    """
+    output, pgnFile = io.StringIO(), io.StringIO()
+    sprt = runMatch(engineCommand(None), engineCommand(None), [(STARTING_FEN, ["e2e4", "e7e5"])], 2, "go depth 1",
+                    concurrency=2, maxPlies=12, output=output, pgnFile=pgnFile)
+    assert sprt.games == 2 and output.getvalue().count("Game ") == 2
+    games = pgnFile.getvalue().split("\n\n[")
+    assert len(games) == 2
+    game = parseGame(games[0])
+    assert game.error is None and len(game.moves) == 12 and game.result == "1/2-1/2"
@@ -0,0 +1,27 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pygame
+from piece import Piece, PieceType, PieceColor
+from sprites import getSprite, clearSprites
+
+def test_getSprite():
+    """
+    Tests that sprites are loaded once and shared by every piece.
+    """
+    clearSprites()
+    sprite = getSprite(PieceType.QUEEN, PieceColor.BLACK)
+    assert sprite.get_size() == (100, 100)
+    assert getSprite(PieceType.QUEEN, PieceColor.BLACK) is sprite
+    assert getSprite(PieceType.QUEEN, PieceColor.BLACK, 64).get_size() == (64, 64)
+    first = Piece(PieceType.QUEEN, PieceColor.BLACK, ("D", 8))
+    second = Piece(PieceType.QUEEN, PieceColor.BLACK, ("E", 8))
+    assert first.image is second.image is sprite
+
+def test_Piece_noImageLoad(monkeypatch):
+    """
+    Tests that creating pieces reads no image from disk.
+    """
+    def load(*args):
+        raise AssertionError("image loaded")
+    monkeypatch.setattr(pygame.image, "load", load)
+    Piece(PieceType.KNIGHT, PieceColor.WHITE, ("B", 1))
@@ -0,0 +1,68 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import Position, STARTING_FEN
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, BUCKET_BYTES
+from engine import Search
+
+def test_TranspositionTable_size():
+    """
+    Tests that the table stays within its size in MB.
+    """
+    table = TranspositionTable(1)
+    assert table.sizeMB == 1
+    assert table.size == 1024 * 1024 // BUCKET_BYTES * 2
+    assert TranspositionTable(1.5).sizeMB == 1
+    buffer = memoryview(bytearray(TranspositionTable.bytesFor(0.25)))
+    assert TranspositionTable(buffer=buffer).sizeMB == 0.25
+
+def test_TranspositionTable_probe():
+    """
+    Tests storing and probing entries.
+    """
+    table = TranspositionTable(1)
+    key = Position.fromFEN(STARTING_FEN).key
+    assert table.probe(key) is None
+    table.store(key, 0x31C, -125, 5, LOWER)
+    assert table.probe(key) == (0x31C, -125, 5, LOWER)
+    assert table.probe(key ^ 1) is None
+    assert table.hits == 1 and table.probes == 3
+    table.clear()
+    assert table.probe(key) is None
+
+def test_TranspositionTable_replace():
+    """
+    Tests the depth-preferred and always-replace slots of a bucket.
+    """
+    table = TranspositionTable(1)
+    buckets = table.size // 2
+    deep, shallow, other = 7, 7 + buckets, 7 + 2 * buckets
+    table.store(deep, 1, 10, 8, EXACT)
+    table.store(shallow, 2, 20, 2, UPPER)
+    table.store(other, 3, 30, 1, LOWER)
+    assert table.probe(deep) == (1, 10, 8, EXACT)
+    assert table.probe(shallow) is None
+    assert table.probe(other) == (3, 30, 1, LOWER)
+    table.newSearch()
+    table.store(shallow, 2, 20, 2, UPPER)
+    assert table.probe(deep) is None
+    assert table.probe(shallow) == (2, 20, 2, UPPER)
+    # A key in the always-replace slot is updated there, even by a deeper result.
+    table.store(deep, 1, 10, 8, EXACT)
+    table.store(other, 3, 30, 1, LOWER)
+    table.store(other, 4, 40, 9, EXACT)
+    assert table.probe(deep) == (1, 10, 8, EXACT)
+    assert table.probe(other) == (4, 40, 9, EXACT)
+
+def test_Search_table():
+    """
+    Tests that a second search of the same position hits the table.
+    """
+    table = TranspositionTable(1 / 64)
+    position = Position.fromFEN(STARTING_FEN)
+    first = Search(position, table)
+    first.run(3)
+    second = Search(position, table)
+    second.run(3)
+    assert second.nodes < first.nodes
+    assert table.hitRate > 0
+    assert 0 < table.hashfull() <= 1000
@@ -0,0 +1,80 @@
+import sys, os, io
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from position import Position, STARTING_FEN
+import uci
+from uci import UCIEngine, parseUCIMove, formatScore
+from engine import MATE_SCORE
+
+def _run(engine: UCIEngine, output: io.StringIO, *commands: str) -> list:
+    for command in commands:
+        engine.handle(command)
+    engine.wait()
+    return output.getvalue().splitlines()
+
+def test_parseUCIMove():
+    """
+    Tests parsing moves in UCI notation.
+    """
+    position = Position.fromFEN(STARTING_FEN)
+    assert parseUCIMove(position, "e2e4") in [move for move in __import__("movegen").generateLegalMoves(position)]
+    try:
+        parseUCIMove(position, "e2e5")
+        assert False
+    except ValueError:
+        pass
+    assert formatScore(35) == "cp 35"
+    assert formatScore(MATE_SCORE - 3) == "mate 2"
+    assert formatScore(-MATE_SCORE + 2) == "mate -1"
+
+def test_UCIEngine_handshake():
+    """
+    Tests the uci and isready commands.
+    """
+    output = io.StringIO()
+    engine = UCIEngine(output)
+    lines = _run(engine, output, "uci", "isready", "setoption name Hash value 1")
+    engine.close()
+    assert lines[0].startswith("id name")
+    assert "uciok" in lines and lines[-1] == "readyok"
+
+def test_UCIEngine_go():
+    """
+    Tests positions with moves, depth limited searches and info lines.
+    """
+    output = io.StringIO()
+    engine = UCIEngine(output)
+    lines = _run(engine, output, "position startpos moves f2f3 e7e5 g2g4", "go depth 2")
+    engine.close()
+    assert engine.position.toFEN() == "rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq g3 0 2"
+    assert lines[-1] == "bestmove d8h4"
+    assert any(line.startswith("info depth ") and " score mate 1 " in line and " nps " in line for line in lines)
+
+def test_UCIEngine_stop():
+    """
+    Tests that stop ends an infinite search with a best move.
+    """
+    output = io.StringIO()
+    engine = UCIEngine(output)
+    engine.handle("position fen 4k3/8/8/8/8/8/8/4K2R w K - 0 1")
+    engine.handle("go infinite")
+    engine.handle("stop")
+    lines = _run(engine, output)
+    engine.close()
+    assert lines[-1].startswith("bestmove ") and lines[-1] != "bestmove 0000"
+
+def test_UCIEngine_searchError(monkeypatch):
+    """
+    Tests that a failing search still sends a best move and that invalid positions are refused.
+    """
+    def fail(*args, **kwargs):
+        raise RuntimeError("broken")
+
+    monkeypatch.setattr(uci.Search, "run", fail)
+    output = io.StringIO()
+    engine = UCIEngine(output)
+    lines = _run(engine, output, "position startpos", "position fen 8/8/8/8/8/8/8/K7 b - - 0 1",
+                 "position fen 4k3/8/8/8/8/8/8/4K2P w - - 0 1", "position fen 4k3/8/8/8/8/8/8/4R1K1 w - - 0 1",
+                 "go depth 2")
+    engine.close()
+    assert all(line.startswith("info string") for line in lines[:3]) and engine.position.toFEN() == STARTING_FEN
+    assert lines[-2:] == ["info string Search failed: broken", "bestmove 0000"]
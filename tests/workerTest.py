@@ -0,0 +1,37 @@
+import sys, os, time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from game import ChessGame
+from piece import PieceColor
+from worker import EngineWorker
+
+def test_EngineWorker_cancel():
+    """
+    Tests that cancelling sets the stop event of a running search.
+    """
+    worker = EngineWorker()
+    future = worker.submit(lambda stopEvent: stopEvent.wait(10))
+    assert worker.busy
+    worker.cancel(block=True)
+    assert future.result() is True
+    assert not worker.busy
+    worker.close()
+
+def test_ChessGame_startComputerMove():
+    """
+    Tests that the computer searches in the background without touching the board.
+    """
+    game = ChessGame(PieceColor.BLACK, 10)
+    fen = game.board.position.toFEN()
+    progress = []
+    done = []
+    start = time.perf_counter()
+    future = game.startComputerMove(lambda *info: progress.append(info), done.append)
+    while not progress:
+        time.sleep(0.01)
+    assert game.isThinking()
+    game.cancelComputerMove(block=True)
+    assert time.perf_counter() - start < 5
+    assert future.result() in game.generateMoves()
+    assert done == [future]
+    assert game.board.position.toFEN() == fen
+    game.close()
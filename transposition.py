@@ -0,0 +1,149 @@
+from typing import Optional, Tuple
+
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+DEFAULT_SIZE_MB = 16
+
+# Every entry is two 64-bit words, the key xor the data followed by the data,
+# so a torn write from another process fails the key check instead of
+# returning mixed data. A bucket is two entries: a depth-preferred slot and
+# an always-replace slot.
+ENTRY_WORDS = 2
+BUCKET_WORDS = 2 * ENTRY_WORDS
+BUCKET_BYTES = BUCKET_WORDS * 8
+
+_SCORE_OFFSET = 1 << 15
+
+
+def _pack(move: int, score: int, depth: int, bound: int, generation: int) -> int:
+    return (move | (score + _SCORE_OFFSET) << 16 | depth << 32 | bound << 40 | generation << 42)
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results keyed by Zobrist key.
+
+    The entries live in one preallocated buffer of unsigned 64-bit words, so
+    memory stays bounded and the buffer can be shared between processes.
+    Each entry stores the best move, score, depth and bound type.
+    """
+    def __init__(self, sizeMB: float = DEFAULT_SIZE_MB, buffer: Optional[memoryview] = None) -> None:
+        if buffer is None:
+            buffer = memoryview(bytearray(TranspositionTable.bytesFor(sizeMB)))
+        self._bytes = buffer.cast("B")
+        self._words = self._bytes.cast("Q")
+        buckets = len(self._words) // BUCKET_WORDS
+        if buckets & (buckets - 1):
+            raise ValueError("The table buffer must hold a power of two buckets.")
+        self._mask = buckets - 1
+        self._generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    @staticmethod
+    def bytesFor(sizeMB: float) -> int:
+        """
+        Returns the buffer size in bytes of the largest table that fits in the given size.
+        """
+        buckets = 1
+        while buckets * 2 * BUCKET_BYTES <= sizeMB * 1024 * 1024:
+            buckets *= 2
+        return buckets * BUCKET_BYTES
+
+    @property
+    def size(self) -> int:
+        """
+        Returns the number of entries.
+        """
+        return (self._mask + 1) * 2
+
+    @property
+    def sizeMB(self) -> float:
+        """
+        Returns the memory used by the entries in MB.
+        """
+        return len(self._bytes) / (1024 * 1024)
+
+    @property
+    def hitRate(self) -> float:
+        """
+        Returns the share of probes that found their position.
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def clear(self) -> None:
+        """
+        Removes every entry and resets the statistics.
+        """
+        self._bytes[:] = bytes(len(self._bytes))
+        self.probes = self.hits = self.stores = 0
+
+    def release(self) -> None:
+        """
+        Releases the buffer so shared memory behind it can be closed. The table is unusable afterwards.
+        """
+        self._words.release()
+        self._bytes.release()
+
+    def newSearch(self) -> None:
+        """
+        Marks the entries stored so far as old so they are replaced first.
+        """
+        self._generation = (self._generation + 1) & 0xFF
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Returns (move, score, depth, bound) stored for the key or None.
+        """
+        self.probes += 1
+        words = self._words
+        index = (key & self._mask) * BUCKET_WORDS
+        for slot in (index, index + ENTRY_WORDS):
+            data = words[slot + 1]
+            if data and words[slot] ^ data == key:
+                self.hits += 1
+                return (data & 0xFFFF, ((data >> 16) & 0xFFFF) - _SCORE_OFFSET,
+                        (data >> 32) & 0xFF, (data >> 40) & 0x3)
+        return None
+
+    def store(self, key: int, move: int, score: int, depth: int, bound: int) -> None:
+        """
+        Stores a search result. A slot already holding the key is updated
+        in place, so a key is never in both. Otherwise the depth-preferred
+        slot keeps the deepest result of the current search and everything
+        else goes to the always-replace slot.
+        """
+        self.stores += 1
+        words = self._words
+        index = (key & self._mask) * BUCKET_WORDS
+        data = words[index + 1]
+        other = words[index + ENTRY_WORDS + 1]
+        if data and words[index] ^ data == key:
+            slot = index
+        elif other and words[index + ENTRY_WORDS] ^ other == key:
+            slot, data = index + ENTRY_WORDS, other
+        elif not data or depth >= (data >> 32) & 0xFF or (data >> 42) & 0xFF != self._generation:
+            slot = index
+        else:
+            slot, data = index + ENTRY_WORDS, other
+        if not move and data and words[slot] ^ data == key:
+            move = data & 0xFFFF
+        data = _pack(move, score, depth, bound, self._generation)
+        words[slot] = key ^ data
+        words[slot + 1] = data
+
+    def hashfull(self) -> int:
+        """
+        Returns how full the table is in permille, sampled from the first entries.
+        """
+        words = self._words
+        sample = min(1000, self.size)
+        used = 0
+        for slot in range(0, sample * ENTRY_WORDS, ENTRY_WORDS):
+            data = words[slot + 1]
+            if data and (data >> 42) & 0xFF == self._generation:
+                used += 1
+        return used * 1000 // sample
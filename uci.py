@@ -0,0 +1,299 @@
+import os
+import sys
+import threading
+from concurrent.futures import wait
+from typing import List, Optional, TextIO
+from position import Position, STARTING_FEN, WHITE
+from movegen import generateLegalMoves, isSquareAttacked
+from move import moveToUCI, NULL_MOVE
+from engine import Search, MATE_SCORE, MATE_BOUND, MAX_DEPTH
+from parallel import ParallelSearch
+from transposition import TranspositionTable, DEFAULT_SIZE_MB
+from worker import EngineWorker
+from book import OpeningBook
+
+ENGINE_NAME = "ChessPy2"
+ENGINE_AUTHOR = "umitkara"
+MAX_HASH_MB = 4096
+# Share of the remaining clock spent on a move when the GUI does not send movestogo.
+DEFAULT_MOVES_TO_GO = 30
+# Kept back from every clock based time limit for communication and move overhead.
+MOVE_OVERHEAD = 0.05
+
+
+def parseUCIMove(position: Position, text: str) -> int:
+    """
+    Returns the legal move of the position written in UCI notation, e.g. "e2e4" or "e7e8q".
+
+    Raises:
+        ValueError: If the move is not legal in the position.
+    """
+    text = text.lower()
+    for move in generateLegalMoves(position):
+        if moveToUCI(move) == text:
+            return move
+    raise ValueError(f"Illegal move {text} in {position.toFEN()}.")
+
+
+def formatScore(score: int) -> str:
+    """
+    Returns a search score as a UCI score, "cp <centipawns>" or "mate <moves>".
+    """
+    if score >= MATE_BOUND:
+        return f"mate {(MATE_SCORE - score + 1) // 2}"
+    if score <= -MATE_BOUND:
+        return f"mate {-((MATE_SCORE + score) // 2)}"
+    return f"cp {score}"
+
+
+class UCIEngine:
+    """
+    Universal Chess Interface front-end for the engine.
+
+    handle() takes one command line at a time. Searches run on a background
+    thread, so "stop" and "isready" are answered while the engine thinks;
+    info lines and the best move are written to the output as they come.
+    """
+    def __init__(self, output: TextIO = sys.stdout) -> None:
+        self._output = output
+        self._lock = threading.Lock()
+        self._position = Position.fromFEN(STARTING_FEN)
+        self._hashSize = DEFAULT_SIZE_MB
+        self._threads = 1
+        self._table = TranspositionTable(self._hashSize)
+        self._parallel = None
+        self._worker = EngineWorker()
+        self._future = None
+        self._book = None
+        self._ownBook = False
+
+    @property
+    def position(self) -> Position:
+        """
+        Returns the position set by the last "position" command.
+        """
+        return self._position
+
+    def send(self, line: str) -> None:
+        """
+        Writes one line to the GUI.
+        """
+        with self._lock:
+            self._output.write(line + "\n")
+            self._output.flush()
+
+    def handle(self, line: str) -> bool:
+        """
+        Runs one UCI command and returns False once the engine should quit.
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_SIZE_MB} min 1 max {MAX_HASH_MB}")
+            self.send(f"option name Threads type spin default 1 min 1 max {os.cpu_count() or 1}")
+            self.send("option name OwnBook type check default false")
+            self.send("option name BookFile type string default <empty>")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self._setOption(args)
+        elif command == "ucinewgame":
+            self.stop(block=True)
+            self._searchTable().clear()
+        elif command == "position":
+            self.stop(block=True)
+            self._setPosition(args)
+        elif command == "go":
+            self.stop(block=True)
+            self._go(args)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            return False
+        return True
+
+    def stop(self, block: bool = False) -> None:
+        """
+        Ends the running search, which then reports its best move.
+        """
+        if self._future is not None:
+            self._worker.cancel(block)
+            if self._future.cancelled():
+                # Stopped before it started; UCI still expects a best move.
+                self._future = None
+                moves = generateLegalMoves(self._position)
+                self.send(f"bestmove {moveToUCI(moves[0]) if moves else '0000'}")
+
+    def wait(self) -> None:
+        """
+        Blocks until the running search has reported its best move.
+        """
+        if self._future is not None:
+            wait([self._future])
+
+    def close(self) -> None:
+        """
+        Stops the search and frees the worker thread and processes and closes the opening book.
+        """
+        self._worker.close()
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+
+    def _searchTable(self) -> TranspositionTable:
+        return self._parallel.table if self._parallel is not None else self._table
+
+    def _setOption(self, args: List[str]) -> None:
+        if "name" not in args or "value" not in args:
+            return
+        name = " ".join(args[args.index("name") + 1:args.index("value")]).lower()
+        value = " ".join(args[args.index("value") + 1:])
+        if name in ("ownbook", "bookfile"):
+            self._setBookOption(name, value)
+            return
+        try:
+            number = int(value)
+        except ValueError:
+            self.send(f"info string invalid value {value} for {name}")
+            return
+        self.stop(block=True)
+        if name == "hash":
+            self._hashSize = min(max(number, 1), MAX_HASH_MB)
+            self._table = TranspositionTable(self._hashSize)
+        elif name == "threads":
+            self._threads = min(max(number, 1), os.cpu_count() or 1)
+        else:
+            self.send(f"info string unknown option {name}")
+            return
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+        if self._threads > 1:
+            self._parallel = ParallelSearch(self._threads, self._hashSize)
+
+    def _setBookOption(self, name: str, value: str) -> None:
+        if name == "ownbook":
+            self._ownBook = value.lower() == "true"
+            return
+        try:
+            book = OpeningBook(value) if value and value != "<empty>" else None
+        except (OSError, ValueError) as error:
+            self.send(f"info string cannot open book {value}: {error}")
+            return
+        self.stop(block=True)
+        if self._book is not None:
+            self._book.close()
+        self._book = book
+
+    def _setPosition(self, args: List[str]) -> None:
+        try:
+            if args and args[0] == "startpos":
+                position = Position.fromFEN(STARTING_FEN)
+                rest = args[1:]
+            elif args and args[0] == "fen":
+                end = args.index("moves") if "moves" in args else len(args)
+                position = Position.fromFEN(" ".join(args[1:end]))
+                # setFEN checks the kings and pawns; a king left in check
+                # with the other side to move could simply be captured.
+                if isSquareAttacked(position, position.kingSquare(position.sideToMove ^ 1), position.sideToMove):
+                    raise ValueError("Illegal position: the side not to move is in check.")
+                rest = args[end:]
+            else:
+                raise ValueError("Expected startpos or fen.")
+            if rest and rest[0] == "moves":
+                for text in rest[1:]:
+                    position.makeMove(parseUCIMove(position, text))
+        except ValueError as error:
+            self.send(f"info string {error}")
+            return
+        self._position = position
+
+    def _go(self, args: List[str]) -> None:
+        limits = {}
+        index = 0
+        while index < len(args):
+            key = args[index]
+            if key in ("depth", "nodes", "movetime", "wtime", "btime", "winc", "binc", "movestogo"):
+                if index + 1 < len(args):
+                    try:
+                        limits[key] = int(args[index + 1])
+                    except ValueError:
+                        pass
+                index += 2
+            else:
+                index += 1
+        maxDepth = min(limits.get("depth", MAX_DEPTH), MAX_DEPTH)
+        nodeLimit = limits.get("nodes")
+        timeLimit = self._timeLimit(limits)
+        position = self._position.copy()
+        if self._ownBook and self._book is not None and "infinite" not in args:
+            move = self._book.bestMove(position)
+            if move is not None:
+                self.send(f"bestmove {moveToUCI(move)}")
+                return
+        self._future = self._worker.submit(
+            lambda stopEvent: self._search(position, maxDepth, timeLimit, nodeLimit, "infinite" in args, stopEvent))
+
+    def _timeLimit(self, limits: dict) -> Optional[float]:
+        """
+        Returns the seconds to think from movetime or the clock, or None for no limit.
+        """
+        if "movetime" in limits:
+            return limits["movetime"] / 1000
+        clock = limits.get("wtime" if self._position.sideToMove == WHITE else "btime")
+        if clock is None:
+            return None
+        increment = limits.get("winc" if self._position.sideToMove == WHITE else "binc", 0)
+        movesToGo = limits.get("movestogo", DEFAULT_MOVES_TO_GO)
+        seconds = (clock / max(movesToGo, 1) + increment * 3 / 4) / 1000
+        return max(min(seconds, clock / 1000 / 2) - MOVE_OVERHEAD, 0.01)
+
+    def _search(self, position: Position, maxDepth: int, timeLimit: Optional[float], nodeLimit: Optional[int],
+                infinite: bool, stopEvent: threading.Event) -> int:
+        def report(depth: int, score: int, nodes: int, elapsed: float, pv: List[int]) -> None:
+            nps = int(nodes / elapsed) if elapsed > 0 else 0
+            self.send(f"info depth {depth} score {formatScore(score)} nodes {nodes} nps {nps} "
+                      f"time {int(elapsed * 1000)} hashfull {self._searchTable().hashfull()} "
+                      f"pv {' '.join(moveToUCI(move) for move in pv)}")
+
+        move = NULL_MOVE
+        try:
+            if self._parallel is not None:
+                move, _ = self._parallel.run(position, maxDepth, timeLimit, nodeLimit, report, stopEvent)
+            else:
+                move, _ = Search(position, self._table, stopEvent).run(maxDepth, timeLimit, nodeLimit, report)
+            if infinite:
+                # UCI holds the best move of an infinite search until "stop".
+                stopEvent.wait()
+        except Exception as error:
+            # The GUI waits for a best move, so a failed search still answers.
+            self.send(f"info string Search failed: {error}")
+        finally:
+            self.send(f"bestmove {moveToUCI(move) if move != NULL_MOVE else '0000'}")
+        return move
+
+
+def main() -> int:
+    """
+    Speaks UCI over stdin and stdout until "quit" or end of input and returns the exit code.
+    """
+    engine = UCIEngine(sys.stdout)
+    try:
+        for line in sys.stdin:
+            if not engine.handle(line):
+                break
+    finally:
+        engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
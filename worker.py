@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+
+class EngineWorker:
+    """
+    Runs searches on a background thread so the caller stays responsive.
+
+    Each search is a callable taking a threading.Event that it should poll
+    and return early on once set. submit() returns a Future for the result;
+    cancel() sets the event, so a running search finishes with the best
+    result found so far, and a queued one never starts.
+    """
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="engine")
+        self._future = None
+        self._stopEvent = None
+
+    @property
+    def busy(self) -> bool:
+        """
+        Returns True while the last submitted search has not finished.
+        """
+        return self._future is not None and not self._future.done()
+
+    def submit(self, search: Callable[[threading.Event], Any],
+               onDone: Optional[Callable[[Future], None]] = None) -> Future:
+        """
+        Starts the search after any running one and returns its future.
+        onDone is called with the future once it has a result or was cancelled,
+        from the worker thread or, for a search cancelled before it started,
+        from the thread calling cancel().
+        """
+        stopEvent = threading.Event()
+        future = self._executor.submit(search, stopEvent)
+        self._future, self._stopEvent = future, stopEvent
+        if onDone is not None:
+            future.add_done_callback(onDone)
+        return future
+
+    def cancel(self, block: bool = False) -> None:
+        """
+        Asks the last submitted search to stop and, if block is True, waits until it has.
+        """
+        if self._future is not None:
+            self._future.cancel()
+            self._stopEvent.set()
+            if block:
+                wait([self._future])
+
+    def close(self) -> None:
+        """
+        Stops the last search and waits for the worker thread to exit.
+        """
+        self.cancel()
+        self._executor.shutdown(wait=True)
+        self._future = None
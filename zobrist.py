@@ -0,0 +1,11 @@
+import random
+
+# Fixed seed so keys, and anything stored by key, are stable across runs.
+_random = random.Random(0x5A0B8157)
+
+# PIECE_KEYS[piece * 64 + square] for the twelve piece indexes of position.py.
+PIECE_KEYS = [_random.getrandbits(64) for _ in range(12 * 64)]
+SIDE_KEY = _random.getrandbits(64)
+# One key per castling rights bitmask; no rights hash to 0.
+CASTLING_KEYS = [0] + [_random.getrandbits(64) for _ in range(15)]
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]